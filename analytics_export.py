@@ -0,0 +1,291 @@
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import time
+
+from db_pool import DB_PATH
+from eligibility import TO_DAY
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# ✅ Export Settings (overridable from .env)
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", "analytics")
+ANALYTICS_CHUNK_ROWS = int(os.getenv("ANALYTICS_CHUNK_ROWS", "200000"))  # Rows held in memory at a time
+
+# ✅ Exported Columns
+# Dates become day numbers (date.toordinal(), 0 = missing) and text columns with few
+# distinct values are dictionary-encoded ("category": int32 codes plus the list of values).
+# Names, emails and feedback text are left out: they aren't needed for aggregations.
+TABLES = {
+    "products": ("SELECT id, name, warranty_period, price FROM products ORDER BY id",
+                 [("id", "int64"), ("name", "category"), ("warranty_period", "int32"), ("price", "float64")]),
+    "users": (f"SELECT id, product_id, COALESCE({TO_DAY.format('warranty_expiry')}, 0), "
+              f"COALESCE({TO_DAY.format('last_service_date')}, 0), maintenance_plan, sentiment FROM users ORDER BY id",
+              [("id", "int64"), ("product_id", "int64"), ("warranty_expiry", "int32"),
+               ("last_service_date", "int32"), ("maintenance_plan", "category"), ("sentiment", "category")]),
+    "feedback": (f"SELECT id, user_id, UPPER(sentiment), COALESCE({TO_DAY.format('timestamp')}, 0) FROM feedback ORDER BY id",
+                 [("id", "int64"), ("user_id", "int64"), ("sentiment", "category"), ("day", "int32")]),
+}
+
+
+def _require(module, name):
+    if module is None:
+        raise RuntimeError(f"This needs {name} (pip install {name}).")
+
+
+def _encode(values, lookup):
+    """Dictionary-encodes one chunk of a text column, growing `lookup` (value -> code) as needed."""
+    return np.fromiter((lookup.setdefault(value, len(lookup)) for value in values), dtype=np.int32, count=len(values))
+
+
+class _NpySink:
+    """One memory-mapped .npy file per column, sized from the row count up front."""
+
+    def __init__(self, directory, columns, rows):
+        self.directory = directory
+        self.arrays = {name: np.lib.format.open_memmap(os.path.join(directory, f"{name}.npy"), mode="w+",
+                                                       dtype="int32" if kind == "category" else kind, shape=(rows,))
+                       for name, kind in columns}
+        self.offset = 0
+
+    def write(self, chunk, categories):
+        size = len(next(iter(chunk.values())))
+        for name, values in chunk.items():
+            self.arrays[name][self.offset:self.offset + size] = values
+        self.offset += size
+
+    def close(self, categories):
+        for array in self.arrays.values():
+            array.flush()
+        for name, values in categories.items():
+            with open(os.path.join(self.directory, f"{name}.categories.json"), "w", encoding="utf-8") as f:
+                json.dump(values, f, ensure_ascii=False)
+
+
+class _ParquetSink:
+    """One Parquet file per table, one row group per chunk; text columns as dictionary arrays."""
+
+    def __init__(self, directory, columns, rows):
+        self.columns = columns
+        self.schema = pa.schema([(name, pa.dictionary(pa.int32(), pa.string()) if kind == "category" else pa.from_numpy_dtype(kind))
+                                 for name, kind in columns])
+        self.writer = pq.ParquetWriter(os.path.join(directory, "data.parquet"), self.schema)
+
+    def write(self, chunk, categories):
+        arrays = [pa.DictionaryArray.from_arrays(chunk[name], pa.array(categories[name], pa.string()))
+                  if kind == "category" else pa.array(chunk[name]) for name, kind in self.columns]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self, categories):
+        self.writer.close()
+
+
+def export_table(conn, table, directory, file_format="npy", chunk_rows=ANALYTICS_CHUNK_ROWS):
+    """Streams one table into columnar files, `chunk_rows` rows at a time; returns the row count."""
+    _require(np, "numpy")
+    if file_format == "parquet":
+        _require(pa, "pyarrow")
+    sql, columns = TABLES[table]
+    os.makedirs(directory, exist_ok=True)
+    rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    sink = (_ParquetSink if file_format == "parquet" else _NpySink)(directory, columns, rows)
+    lookups = {name: {} for name, kind in columns if kind == "category"}
+    cursor = conn.execute(sql)
+    written = 0
+    while True:
+        batch = cursor.fetchmany(chunk_rows)
+        if not batch:
+            break
+        chunk = {}
+        for (name, kind), values in zip(columns, zip(*batch)):
+            if kind == "category":
+                chunk[name] = _encode([str(value) for value in values], lookups[name])
+            else:
+                chunk[name] = np.array(values, dtype=kind)
+        sink.write(chunk, {name: list(lookup) for name, lookup in lookups.items()})
+        written += len(batch)
+    sink.close({name: list(lookup) for name, lookup in lookups.items()})
+    return written
+
+
+def export(db_path=DB_PATH, out_dir=ANALYTICS_DIR, file_format="npy", chunk_rows=ANALYTICS_CHUNK_ROWS, verbose=False):
+    """Exports users, products and feedback from one consistent snapshot and writes manifest.json."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("BEGIN")  # One read snapshot, so the row counts match what is streamed
+    manifest = {"format": file_format, "exported_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "tables": {}}
+    try:
+        for table in TABLES:
+            start = time.perf_counter()
+            rows = export_table(conn, table, os.path.join(out_dir, table), file_format, chunk_rows)
+            manifest["tables"][table] = {"rows": rows, "columns": dict(TABLES[table][1])}
+            if verbose:
+                print(f"  {table}: {rows:,} rows in {time.perf_counter() - start:.1f}s", flush=True)
+    finally:
+        conn.execute("COMMIT")
+        conn.close()
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# ✅ Vectorized Queries Over an Export
+UNKNOWN = "(unknown)"  # Group for feedback whose user, product or warranty date is missing
+
+
+class Analytics:
+    """Aggregations over an export, computed with NumPy instead of per-row Python.
+
+    Columns are loaded lazily (memory-mapped for .npy exports). Feedback rows are joined
+    to users through an array indexed by user id, so every query is a few array gathers
+    and a bincount.
+    """
+
+    def __init__(self, out_dir=ANALYTICS_DIR):
+        _require(np, "numpy")
+        self.out_dir = out_dir
+        with open(os.path.join(out_dir, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self._columns = {}
+        self._by_user = {}
+
+    def column(self, table, name):
+        """The column as an array; category columns come back as (codes, values)."""
+        key = (table, name)
+        if key not in self._columns:
+            directory = os.path.join(self.out_dir, table)
+            is_category = self.manifest["tables"][table]["columns"][name] == "category"
+            if self.manifest["format"] == "parquet":
+                _require(pa, "pyarrow")
+                data = pq.read_table(os.path.join(directory, "data.parquet"), columns=[name],
+                                     read_dictionary=[name] if is_category else None).column(name)
+                if is_category:
+                    data = data.unify_dictionaries().combine_chunks()
+                    self._columns[key] = (data.indices.to_numpy(), data.dictionary.to_pylist())
+                else:
+                    self._columns[key] = data.to_numpy()
+            elif is_category:
+                with open(os.path.join(directory, f"{name}.categories.json"), encoding="utf-8") as f:
+                    self._columns[key] = (np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r"), json.load(f))
+            else:
+                self._columns[key] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        return self._columns[key]
+
+    @staticmethod
+    def _gather(ids, codes, keys):
+        """codes[ids == key] for every key (an index join), plus a mask of the keys that exist in `ids`."""
+        size = int(ids.max()) + 1 if len(ids) else 1
+        lookup = np.zeros(size, dtype=codes.dtype)
+        lookup[ids] = codes
+        present = np.zeros(size, dtype=bool)
+        present[ids] = True
+        in_range = (keys >= 0) & (keys < size)
+        clipped = np.where(in_range, keys, 0)
+        return lookup[clipped], in_range & present[clipped]
+
+    def _user_column(self, name):
+        """users.<name> gathered onto every feedback row (the feedback -> users join).
+
+        Returns (values, known): rows whose user is missing from the export are False in
+        `known` and their value is meaningless.
+        """
+        if name not in self._by_user:
+            values = self.column("users", name)
+            codes = values[0] if isinstance(values, tuple) else values
+            self._by_user[name] = self._gather(self.column("users", "id"), np.asarray(codes),
+                                               np.asarray(self.column("feedback", "user_id")))
+        return self._by_user[name]
+
+    def _window(self, since=None, until=None):
+        days = self.column("feedback", "day")
+        mask = np.ones(len(days), dtype=bool)
+        if since:
+            mask &= days >= datetime.date.fromisoformat(since).toordinal()
+        if until:
+            mask &= days <= datetime.date.fromisoformat(until).toordinal()
+        return mask
+
+    def _negative_rate(self, keys, labels, known, since=None, until=None):
+        """Returns [(label, negative, total, rate)] for integer group `keys` into `labels`, highest rate first.
+
+        Rows that are not `known` (their user or product is missing from the export) are
+        counted under UNKNOWN rather than in any real group.
+        """
+        codes, values = self.column("feedback", "sentiment")
+        negative_code = values.index("NEGATIVE") if "NEGATIVE" in values else -1
+        window = self._window(since, until)
+        labels = list(labels) + [UNKNOWN]
+        keys = np.where(known, keys, len(labels) - 1)[window]
+        size = len(labels)
+        totals = np.bincount(keys, minlength=size)
+        negatives = np.bincount(keys[np.asarray(codes)[window] == negative_code], minlength=size)
+        result = [(labels[key], int(negatives[key]), int(totals[key]), negatives[key] / totals[key])
+                  for key in np.flatnonzero(totals)]
+        return sorted(result, key=lambda row: row[3], reverse=True)
+
+    def negative_rate_by_product(self, since=None, until=None):
+        """Groups by products.name, so products sharing a name are counted together."""
+        product_ids, user_known = self._user_column("product_id")
+        names, values = self.column("products", "name")
+        keys, product_known = self._gather(self.column("products", "id"), np.asarray(names), product_ids)
+        return self._negative_rate(keys, values, user_known & product_known, since, until)
+
+    def negative_rate_by_plan(self, since=None, until=None):
+        plans, known = self._user_column("maintenance_plan")
+        return self._negative_rate(plans, self.column("users", "maintenance_plan")[1], known, since, until)
+
+    def negative_rate_by_warranty(self, since=None, until=None):
+        """Splits feedback by whether the user's warranty was still running on the day it was given."""
+        expiry, known = self._user_column("warranty_expiry")
+        in_warranty = self.column("feedback", "day") <= expiry
+        return self._negative_rate(in_warranty.astype(np.int64), ["Out of warranty", "In warranty"],
+                                   known & (expiry > 0), since, until)
+
+
+QUERIES = {
+    "product": Analytics.negative_rate_by_product,
+    "plan": Analytics.negative_rate_by_plan,
+    "warranty": Analytics.negative_rate_by_warranty,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar export of users, products and feedback, with fast aggregations.")
+    parser.add_argument("--out", default=ANALYTICS_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    dump = commands.add_parser("export", help="Stream the tables into columnar files")
+    dump.add_argument("--db", default=DB_PATH)
+    dump.add_argument("--format", choices=["npy", "parquet"], default="npy")
+    dump.add_argument("--chunk-rows", type=int, default=ANALYTICS_CHUNK_ROWS)
+    report = commands.add_parser("negative-rate", help="Negative-feedback rate by product, plan or warranty status")
+    report.add_argument("by", choices=sorted(QUERIES))
+    report.add_argument("--since", help="YYYY-MM-DD")
+    report.add_argument("--until", help="YYYY-MM-DD (inclusive)")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            start = time.perf_counter()
+            manifest = export(args.db, args.out, args.format, args.chunk_rows, verbose=True)
+            total = sum(table["rows"] for table in manifest["tables"].values())
+            print(f"✅ Exported {total:,} rows to {args.out}/ in {time.perf_counter() - start:.1f}s.")
+        else:
+            start = time.perf_counter()
+            rows = QUERIES[args.by](Analytics(args.out), args.since, args.until)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{args.by:<32} | {'negative':>10} | {'total':>10} | {'rate':>6}")
+            for label, negative, total, rate in rows:
+                print(f"{str(label)[:32]:<32} | {negative:>10,} | {total:>10,} | {rate:>6.1%}")
+            print(f"✅ {len(rows)} groups in {elapsed:.1f} ms.")
+    except RuntimeError as e:
+        print(f"⚠️ {e}")
@@ -0,0 +1,198 @@
+import argparse
+import datetime
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from db_pool import DB_PATH
+from feedback_writer import INSERT_FEEDBACK, run_write_hooks
+from migrations import SchemaOutdated, require_current
+from sentiment_engine import score_batch
+from speech_worker import RECOGNIZERS, SPEECH_CHUNK_SECONDS, SpeechError, transcribe, wav_source
+
+# ✅ Batch Settings (overridable from .env)
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "sphinx")
+TRANSCRIBE_COMMIT_EVERY = int(os.getenv("TRANSCRIBE_COMMIT_EVERY", "20"))
+
+AUDIO_EXTENSIONS = (".wav", ".aif", ".aiff", ".flac")
+USER_ID_PATTERN = re.compile(r"^(\d+)_")  # e.g. 42_2024-05-01_call.wav
+
+SAVE_CHECKPOINT = """
+INSERT OR REPLACE INTO transcription_checkpoint (path, size, mtime, status, feedback_id) VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def find_audio_files(paths):
+    """Yields every audio file under `paths` (files or directories) in a stable order."""
+    for path in paths:
+        if os.path.isfile(path):
+            yield os.path.abspath(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    yield os.path.abspath(os.path.join(root, name))
+
+
+def user_id_for(path, default=None):
+    match = USER_ID_PATTERN.match(os.path.basename(path))
+    return int(match.group(1)) if match else default
+
+
+def transcribe_file(path, backend=TRANSCRIBE_BACKEND, chunk_seconds=SPEECH_CHUNK_SECONDS):
+    """Runs in a worker process; returns (path, status, text, audio_seconds).
+
+    status is ok, unknown (no intelligible speech), unavailable (backend missing or
+    unreachable) or error (unreadable file).
+    """
+    recognize = RECOGNIZERS[backend]
+    audio_seconds = 0.0
+
+    def counted(recognizer, audio):
+        nonlocal audio_seconds
+        audio_seconds += len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        return recognize(recognizer, audio)
+
+    try:
+        text = transcribe(wav_source(path), counted, max_retries=0, chunk_seconds=chunk_seconds)
+        return path, "ok", text, audio_seconds
+    except SpeechError as e:
+        return path, e.reason, None, audio_seconds
+    except ImportError:
+        return path, "unavailable", None, audio_seconds  # Backend package not installed
+    except (OSError, ValueError, EOFError):
+        return path, "error", None, audio_seconds  # Corrupt or unsupported audio
+
+
+def _results(files, backend, chunk_seconds, workers):
+    # Like sentiment_engine.score_stream: only a few files per worker are in flight at once.
+    if workers <= 1:
+        for path in files:
+            yield transcribe_file(path, backend, chunk_seconds)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for path in files:
+            pending.append(pool.submit(transcribe_file, path, backend, chunk_seconds))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def recorded_at(stat):
+    """When the recording was made (file mtime), in the UTC format of feedback.timestamp."""
+    return datetime.datetime.fromtimestamp(stat.st_mtime, datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _save(conn, results, stats):
+    """Logs feedback for a batch of results and checkpoints them in the same transaction."""
+    transcripts = [text for _, status, text, _, _ in results if status == "ok"]
+    sentiments = iter(score_batch(transcripts))
+    with conn:
+        # The stat is the one taken when the file was queued, so a file moved or deleted
+        # while it was being transcribed doesn't abort the whole batch.
+        for path, status, text, user_id, stat in results:
+            feedback_id = None
+            if status == "ok":
+                sentiment = next(sentiments)[0]
+                feedback_id = conn.execute(INSERT_FEEDBACK, (user_id, text, sentiment, recorded_at(stat))).lastrowid
+                stats[sentiment] = stats.get(sentiment, 0) + 1
+            conn.execute(SAVE_CHECKPOINT, (path, stat.st_size, stat.st_mtime, status, feedback_id))
+        run_write_hooks(conn)
+
+
+def run_batch(paths, db_path=DB_PATH, backend=TRANSCRIBE_BACKEND, user_id=None,
+              workers=os.cpu_count() or 1, chunk_seconds=SPEECH_CHUNK_SECONDS,
+              commit_every=TRANSCRIBE_COMMIT_EVERY, retry_errors=False):
+    """Transcribes every new audio file under `paths` and logs the text as feedback.
+
+    Files are processed in parallel by `workers` processes and read `chunk_seconds` at a
+    time. Each transcript is scored and inserted into `feedback` in the same transaction
+    that checkpoints the file, so a run restarted after a crash skips finished files
+    (unless their size or mtime changed) without logging any feedback twice. Files whose
+    backend was unavailable are not checkpointed and are retried on the next run. The
+    feedback is dated when the file was recorded (its mtime), not when it was transcribed.
+    Raises SchemaOutdated if the checkpoint table (migration 3) is missing; later
+    migrations are not needed.
+    """
+    if backend not in RECOGNIZERS:
+        raise ValueError(f"Unknown backend {backend!r}; choose from {', '.join(sorted(RECOGNIZERS))}.")
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        require_current(conn, minimum=3)
+    except SchemaOutdated:
+        conn.close()
+        raise
+    conn.execute("PRAGMA journal_mode=WAL")
+    done = {path: (size, mtime, status) for path, size, mtime, status
+            in conn.execute("SELECT path, size, mtime, status FROM transcription_checkpoint")}
+
+    pending, owners, skipped, unassigned = [], {}, 0, 0  # owners: path -> (user id, stat)
+    for path in find_audio_files(paths):
+        stat = os.stat(path)
+        previous = done.get(path)
+        if previous and previous[:2] == (stat.st_size, stat.st_mtime) and not (retry_errors and previous[2] == "error"):
+            skipped += 1
+            continue
+        owner = user_id_for(path, user_id)
+        if owner is None:
+            unassigned += 1
+            continue
+        owners[path] = (owner, stat)
+        pending.append(path)
+
+    print(f"🔄 Transcribing {len(pending):,} files with {backend} on {workers} workers "
+          f"({skipped:,} already done, {unassigned:,} without a user id).")
+    if unassigned:
+        print("⚠️ Name files <user_id>_*.wav or pass --user-id to transcribe the rest.")
+
+    stats = {"files": 0, "audio_seconds": 0.0}
+    start = time.perf_counter()
+    batch = []
+    for path, status, text, audio_seconds in _results(pending, backend, chunk_seconds, workers):
+        stats["files"] += 1
+        stats["audio_seconds"] += audio_seconds
+        stats[status] = stats.get(status, 0) + 1
+        if status == "unavailable":
+            print(f"⚠️ {backend} backend unavailable for {path}; it will be retried next run.")
+            continue
+        batch.append((path, status, text, *owners[path]))
+        if len(batch) >= commit_every:
+            _save(conn, batch, stats)
+            batch = []
+            elapsed = time.perf_counter() - start
+            print(f"  {stats['files']:,}/{len(pending):,} files ({stats['audio_seconds'] / elapsed:,.1f}x realtime)", flush=True)
+    if batch:
+        _save(conn, batch, stats)
+    conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Transcribed {stats['files']:,} files ({stats['audio_seconds']:,.0f}s of audio) in {elapsed:.1f}s: "
+          f"{stats.get('ok', 0):,} logged, {stats.get('unknown', 0):,} without speech, "
+          f"{stats.get('error', 0):,} unreadable.")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcribe recorded feedback audio and log it as feedback.")
+    parser.add_argument("paths", nargs="+", help="Audio files or directories (WAV, AIFF, FLAC)")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--backend", default=TRANSCRIBE_BACKEND, choices=sorted(RECOGNIZERS))
+    parser.add_argument("--user-id", type=int, help="User for files not named <user_id>_*.wav")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-seconds", type=float, default=SPEECH_CHUNK_SECONDS)
+    parser.add_argument("--commit-every", type=int, default=TRANSCRIBE_COMMIT_EVERY)
+    parser.add_argument("--retry-errors", action="store_true", help="Retry files that were unreadable last time")
+    args = parser.parse_args()
+    try:
+        run_batch(args.paths, args.db, args.backend, args.user_id, args.workers,
+                  args.chunk_seconds, args.commit_every, args.retry_errors)
+    except SchemaOutdated as e:
+        print(f"⚠️ {e}")
+        raise SystemExit(1)
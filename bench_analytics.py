@@ -0,0 +1,108 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+import analytics_export
+import data_generator
+
+# The per-row Python loop agents would write today: join in SQL, aggregate in Python.
+JOINED_ROWS = """
+    SELECT products.name, users.maintenance_plan, UPPER(feedback.sentiment)
+    FROM feedback JOIN users ON users.id = feedback.user_id JOIN products ON products.id = users.product_id
+"""
+SQL_GROUP_BY = """
+    SELECT {column}, SUM(UPPER(feedback.sentiment) = 'NEGATIVE'), COUNT(*)
+    FROM feedback JOIN users ON users.id = feedback.user_id JOIN products ON products.id = users.product_id
+    GROUP BY {column}
+"""
+
+
+def python_loop(conn):
+    by_product, by_plan = defaultdict(lambda: [0, 0]), defaultdict(lambda: [0, 0])
+    for product, plan, sentiment in conn.execute(JOINED_ROWS):
+        negative = sentiment == "NEGATIVE"
+        by_product[product][0] += negative
+        by_product[product][1] += 1
+        by_plan[plan][0] += negative
+        by_plan[plan][1] += 1
+    return by_product, by_plan
+
+
+def sql_group_by(conn):
+    return [conn.execute(SQL_GROUP_BY.format(column=column)).fetchall()
+            for column in ("products.name", "users.maintenance_plan")]
+
+
+def vectorized(out_dir):
+    analytics = analytics_export.Analytics(out_dir)
+    return analytics.negative_rate_by_product(), analytics.negative_rate_by_plan()
+
+
+def timed_median(func, repeat):
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare columnar aggregations with SQL and per-row Python loops.")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--feedback", type=int, default=2000000)
+    parser.add_argument("--format", choices=["npy", "parquet"], default="npy")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="Reuse an existing generated database instead of building one")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_analytics_")
+    try:
+        db_path = args.db
+        if db_path is None:
+            db_path = os.path.join(workdir, "analytics.db")
+            print(f"🔄 Generating {args.users:,} users and {args.feedback:,} feedback rows...")
+            with contextlib.redirect_stdout(io.StringIO()):
+                data_generator.generate(db_path, users=args.users, feedback=args.feedback, seed=args.seed)
+        out_dir = os.path.join(workdir, "export")
+
+        start = time.perf_counter()
+        manifest = analytics_export.export(db_path, out_dir, args.format)
+        seconds = time.perf_counter() - start
+        rows = manifest["tables"]["feedback"]["rows"]
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(out_dir) for name in names)
+        print(f"✅ Exported {rows:,} feedback rows in {seconds:.1f}s ({rows / max(seconds, 1e-9):,.0f} rows/sec), "
+              f"{size / 1e6:,.1f} MB as {args.format}.")
+
+        conn = sqlite3.connect(db_path)
+        loop_ms, (loop_product, loop_plan) = timed_median(lambda: python_loop(conn), 1)
+        sql_ms, _ = timed_median(lambda: sql_group_by(conn), args.repeat)
+        conn.close()
+        cold_ms, _ = timed_median(lambda: vectorized(out_dir), args.repeat)
+        analytics = analytics_export.Analytics(out_dir)
+        vectorized(out_dir)
+        warm_ms, (by_product, by_plan) = timed_median(
+            lambda: (analytics.negative_rate_by_product(), analytics.negative_rate_by_plan()), args.repeat)
+
+        matches = ({name: [negative, total] for name, negative, total, _ in by_product} == dict(loop_product)
+                   and {plan: [negative, total] for plan, negative, total, _ in by_plan} == dict(loop_plan))
+        print(f"\nNegative rate by product name and by maintenance plan ({rows:,} feedback rows):")
+        print(f"   SQL join + Python loop: {loop_ms:>10,.1f} ms")
+        print(f"   SQL GROUP BY:           {sql_ms:>10,.1f} ms ({loop_ms / sql_ms:,.0f}x)")
+        print(f"   NumPy, cold load:       {cold_ms:>10,.1f} ms ({loop_ms / cold_ms:,.0f}x)")
+        print(f"   NumPy, columns loaded:  {warm_ms:>10,.1f} ms ({loop_ms / warm_ms:,.0f}x)")
+        print(f"   Results match the Python loop: {'yes' if matches else 'NO'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
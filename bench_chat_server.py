@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from bench_load import CHAT_SCRIPTS, LatencyRecorder
+
+# A session that walks through the whole service-scheduling dialog.
+SERVICE_SCRIPT = ["I want to schedule service", "yes", "not-a-date",
+                  (datetime.date.today() + datetime.timedelta(days=7)).isoformat(), "exit"]
+
+
+class Client:
+    """Minimal keep-alive HTTP/1.1 JSON client (one connection per simulated customer)."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                           f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body)
+        await self.writer.drain()
+
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+        status = int(status_line.split(" ", 2)[1])
+        length = 0
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        data = await self.reader.readexactly(length) if length else b""
+        return status, json.loads(data) if data else None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def run_session(host, port, users, rng, recorder):
+    """One customer: open a session, replay a chat script and leave."""
+    client = Client(host, port)
+    try:
+        with recorder.measure("open_session"):
+            status, payload = await client.request("POST", "/sessions", {"email": f"user{rng.randint(1, users)}@example.com"})
+        if status != 201:
+            raise RuntimeError(f"Could not open a session: HTTP {status} {payload}")
+        path = f"/sessions/{payload['session_id']}/messages"
+
+        script = SERVICE_SCRIPT if rng.random() < 0.2 else rng.choice(CHAT_SCRIPTS)
+        for message in script:
+            with recorder.measure("message"):
+                status, payload = await client.request("POST", path, {"text": message})
+            if status != 200:
+                raise RuntimeError(f"Message failed: HTTP {status} {payload}")
+    finally:
+        client.close()
+
+
+async def replay(base_url, sessions, concurrency, users, seed, recorder):
+    address = urlsplit(base_url)
+    limit = asyncio.Semaphore(concurrency)
+    rng = random.Random(seed)
+
+    async def limited(session_seed):
+        async with limit:
+            await run_session(address.hostname, address.port, users, random.Random(session_seed), recorder)
+
+    await asyncio.gather(*(limited(rng.random()) for _ in range(sessions)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure chat_server.py sessions/sec against a stub Gemini API.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--feedback", type=int, default=10000, help="Pre-existing feedback rows to generate")
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=1000, help="Sessions connected at the same time")
+    parser.add_argument("--workers", type=int, default=64, help="Server threads for blocking handlers")
+    parser.add_argument("--gemini-delay", type=float, default=0.05, help="Stub Gemini latency in seconds")
+    parser.add_argument("--llm-cache", action="store_true", help="Enable the persistent Gemini response cache")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="Reuse an existing generated database instead of building one")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_chat_")
+    os.environ["LLM_CACHE"] = "1" if args.llm_cache else "0"
+    os.environ["LLM_CACHE_PATH"] = os.path.join(workdir, "llm_cache.db")
+
+    # Imported after the environment is set so module-level settings pick it up.
+    import db_pool
+    import gemini_client
+    from chat_server import start_chat_server
+    from data_generator import generate
+    from stub_gemini import start_stub_server
+
+    try:
+        db_path = args.db
+        if db_path is None:
+            db_path = os.path.join(workdir, "chat.db")
+            print(f"🔄 Generating {args.users:,} users...")
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate(db_path, users=args.users, feedback=args.feedback, seed=args.seed)
+        db_pool.init_pool(db_path)
+
+        stub, stub_url = start_stub_server(delay=args.gemini_delay)
+        gemini_client.set_client(gemini_client.GeminiClient(api_key="stub", base_url=stub_url))
+        server, base_url = start_chat_server(workers=args.workers)
+
+        print(f"🔄 Replaying {args.sessions:,} sessions, {args.concurrency:,} connected at once...")
+        recorder = LatencyRecorder()
+        start = time.perf_counter()
+        asyncio.run(replay(base_url, args.sessions, args.concurrency, args.users, args.seed, recorder))
+        wall = time.perf_counter() - start
+
+        recorder.report(wall, args.sessions)
+        print(f"   Chat server handled {server.requests:,} requests; Gemini stub served {stub.requests:,}.")
+        stub.shutdown()
+    finally:
+        db_pool.get_pool().close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import db_pool
+
+# ✅ The Same Lookups chatbot.py and sentiment_analysis.py Run per Chat Turn
+LOOKUPS = [
+    ("SELECT email FROM users WHERE email = ?", ("alice@example.com",)),
+    ("""
+    SELECT users.name, products.name, users.warranty_expiry
+    FROM users
+    JOIN products ON users.product_id = products.id
+    WHERE users.email = ?
+    """, ("alice@example.com",)),
+    ("""
+    SELECT users.name, products.name, users.maintenance_plan
+    FROM users
+    JOIN products ON users.product_id = products.id
+    WHERE users.email = ?
+    """, ("bob@example.com",)),
+    ("SELECT name, phone FROM agents LIMIT 1", ()),
+    ("SELECT offer_details FROM offers", ()),
+    ("SELECT id FROM users LIMIT 1", ()),
+]
+
+SESSION_COUNTS = [1, 8, 32]
+LOOKUPS_PER_SESSION = 2000
+
+
+def lookup_per_call_connection(path, sql, params):
+    """The original pattern: open, query and close a connection for every lookup."""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    result = cursor.fetchall()
+    conn.close()
+    return result
+
+
+def lookup_pooled(path, sql, params):
+    return db_pool.fetch_all(sql, params)
+
+
+def run_session(lookup, path, count):
+    for i in range(count):
+        sql, params = LOOKUPS[i % len(LOOKUPS)]
+        lookup(path, sql, params)
+
+
+def measure(lookup, path, sessions, per_session):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(run_session, lookup, path, per_session) for _ in range(sessions)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+    return sessions * per_session / elapsed
+
+
+def main(source="electronics_company.db", per_session=LOOKUPS_PER_SESSION):
+    # Work on a copy so WAL mode and benchmark traffic never touch the real database.
+    workdir = tempfile.mkdtemp(prefix="bench_db_pool_")
+    path = os.path.join(workdir, "bench.db")
+    shutil.copyfile(source, path)
+    db_pool.init_pool(path, size=db_pool.POOL_SIZE)
+
+    print(f"{'sessions':>8} | {'before (lookups/s)':>18} | {'after (lookups/s)':>17} | speedup")
+    try:
+        for sessions in SESSION_COUNTS:
+            before = measure(lookup_per_call_connection, path, sessions, per_session)
+            after = measure(lookup_pooled, path, sessions, per_session)
+            print(f"{sessions:>8} | {before:>18,.0f} | {after:>17,.0f} | {after / before:.1f}x")
+    finally:
+        db_pool.get_pool().close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,92 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from bench_load import FEEDBACK_TEXTS, LatencyRecorder
+
+
+def producer(escalation, cases, users, rng, recorder):
+    for _ in range(cases):
+        with recorder.measure("enqueue"):
+            escalation.enqueue(rng.randint(1, users), rng.choice(FEEDBACK_TEXTS))
+
+
+def agent(escalation, agent_id, done, recorder, handled):
+    """Claims cases for one agent and resolves them until the producers are done and the queue is empty."""
+    while True:
+        with recorder.measure("claim"):
+            case = escalation.claim(agent_id)
+        if case is None:
+            if done.is_set():
+                return
+            time.sleep(0.001)
+            continue
+        with recorder.measure("resolve"):
+            escalation.resolve(case[0])
+        handled.append(case[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent producers and agents on the escalation queue.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--producers", type=int, default=8)
+    parser.add_argument("--cases", type=int, default=20000, help="Cases enqueued in total")
+    parser.add_argument("--backlog", type=int, default=100000, help="Cases already queued before the run")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import db_pool
+    import escalation
+    from data_generator import generate
+
+    workdir = tempfile.mkdtemp(prefix="bench_escalation_")
+    try:
+        db_path = os.path.join(workdir, "escalation.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate(db_path, users=args.users, feedback=0, agents=args.agents, seed=args.seed)
+        db_pool.init_pool(db_path)
+        rng = random.Random(args.seed)
+        with db_pool.get_pool().writer() as conn:
+            conn.executemany(
+                "INSERT INTO escalations (user_id, feedback_text, priority, created_at) VALUES (?, ?, ?, ?)",
+                ((rng.randint(1, args.users), "backlog", rng.randint(0, 3), time.time()) for _ in range(args.backlog)))
+
+        print(f"🔄 {args.producers} producers enqueue {args.cases:,} cases while {args.agents} agents "
+              f"claim and resolve them ({args.backlog:,} already queued)...")
+        recorder = LatencyRecorder()
+        done = threading.Event()
+        handled = []
+        agents = [threading.Thread(target=agent, args=(escalation, agent_id, done, recorder, handled))
+                  for agent_id in range(1, args.agents + 1)]
+        producers = [threading.Thread(target=producer, args=(escalation, args.cases // args.producers, args.users,
+                                                             random.Random(rng.random()), recorder))
+                     for _ in range(args.producers)]
+        start = time.perf_counter()
+        for thread in agents + producers:
+            thread.start()
+        for thread in producers:
+            thread.join()
+        done.set()
+        for thread in agents:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        recorder.report(wall, len(handled))
+        expected = args.backlog + args.cases // args.producers * args.producers
+        duplicates = len(handled) - len(set(handled))
+        print(f"   {len(handled):,}/{expected:,} cases handled, {duplicates} claimed twice.")
+        print(f"   {escalation.queue_stats(window_seconds=wall + 60)}")
+    finally:
+        db_pool.get_pool().close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import random
+import sys
+import time
+
+from intent_router import IntentRouter
+
+# ✅ Base Keyword Sets (copied from chatbot.py so the benchmark needs no speech/Gemini deps)
+BASE_INTENTS = {
+    "maintenance": ["maintain", "maintenance", "maintainance", "maintaining", "maintenance plan"],
+    "servicing": ["service", "servicing", "services", "schedule service", "service plan"],
+    "warranty": ["warranty"],
+    "refrigerator": [
+        "refrigerator", "fridge", "cooling", "freezer", "compressor", "defrost", "temperature",
+        "ice maker", "coolant", "refrigerant", "door seal", "power consumption", "energy efficiency",
+        "smart fridge", "inverter technology", "multi-door", "single-door", "double-door",
+        "humidity control", "vegetable crisper", "water dispenser", "noise issue", "thermostat",
+        "food storage", "odors", "auto-defrost", "LED display",
+    ],
+}
+PRIORITIES = {"maintenance": 30, "servicing": 20, "warranty": 10, "refrigerator": 0}
+
+FILLER = ("hello i bought this unit last year and since then it has been making a strange "
+          "sound at night the kitchen gets warm and my family is not happy about it").split()
+
+SCALES = [1, 10, 100]
+TRANSCRIPT_WORDS = [20, 500, 5000]
+MESSAGES = 200
+
+
+def scaled_intents(scale, rng):
+    """Pads every intent with synthetic part/model names until it is `scale` times larger."""
+    intents = {}
+    for name, keywords in BASE_INTENTS.items():
+        extra = [f"{name[:4]}{rng.randrange(10 ** 6)} {rng.choice(FILLER)}"
+                 for _ in range(len(keywords) * (scale - 1))]
+        intents[name] = keywords + extra
+    return intents
+
+
+def make_transcripts(words, rng):
+    """Chat-like filler where roughly half the messages mention one real keyword somewhere."""
+    keywords = [keyword for keywords in BASE_INTENTS.values() for keyword in keywords]
+    transcripts = []
+    for _ in range(MESSAGES):
+        text = [rng.choice(FILLER) for _ in range(words)]
+        if rng.random() < 0.5:
+            text.insert(rng.randrange(words), rng.choice(keywords))
+        transcripts.append(" ".join(text))
+    return transcripts
+
+
+def route_linear(intents, text):
+    """The original chat-loop pattern: one any(...) substring scan per intent, in priority order."""
+    text = text.lower()
+    for name in sorted(intents, key=lambda n: -PRIORITIES[n]):
+        if any(keyword.lower() in text for keyword in intents[name]):
+            return name
+    return None
+
+
+def main(seed=7):
+    rng = random.Random(seed)
+    print(f"{'keywords':>8} | {'words':>5} | {'linear (µs/msg)':>15} | {'router (µs/msg)':>15} | speedup")
+    for scale in SCALES:
+        intents = scaled_intents(scale, rng)
+        router = IntentRouter()
+        for name, keywords in intents.items():
+            router.add_intent(name, keywords, PRIORITIES[name])
+        router.compile()
+        total_keywords = sum(len(keywords) for keywords in intents.values())
+
+        for words in TRANSCRIPT_WORDS:
+            transcripts = make_transcripts(words, rng)
+
+            start = time.perf_counter()
+            for text in transcripts:
+                route_linear(intents, text)
+            linear = (time.perf_counter() - start) / MESSAGES * 1e6
+
+            start = time.perf_counter()
+            for text in transcripts:
+                router.route(text)
+            routed = (time.perf_counter() - start) / MESSAGES * 1e6
+
+            print(f"{total_keywords:>8} | {words:>5} | {linear:>15,.1f} | {routed:>15,.1f} | {linear / routed:.1f}x")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
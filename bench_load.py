@@ -0,0 +1,154 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ✅ Scripted Chat Turns & Feedback (mirrors what customers send through chatbot.py / main.py)
+CHAT_SCRIPTS = [
+    ["what is my warranty status", "my fridge compressor is making noise", "exit"],
+    ["tell me about my maintenance plan", "the freezer is not cooling enough", "exit"],
+    ["is my refrigerator still under warranty", "how often should I defrost the freezer", "exit"],
+    ["my ice maker stopped working", "what maintenance plan do I have", "warranty please", "exit"],
+]
+FEEDBACK_TEXTS = [
+    "I am happy with the service, thank you!",
+    "The door seal has an issue and I am frustrated.",
+    "The technician visited today.",
+    "Terrible noise from the compressor, very bad.",
+    "Excellent support, really satisfied.",
+]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    @contextlib.contextmanager
+    def measure(self, operation):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.samples.setdefault(operation, []).append(elapsed)
+
+    def report(self, wall_seconds, sessions):
+        print(f"\n{'operation':<14} | {'count':>7} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'ops/sec':>9}")
+        total = 0
+        for operation in sorted(self.samples):
+            values = sorted(self.samples[operation])
+            total += len(values)
+            print(f"{operation:<14} | {len(values):>7,} | {percentile(values, 0.50) * 1000:>8.2f} | "
+                  f"{percentile(values, 0.95) * 1000:>8.2f} | {percentile(values, 0.99) * 1000:>8.2f} | "
+                  f"{len(values) / wall_seconds:>9,.0f}")
+        print(f"\n✅ {sessions:,} sessions, {total:,} operations in {wall_seconds:.2f}s "
+              f"({sessions / wall_seconds:,.1f} sessions/sec, {total / wall_seconds:,.0f} ops/sec)")
+
+
+def run_session(chatbot, sentiment_analysis, sentiment_engine, users, rng, recorder):
+    """One customer: log in, replay a chat script, then leave a piece of feedback."""
+    user_id = rng.randint(1, users)
+    email = f"user{user_id}@example.com"
+    with recorder.measure("login"):
+        chatbot.is_valid_email(email)
+
+    for message in rng.choice(CHAT_SCRIPTS):
+        if message == "exit":
+            break
+        with recorder.measure("route"):
+            intent = chatbot.chat_router.route(message)
+        if intent == "maintenance":
+            with recorder.measure("maintenance"):
+                chatbot.get_maintenance_plan(email)
+        elif intent == "warranty":
+            with recorder.measure("warranty"):
+                chatbot.get_warranty_info(email)
+        else:
+            with recorder.measure("chat"):
+                chatbot.chatbot_response(message)
+
+    text = rng.choice(FEEDBACK_TEXTS)
+    with recorder.measure("feedback"):
+        sentiment = sentiment_engine.analyze_sentiment(text)
+        sentiment_analysis.log_feedback(user_id, text, sentiment)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay scripted chat sessions and feedback against a stub Gemini API.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--feedback", type=int, default=100000, help="Pre-existing feedback rows to generate")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--gemini-delay", type=float, default=0.05, help="Stub Gemini latency in seconds")
+    parser.add_argument("--llm-cache", action="store_true", help="Enable the persistent Gemini response cache")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="Reuse an existing generated database instead of building one")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_load_")
+    os.environ["LLM_CACHE"] = "1" if args.llm_cache else "0"
+    os.environ["LLM_CACHE_PATH"] = os.path.join(workdir, "llm_cache.db")
+
+    # Imported after the environment is set so module-level settings pick it up.
+    import chatbot
+    import db_pool
+    import gemini_client
+    import sentiment_analysis
+    import sentiment_engine
+    from data_generator import generate
+    from feedback_writer import get_feedback_writer
+    from stub_gemini import start_stub_server
+
+    try:
+        db_path = args.db
+        if db_path is None:
+            db_path = os.path.join(workdir, "load.db")
+            print(f"🔄 Generating {args.users:,} users and {args.feedback:,} feedback rows...")
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate(db_path, users=args.users, feedback=args.feedback, seed=args.seed)
+        db_pool.init_pool(db_path)
+
+        server, base_url = start_stub_server(delay=args.gemini_delay)
+        gemini_client.set_client(gemini_client.GeminiClient(api_key="stub", base_url=base_url))
+
+        print(f"🔄 Replaying {args.sessions:,} sessions with {args.concurrency} concurrent...")
+        recorder = LatencyRecorder()
+        rng = random.Random(args.seed)
+        seeds = [rng.random() for _ in range(args.sessions)]
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # log_feedback prints per call
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                futures = [pool.submit(run_session, chatbot, sentiment_analysis, sentiment_engine,
+                                       args.users, random.Random(seed), recorder) for seed in seeds]
+                for future in futures:
+                    future.result()
+            with recorder.measure("feedback_flush"):
+                get_feedback_writer().flush()
+        wall = time.perf_counter() - start
+
+        recorder.report(wall, args.sessions)
+        print(f"   Gemini stub served {server.requests:,} requests.")
+        server.shutdown()
+    finally:
+        get_feedback_writer().close()
+        db_pool.get_pool().close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
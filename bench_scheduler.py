@@ -0,0 +1,100 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from bench_load import LatencyRecorder
+
+
+def customer(scheduler, user_ids, recorder, outcomes):
+    """Each customer asks for the next free day and books it, retrying on the day the scheduler suggests."""
+    for user_id in user_ids:
+        with recorder.measure("next_day"):
+            day = scheduler.next_available_day()
+        attempts = 0
+        while day is not None:
+            attempts += 1
+            try:
+                with recorder.measure("book"):
+                    scheduler.book(user_id, day)
+                break
+            except scheduler.SlotUnavailable as e:
+                day = e.next_available
+        outcomes.append((user_id, day is not None, attempts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Many sessions booking service slots at once.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--sessions", type=int, default=32, help="Customers booking concurrently")
+    parser.add_argument("--bookings", type=int, default=3000)
+    parser.add_argument("--technicians", type=int, default=20)
+    parser.add_argument("--slots-per-day", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Read by scheduler.py at import time, so they must be set first.
+    os.environ["SERVICE_TECHNICIANS"] = str(args.technicians)
+    os.environ["SERVICE_SLOTS_PER_DAY"] = str(args.slots_per_day)
+    import db_pool
+    import scheduler
+    from data_generator import generate
+
+    workdir = tempfile.mkdtemp(prefix="bench_scheduler_")
+    try:
+        db_path = os.path.join(workdir, "scheduler.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate(db_path, users=args.users, feedback=0, seed=args.seed)
+        db_pool.init_pool(db_path)
+        capacity = db_pool.fetch_one("SELECT SUM(capacity) FROM service_slots")[0]
+
+        print(f"🔄 {args.sessions} sessions book {args.bookings:,} services into {capacity:,} slots "
+              f"({args.technicians} technicians x {args.slots_per_day}/day)...")
+        user_ids = random.Random(args.seed).sample(range(1, args.users + 1), args.bookings)
+        recorder = LatencyRecorder()
+        outcomes = []
+        threads = [threading.Thread(target=customer, args=(scheduler, user_ids[i::args.sessions], recorder, outcomes))
+                   for i in range(args.sessions)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+        recorder.report(wall, len(outcomes))
+
+        booked = sum(1 for _, ok, _ in outcomes if ok)
+        retries = sum(attempts - 1 for _, _, attempts in outcomes)
+        overbooked = db_pool.fetch_one("SELECT COUNT(*) FROM service_slots WHERE booked > capacity")[0]
+        mismatched = db_pool.fetch_one("""
+            SELECT COUNT(*) FROM service_slots LEFT JOIN (
+                SELECT day, technician_id, COUNT(*) AS active FROM service_bookings WHERE status = 'booked'
+                GROUP BY day, technician_id) AS bookings USING (day, technician_id)
+            WHERE service_slots.booked != COALESCE(bookings.active, 0)""")[0]
+        print(f"   {booked:,}/{len(outcomes):,} booked, {retries:,} retries on a day filled meanwhile, "
+              f"{overbooked} slots over capacity, {mismatched} slots whose count disagrees with bookings.")
+
+        # Next-free-day lookup: calendar bisect vs. asking SQLite every time.
+        today = scheduler.datetime.date.today().isoformat()
+        rounds = 20000
+        start = time.perf_counter()
+        for _ in range(rounds):
+            scheduler.next_available_day(today)
+        calendar_us = (time.perf_counter() - start) / rounds * 1e6
+        start = time.perf_counter()
+        for _ in range(rounds // 10):
+            db_pool.fetch_one("SELECT MIN(day) FROM service_slots WHERE day >= ? AND booked < capacity", (today,))
+        sql_us = (time.perf_counter() - start) / (rounds // 10) * 1e6
+        print(f"   next available day: {calendar_us:.1f} us from the calendar vs {sql_us:.1f} us per SQL query.")
+    finally:
+        db_pool.get_pool().close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
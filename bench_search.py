@@ -0,0 +1,121 @@
+import argparse
+import contextlib
+import datetime
+import io
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import data_generator
+import feedback_search
+
+# Rare complaints mixed into the generated feedback, so some queries are needles in a haystack.
+RARE_TEXTS = [
+    "The compressor keeps clicking since the power outage last night.",
+    "Water dispenser leaks onto the floor after the power outage.",
+    "Door seal is torn near the hinge, cold air escapes.",
+]
+
+QUERIES = [
+    ("compressor noise", {}),
+    ("door seal", {"sentiment": "negative"}),
+    ("power outage", {}),
+    ("ice maker", {"since": (datetime.date.today() - datetime.timedelta(days=30)).isoformat()}),  # Last 30 generated days
+    ("thermostat", {"user_id": 42}),
+]
+
+
+def like_query(text, filters, limit=None):
+    """The LIKE scan agents would have to run today: every word somewhere in the text.
+
+    LIKE can't rank, so "top 20" is simply the first 20 rows the scan finds.
+    """
+    conditions = ["feedback_text LIKE ?" for _ in text.split()]
+    params = [f"%{word}%" for word in text.split()]
+    if "sentiment" in filters:
+        conditions.append("UPPER(sentiment) = ?")
+        params.append(filters["sentiment"].upper())
+    if "user_id" in filters:
+        conditions.append("user_id = ?")
+        params.append(filters["user_id"])
+    if "since" in filters:
+        conditions.append("timestamp >= ?")
+        params.append(filters["since"])
+    where = " AND ".join(conditions)
+    if limit is None:
+        return f"SELECT COUNT(*) FROM feedback WHERE {where}", params
+    return f"SELECT id, feedback_text FROM feedback WHERE {where} LIMIT {limit}", params
+
+
+def timed_median(func, repeat):
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FTS5 feedback search with LIKE scans.")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--feedback", type=int, default=2000000)
+    parser.add_argument("--rare", type=int, default=300, help="Rare complaints to mix in")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="Reuse an existing generated database instead of building one")
+    args = parser.parse_args()
+
+    from migrations import migrate
+
+    workdir = tempfile.mkdtemp(prefix="bench_search_")
+    try:
+        db_path = args.db
+        if db_path is None:
+            db_path = os.path.join(workdir, "search.db")
+            print(f"🔄 Generating {args.users:,} users and {args.feedback:,} feedback rows...")
+            with contextlib.redirect_stdout(io.StringIO()):
+                data_generator.generate(db_path, users=args.users, feedback=args.feedback, seed=args.seed)
+        conn = sqlite3.connect(db_path)
+        migrate(conn, verbose=False)
+        rng = random.Random(args.seed)
+        with conn:
+            conn.executemany("INSERT INTO feedback (user_id, feedback_text, sentiment) VALUES (?, ?, 'NEGATIVE')",
+                             ((rng.randint(1, args.users), rng.choice(RARE_TEXTS)) for _ in range(args.rare)))
+
+        start = time.perf_counter()
+        indexed = feedback_search.backfill(conn)
+        backfill_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        feedback_search.optimize(conn)
+        print(f"✅ Backfilled {indexed:,} rows in {backfill_seconds:.1f}s ({indexed / max(backfill_seconds, 1e-9):,.0f} rows/sec), "
+              f"optimized in {time.perf_counter() - start:.1f}s.")
+
+        print(f"\n{'query':<34} | {'LIKE top20':>10} | {'FTS top20':>10} | {'LIKE count':>10} | {'FTS count':>10} | {'hits':>16}")
+        for text, filters in QUERIES:
+            label = text + "".join(f" {key}={value}" for key, value in filters.items())
+            like_top_ms, _ = timed_median(lambda: conn.execute(*like_query(text, filters, 20)).fetchall(), args.repeat)
+            fts_top_ms, _ = timed_median(lambda: feedback_search.search(conn, text, limit=20, **filters), args.repeat)
+            like_count_ms, like_hits = timed_median(lambda: conn.execute(*like_query(text, filters)).fetchone()[0],
+                                                    args.repeat)
+            fts_count_ms, fts_hits = timed_median(lambda: feedback_search.count(conn, text, **filters), args.repeat)
+            print(f"{label[:34]:<34} | {like_top_ms:>8.1f}ms | {fts_top_ms:>8.1f}ms | {like_count_ms:>8.1f}ms | "
+                  f"{fts_count_ms:>8.1f}ms | {like_hits:>7,}/{fts_hits:<7,}")
+        print("   hits are LIKE/FTS: LIKE also matches inside words, FTS matches stemmed whole words. FTS top20")
+        print("   ranks every match with bm25, so its cost grows with the number of matches, not the table size.")
+
+        size = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'feedback_fts%'").fetchone()[0] \
+            if conn.execute("SELECT 1 FROM pragma_module_list WHERE name = 'dbstat'").fetchone() else None
+        if size:
+            print(f"   Index size: {size / 1e6:,.1f} MB")
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
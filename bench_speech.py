@@ -0,0 +1,81 @@
+import argparse
+import math
+import os
+import shutil
+import struct
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+from speech_worker import RECOGNIZERS, SpeechError, transcribe, wav_source
+
+# "none" skips recognition so the capture/chunking pipeline itself can be measured offline.
+BACKENDS = dict(RECOGNIZERS, none=lambda recognizer, audio: f"{len(audio.frame_data)} bytes")
+
+
+def write_test_wav(path, seconds, rate=16000):
+    """Writes a mono 16-bit tone so the benchmark runs without any recordings."""
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        frames = bytearray()
+        for i in range(int(seconds * rate)):
+            frames += struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / rate)))
+        f.writeframes(bytes(frames))
+
+
+def wav_seconds(path):
+    with wave.open(path, "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless speech recognition throughput on WAV files.")
+    parser.add_argument("paths", nargs="*", help="WAV files or directories (default: generated tones)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="none")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-seconds", type=float, default=15)
+    parser.add_argument("--generate", type=int, default=20, help="Number of test files when no paths are given")
+    args = parser.parse_args()
+
+    workdir = None
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(".wav"))
+        else:
+            files.append(path)
+    if not files:
+        workdir = tempfile.mkdtemp(prefix="bench_speech_")
+        template = os.path.join(workdir, "tone.wav")
+        write_test_wav(template, 30)
+        for i in range(args.generate):
+            files.append(os.path.join(workdir, f"clip{i}.wav"))
+            shutil.copyfile(template, files[-1])
+
+    def run(path):
+        try:
+            transcribe(wav_source(path), recognize=BACKENDS[args.backend], max_retries=0,
+                       chunk_seconds=args.chunk_seconds)
+            return True
+        except SpeechError:
+            return False
+
+    audio_seconds = sum(wav_seconds(path) for path in files)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(run, files))
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ {len(files)} files ({audio_seconds:.0f}s of audio) with backend '{args.backend}' "
+          f"and {args.workers} workers in {elapsed:.2f}s")
+    print(f"   {len(files) / elapsed:.1f} files/sec, {audio_seconds / elapsed:.0f}x real time, "
+          f"{results.count(False)} failed")
+    if workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
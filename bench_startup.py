@@ -0,0 +1,81 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# ✅ Startup Budgets: median cumulative import time (ms) per entry module, and the heavy
+# modules it must not load at import time (they belong to a mode that may never be used).
+HEAVY_MODULES = ("PyQt5", "speech_recognition", "requests")
+TARGETS = {
+    "main": (25, HEAVY_MODULES + ("chatbot", "asyncio")),
+    "chatbot": (80, HEAVY_MODULES),
+    "chat_server": (150, HEAVY_MODULES),
+    "sentiment_analysis": (400, ("requests",)),
+}
+
+
+def import_times(module):
+    """Imports `module` in a fresh interpreter; returns {imported module: (self_us, cumulative_us)}.
+
+    Only `module` and what it pulled in are kept; interpreter startup (site, .pth files) is not
+    the entry point's cost. -X importtime prints children before their parent, indented.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    subtree = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        subtree[name.strip()] = (int(own), int(cumulative))
+        if not name.startswith("  "):  # A top-level import closes its subtree
+            if name.strip() == module:
+                return subtree
+            subtree = {}
+    raise RuntimeError(f"{module} not found in the -X importtime output")
+
+
+def measure(module, runs):
+    """Median cumulative import time in ms over `runs` interpreters, plus the last run's breakdown."""
+    samples = []
+    for _ in range(runs):
+        times = import_times(module)
+        samples.append(times[module][1] / 1000)
+    return statistics.median(samples), times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check entry-point import times (python -X importtime) against a budget.")
+    parser.add_argument("modules", nargs="*", default=list(TARGETS), help="Entry modules to check")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module (the median is used)")
+    parser.add_argument("--budget-ms", type=float, help="Override every module's budget")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to list per module")
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.modules:
+        budget, forbidden = TARGETS.get(module, (None, ()))
+        budget = args.budget_ms or budget
+        median, times = measure(module, args.runs)
+        loaded = sorted(name for name in forbidden if name in times)
+        within = budget is None or median <= budget
+        print(f"{'✅' if within and not loaded else '❌'} {module:<20} {median:7.1f} ms"
+              + (f" (budget {budget:.0f} ms)" if budget else ""))
+        slowest = sorted((cumulative, name) for name, (_, cumulative) in times.items() if name != module)[-args.top:]
+        for cumulative, name in reversed(slowest):
+            print(f"      {cumulative / 1000:7.1f} ms  {name}")
+        if not within:
+            failures.append(f"{module} took {median:.1f} ms (budget {budget:.0f} ms)")
+        if loaded:
+            failures.append(f"{module} loads {', '.join(loaded)} at import time")
+
+    for failure in failures:
+        print(f"⚠️ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
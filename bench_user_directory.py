@@ -0,0 +1,73 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+
+def per_call_us(func, emails):
+    start = time.perf_counter()
+    for email in emails:
+        func(email)
+    return (time.perf_counter() - start) / len(emails) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="User directory vs. SQLite for email validation and user lookup.")
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="Reuse an existing generated database instead of building one")
+    args = parser.parse_args()
+
+    import db_pool
+    from data_generator import generate
+    from user_directory import UserDirectory
+
+    workdir = tempfile.mkdtemp(prefix="bench_user_directory_")
+    try:
+        db_path = args.db
+        if db_path is None:
+            db_path = os.path.join(workdir, "users.db")
+            print(f"🔄 Generating {args.users:,} users...")
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate(db_path, users=args.users, feedback=0, seed=args.seed)
+        db_pool.init_pool(db_path)
+        conn = sqlite3.connect(db_path)
+        emails = [row[0] for row in conn.execute("SELECT email FROM users")]
+        conn.close()
+        rng = random.Random(args.seed)
+        known = rng.choices(emails, k=args.lookups)
+        unknown = [f"nobody{i}@example.invalid" for i in range(args.lookups)]
+
+        directory = UserDirectory(miss_refresh_seconds=float("inf"))
+        start = time.perf_counter()
+        directory.lookup(known[0])
+        load_seconds = time.perf_counter() - start
+        stats = directory.stats()
+        print(f"✅ Loaded {stats['users']:,} users in {load_seconds:.1f}s, "
+              f"{stats['memory_bytes'] / 1e6:,.1f} MB ({stats['memory_bytes'] / max(stats['users'], 1):.0f} bytes/user, "
+              f"table {stats['load']:.0%} full).")
+
+        def sql_lookup(email):
+            return db_pool.fetch_one("SELECT id, product_id FROM users WHERE email = ?", (email,))
+
+        print(f"\n{'lookup':<18} | {'SQLite':>10} | {'directory':>10}")
+        for label, sample in (("registered email", known), ("unknown email", unknown)):
+            sql_us = per_call_us(sql_lookup, sample[:args.lookups // 10])
+            directory_us = per_call_us(directory.lookup, sample)
+            print(f"{label:<18} | {sql_us:>8.1f}us | {directory_us:>8.1f}us")
+        stats = directory.stats()
+        print(f"   Bloom filter turned away {stats['rejected']:,} of {args.lookups:,} unknown emails; "
+              f"{stats['false_positives']:,} false positives went on to the table.")
+    finally:
+        db_pool.get_pool().close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from chatbot import (SERVICE_DATE_QUESTION, SERVICE_QUESTION, chat_router, get_service_status,
+                     is_valid_email, respond, respond_stream, schedule_service)
+from gemini_client import iterate_in_thread
+from instrumentation import prometheus_text, snapshot, timed
+
+# ✅ Server Settings (overridable from .env)
+CHAT_HOST = os.getenv("CHAT_HOST", "127.0.0.1")
+CHAT_PORT = int(os.getenv("CHAT_PORT", "8080"))
+CHAT_WORKERS = int(os.getenv("CHAT_WORKERS", "64"))  # Threads for blocking DB and Gemini calls
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "1800"))
+CHAT_MAX_BODY = int(os.getenv("CHAT_MAX_BODY", "65536"))
+
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ChatSession:
+    """Per-customer state: the logged-in email and where they are in the service dialog."""
+    __slots__ = ("id", "email", "pending", "last_seen")
+
+    def __init__(self, email):
+        self.id = secrets.token_urlsafe(16)
+        self.email = email
+        self.pending = None  # None, "confirm" (yes/no) or "date" (waiting for YYYY-MM-DD)
+        self.last_seen = time.monotonic()
+
+
+class ChatServer:
+    """Serves the chatbot to many concurrent sessions over a small JSON HTTP/1.1 API.
+
+    POST /sessions {"email"}             -> 201 {"session_id"}
+    POST /sessions/<id>/messages {"text"} -> 200 {"reply", "pending"}
+    POST /sessions/<id>/messages?stream=1 -> 200 chunked NDJSON: {"delta"} lines, then {"done", "pending"}
+    DELETE /sessions/<id>                -> 204
+    GET /health                          -> 200 {"sessions"}
+    GET /metrics, GET /metrics.json      -> 200 instrumentation export (Prometheus text or JSON)
+
+    Connections are kept alive. Intent routing runs on the event loop; handlers that hit
+    the database or Gemini run in a pool of `workers` threads via asyncio.to_thread.
+    """
+
+    def __init__(self, workers=CHAT_WORKERS, session_ttl=CHAT_SESSION_TTL):
+        self.workers = workers
+        self.session_ttl = session_ttl
+        self.sessions = {}
+        self.requests = 0
+        self._server = None
+
+    async def start(self, host=CHAT_HOST, port=CHAT_PORT):
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="chat"))
+        self._server = await asyncio.start_server(self._handle_connection, host, port, backlog=4096)
+        self._sweeper = asyncio.create_task(self._expire_sessions())
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _expire_sessions(self):
+        while True:
+            await asyncio.sleep(min(60, self.session_ttl))
+            cutoff = time.monotonic() - self.session_ttl
+            for session_id in [s.id for s in self.sessions.values() if s.last_seen < cutoff]:
+                del self.sessions[session_id]
+
+    # ✅ Chat Logic
+    async def open_session(self, email):
+        email = (email or "").strip()
+        if not await asyncio.to_thread(is_valid_email, email):
+            raise HTTPError(404, "This email is not registered in our system.")
+        session = ChatSession(email)
+        self.sessions[session.id] = session
+        return session
+
+    async def handle_message(self, session, text):
+        """Returns the bot's reply, advancing the service dialog when one is pending."""
+        user_input = text.lower().strip()
+        session.last_seen = time.monotonic()
+
+        if user_input == "exit":
+            self.sessions.pop(session.id, None)
+            return "👋 Goodbye!"
+
+        if session.pending == "confirm":
+            if user_input != "yes":
+                session.pending = None
+                return "Okay, no service scheduled."
+            session.pending = "date"
+            return SERVICE_DATE_QUESTION.strip()
+
+        if session.pending == "date":
+            try:
+                reply = await asyncio.to_thread(schedule_service, session.email, user_input)
+            except ValueError as e:
+                return str(e)  # Stay in the dialog until a usable date arrives
+            session.pending = None
+            return reply
+
+        with timed("route"):
+            intent = chat_router.route(user_input)
+        if intent == "servicing":
+            status = await asyncio.to_thread(get_service_status, session.email)
+            if status is None:
+                return "No service details found for this email."
+            session.pending = "confirm"
+            return f"{status}\n{SERVICE_QUESTION.strip()}"
+        return await asyncio.to_thread(respond, session.email, intent, user_input)
+
+    async def stream_message(self, session, text):
+        """handle_message() as an async generator: Gemini answers are yielded as they arrive."""
+        user_input = text.lower().strip()
+        intent = chat_router.route(user_input) if session.pending is None and user_input != "exit" else "servicing"
+        if intent == "servicing":
+            yield await self.handle_message(session, text)  # Dialog steps are short, fixed replies
+            return
+
+        session.last_seen = time.monotonic()
+        chunks = iterate_in_thread(lambda cancel: respond_stream(session.email, intent, user_input, cancel))
+        async with contextlib.aclosing(chunks):
+            async for chunk in chunks:
+                yield chunk
+
+    # ✅ HTTP Plumbing
+    async def _dispatch(self, method, path, query, body):
+        parts = path.strip("/").split("/")
+        if parts == ["health"] and method == "GET":
+            return 200, {"sessions": len(self.sessions)}
+        if parts == ["metrics"] and method == "GET":
+            return 200, prometheus_text()
+        if parts == ["metrics.json"] and method == "GET":
+            return 200, snapshot()
+        if parts[0] != "sessions":
+            raise HTTPError(404, "Not found.")
+
+        if len(parts) == 1:
+            if method != "POST":
+                raise HTTPError(405, "Use POST to open a session.")
+            session = await self.open_session(body.get("email"))
+            return 201, {"session_id": session.id}
+
+        session = self.sessions.get(parts[1])
+        if session is None:
+            raise HTTPError(404, "Unknown or expired session.")
+        if len(parts) == 2 and method == "DELETE":
+            del self.sessions[session.id]
+            return 204, None
+        if parts[2:] == ["messages"] and method == "POST":
+            text = body.get("text")
+            if not isinstance(text, str):
+                raise HTTPError(400, "Send {\"text\": \"...\"}.")
+            if query.get("stream", ["0"])[0] not in ("", "0", "false"):
+                return 200, self._stream_events(session, text)
+            reply = await self.handle_message(session, text)
+            return 200, {"reply": reply, "pending": session.pending}
+        raise HTTPError(405, "Method not allowed.")
+
+    async def _stream_events(self, session, text):
+        try:
+            async with contextlib.aclosing(self.stream_message(session, text)) as chunks:
+                async for chunk in chunks:
+                    yield {"delta": chunk}
+        except Exception as e:
+            print(f"⚠️ Error while streaming a reply: {e}")
+            yield {"error": "Internal error."}
+            return
+        yield {"done": True, "pending": session.pending}
+
+    async def _read_request(self, reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+        method, target, version = request_line.split(" ", 2)
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", "0"))
+        if length > CHAT_MAX_BODY:
+            raise HTTPError(413, "Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+        keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+        path, _, query = target.partition("?")
+        return method, path, parse_qs(query, keep_blank_values=True), body, keep_alive
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    method, path, query, raw_body, keep_alive = await self._read_request(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break  # Client closed the connection
+                except (ValueError, asyncio.LimitOverrunError):
+                    await self._respond(writer, 400, {"error": "Malformed request."}, False)
+                    break
+                except HTTPError as e:
+                    await self._respond(writer, e.status, {"error": e.message}, False)
+                    break
+
+                self.requests += 1
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                except ValueError:
+                    body = None
+                try:
+                    if not isinstance(body, dict):
+                        raise HTTPError(400, "Body must be a JSON object.")
+                    status, payload = await self._dispatch(method, path, query, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except Exception as e:
+                    print(f"⚠️ Error handling {method} {path}: {e}")
+                    status, payload = 500, {"error": "Internal error."}
+
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        if hasattr(payload, "__aiter__"):
+            await self._respond_stream(writer, status, payload, keep_alive)
+            return
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            body, content_type = b"" if payload is None else json.dumps(payload).encode("utf-8"), "application/json"
+        writer.write((f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+                      f"Content-Type: {content_type}\r\n"
+                      f"Content-Length: {len(body)}\r\n"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+    async def _respond_stream(self, writer, status, events, keep_alive):
+        # One NDJSON line per chunk. drain() after each chunk: a slow reader pauses the
+        # stream (and the Gemini read behind it); a client that hangs up cancels it.
+        writer.write((f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+                      f"Content-Type: application/x-ndjson\r\n"
+                      f"Transfer-Encoding: chunked\r\n"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1"))
+        async with contextlib.aclosing(events):
+            async for event in events:
+                line = json.dumps(event).encode("utf-8") + b"\n"
+                writer.write(f"{len(line):x}\r\n".encode("latin-1") + line + b"\r\n")
+                await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def start_chat_server(host=CHAT_HOST, port=0, workers=CHAT_WORKERS):
+    """Starts a ChatServer on its own event loop in a daemon thread; returns (server, base_url)."""
+    server = ChatServer(workers)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    result = {}
+
+    def run():
+        asyncio.set_event_loop(loop)
+        result["port"] = loop.run_until_complete(server.start(host, port))
+        started.set()
+        loop.run_until_complete(server.serve_forever())
+
+    threading.Thread(target=run, name="chat-server", daemon=True).start()
+    started.wait()
+    return server, f"http://{host}:{result['port']}"
+
+
+async def main(host, port, workers):
+    server = ChatServer(workers)
+    port = await server.start(host, port)
+    print(f"✅ Chat server listening on http://{host}:{port} (POST /sessions to start chatting)")
+    await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the chatbot to many concurrent sessions over HTTP.")
+    parser.add_argument("--host", default=CHAT_HOST)
+    parser.add_argument("--port", type=int, default=CHAT_PORT)
+    parser.add_argument("--workers", type=int, default=CHAT_WORKERS)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        print("👋 Chat server stopped.")
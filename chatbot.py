@@ -1,13 +1,14 @@
-import os
-import requests
-import sqlite3
 import datetime
-import speech_recognition as sr  # ✅ Importing Speech Recognition for Speech-to-Text
-from dotenv import load_dotenv
-
-# ✅ Load API key from .env file
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+import sqlite3
+import time
+from eligibility import eligibility_index, get_eligibility
+from gemini_client import GeminiError, get_client
+from instrumentation import register_collector, timed
+from intent_router import IntentRouter
+from profile_cache import get_profile, profile_cache, update_last_service_date
+from response_cache import LLM_CACHE_ENABLED, get_response_cache
+from scheduler import SlotUnavailable, book, next_available_day, service_calendar
+from user_directory import lookup_user, user_directory
 
 # ✅ Refrigerator-Related Keywords
 refrigerator_keywords = [
@@ -24,194 +25,289 @@ servicing_keywords = ["service", "servicing", "services", "schedule service", "s
 # ✅ Maintenance Keywords
 maintenance_keywords = ["maintain", "maintenance", "maintainance", "maintaining", "maintenance plan"]
 
-# ✅ Function to Validate Email in Database
+# ✅ Intent Router (one compiled pass over all keyword sets; higher priority wins)
+chat_router = IntentRouter()
+chat_router.add_intent("maintenance", maintenance_keywords, priority=30)
+chat_router.add_intent("servicing", servicing_keywords, priority=20)
+chat_router.add_intent("warranty", ["warranty"], priority=10)
+chat_router.add_intent("refrigerator", refrigerator_keywords, priority=0)
+chat_router.compile()
+
+# ✅ Metrics Collectors (exported next to the timings, see instrumentation.py)
+register_collector("profile_cache", profile_cache.stats)
+register_collector("eligibility", eligibility_index.stats)
+register_collector("service_calendar", service_calendar.stats)
+register_collector("user_directory", user_directory.stats)
+register_collector("gemini_stream", lambda: get_client().stream_metrics.stats())
+if LLM_CACHE_ENABLED:
+    register_collector("response_cache", lambda: get_response_cache().stats())
+
+# ✅ Function to Ask Gemini (served from the response cache when possible)
+@timed("ask_gemini")
+def ask_gemini(prompt, fuzzy_text=None):
+    client = get_client()
+    if not LLM_CACHE_ENABLED:
+        return client.generate(prompt)
+    return get_response_cache().get_or_generate(prompt, client.model, client.generate, fuzzy_text)
+
+# ✅ Function to Stream Gemini's Answer as It Is Generated (cached answers arrive in one piece)
+def stream_gemini(prompt, fuzzy_text=None, cancel=None):
+    client = get_client()
+    cache = get_response_cache() if LLM_CACHE_ENABLED else None
+    if cache is not None:
+        cached = cache.get(prompt, client.model, fuzzy_text)
+        if cached is not None:
+            yield cached
+            return
+
+    start = time.perf_counter()
+    parts = []
+    for chunk in client.stream_generate(prompt, cancel):
+        parts.append(chunk)
+        yield chunk
+    if cache is not None and parts and not (cancel is not None and cancel.is_set()):
+        cache.put(prompt, client.model, "".join(parts), time.perf_counter() - start, fuzzy_text)
+
+# ✅ Function to Validate Email (in-memory user directory, see user_directory.py)
+@timed("is_valid_email")
 def is_valid_email(email):
-    conn = sqlite3.connect("electronics_company.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT email FROM users WHERE email = ?", (email,))
-    result = cursor.fetchone()
-    conn.close()
-    return result is not None
-
-# ✅ Function to Convert Speech to Text
-# ✅ Function to Convert Speech to Text
-def recognize_speech():
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("🎤 Speak now... Adjusting for background noise...")
-        recognizer.adjust_for_ambient_noise(source, duration=1)  # Adjust for noise
+    return lookup_user(email) is not None
 
-        try:
-            audio = recognizer.listen(source, timeout=10)  # ⬆ Increased timeout to 10 seconds
-            text = recognizer.recognize_google(audio).lower()
-            print(f"🗣 Recognized: {text}")
-            return text
-        except sr.WaitTimeoutError:
+# ✅ Function to Convert Speech to Text (bounded retries instead of unbounded recursion)
+@timed("recognize_speech")
+def recognize_speech(max_retries=None):
+    # speech_recognition is only loaded once someone actually talks to the bot.
+    import speech_recognition as sr
+    from speech_worker import SPEECH_MAX_RETRIES, SpeechError, microphone_source, transcribe
+    if max_retries is None:
+        max_retries = SPEECH_MAX_RETRIES
+
+    def announce_retry(error):
+        if isinstance(error, sr.WaitTimeoutError):
             print("⚠️ No speech detected. Please try speaking again.")
-            return recognize_speech()  # Retry speech recognition
-        except sr.UnknownValueError:
+        else:
             print("❌ Couldn't understand the audio. Please try again.")
-            return recognize_speech()  # Retry on failure
-        except sr.RequestError:
+
+    print("🎤 Speak now... Adjusting for background noise...")
+    try:
+        text = transcribe(microphone_source, max_retries=max_retries, listen_timeout=10,
+                          on_retry=announce_retry).lower()
+    except SpeechError as e:
+        if e.reason == "unavailable":
             print("⚠️ API unavailable. Check your internet connection.")
-            return ""
+        else:
+            print(f"⚠️ {e.message} Giving up after {max_retries + 1} attempts.")
+        return ""
+    print(f"🗣 Recognized: {text}")
+    return text
 
 
 # ✅ Function to Fetch AI-Predicted Service Cost
+@timed("get_dynamic_service_price")
 def get_dynamic_service_price(model):
     prompt = f"""
     Provide an estimated servicing cost for a {model} refrigerator.
     Consider warranty status, age, common issues, and brand reputation.
     """
     try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-pro-002:generateContent?key={GEMINI_API_KEY}"
-        headers = {"Content-Type": "application/json"}
-        payload = {"contents": [{"parts": [{"text": prompt}]}]}        
-        response = requests.post(url, headers=headers, json=payload)
-        if response.status_code == 200:
-            return response.json()["candidates"][0]["content"]["parts"][0]["text"]
-        else:
-            return "⚠️ Error fetching service cost."
+        return ask_gemini(prompt)
+    except GeminiError:
+        return "⚠️ Error fetching service cost."
     except Exception as e:
         return f"⚠️ API Error: {str(e)}"
 
 # ✅ Function to Fetch Warranty Details
+@timed("get_warranty_info")
 def get_warranty_info(email):
-    conn = sqlite3.connect("electronics_company.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-    SELECT users.name, products.name, users.warranty_expiry
-    FROM users
-    JOIN products ON users.product_id = products.id
-    WHERE users.email = ?
-    """, (email,))
-    user_data = cursor.fetchone()
-    conn.close()
+    profile = get_profile(email)
    
-    if user_data:
-        return f"Hello {user_data[0]}, your {user_data[1]} has a warranty until {user_data[2]}."
+    if profile:
+        return f"Hello {profile.name}, your {profile.product} has a warranty until {profile.warranty_expiry}."
     else:
         return "No warranty details found for this email."
 
 # ✅ Function to Fetch AI-Driven Maintenance Plan Suggestions
-def get_best_maintenance_plan(model, current_plan):
-    prompt = f"""
+def maintenance_plan_prompt(model, current_plan):
+    return f"""
     A user owns a {model} refrigerator and currently has the '{current_plan}' maintenance plan.
     Based on cost, longevity, and energy efficiency, recommend the best maintenance plan:
     - Options: Basic, Standard, or Premium.
     - Ensure the suggestion benefits both the user and the company profit-wise.
     """
+
+@timed("get_best_maintenance_plan")
+def get_best_maintenance_plan(model, current_plan):
     try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-pro-002:generateContent?key={GEMINI_API_KEY}"
-        headers = {"Content-Type": "application/json"}
-        payload = {"contents": [{"parts": [{"text": prompt}]}]}        
-        response = requests.post(url, headers=headers, json=payload)
-        if response.status_code == 200:
-            return response.json()["candidates"][0]["content"]["parts"][0]["text"]
-        else:
-            return "⚠️ Error fetching maintenance plan recommendation."
+        return ask_gemini(maintenance_plan_prompt(model, current_plan))
+    except GeminiError:
+        return "⚠️ Error fetching maintenance plan recommendation."
     except Exception as e:
         return f"⚠️ API Error: {str(e)}"
 
 # ✅ Function to Fetch Maintenance Plan
+@timed("get_maintenance_plan")
 def get_maintenance_plan(email):
-    conn = sqlite3.connect("electronics_company.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-    SELECT users.name, products.name, users.maintenance_plan
-    FROM users
-    JOIN products ON users.product_id = products.id
-    WHERE users.email = ?
-    """, (email,))
-    user_data = cursor.fetchone()
-    conn.close()
-
-    if user_data:
-        name, model, current_plan = user_data
+    profile = get_profile(email)
+
+    if profile:
+        name, model, current_plan = profile.name, profile.product, profile.maintenance_plan
         best_plan = get_best_maintenance_plan(model, current_plan)
         return f"Hello {name}, your current maintenance plan is **'{current_plan}'**.\n\n💡 **Suggested Plan:** {best_plan}"
     else:
         return "No maintenance plan details found for this email."
 
-# ✅ Function to Fetch Last Service Date & Schedule Service
+def stream_maintenance_plan(email, cancel=None):
+    """Streaming get_maintenance_plan(): yields the greeting, then the suggestion as it arrives."""
+    profile = get_profile(email)
+    if not profile:
+        yield "No maintenance plan details found for this email."
+        return
+
+    yield f"Hello {profile.name}, your current maintenance plan is **'{profile.maintenance_plan}'**.\n\n💡 **Suggested Plan:** "
+    try:
+        yield from stream_gemini(maintenance_plan_prompt(profile.product, profile.maintenance_plan), cancel=cancel)
+    except GeminiError:
+        yield "⚠️ Error fetching maintenance plan recommendation."
+    except Exception as e:
+        yield f"⚠️ API Error: {str(e)}"
+
+# ✅ Service Scheduling Steps (shared by the CLI dialog below and chat_server.py)
+SERVICE_QUESTION = "Would you like to schedule a new service? (yes/no): "
+SERVICE_DATE_QUESTION = "Enter the new service date (YYYY-MM-DD), or 'next' for the first available date: "
+
+@timed("get_service_status")
+def get_service_status(email):
+    """Returns the last-service message, or None when the email has no profile."""
+    profile = get_profile(email)
+    if profile:
+        return f"📅 Your last service date was: {profile.last_service_date}."
+    return None
+
+def book_slot(email, profile, day):
+    """Takes a slot on `day` from the scheduler; raises ValueError (with the next free day) when it is full."""
+    try:
+        book(profile.user_id, day)
+    except SlotUnavailable as e:
+        if e.next_available is None:
+            raise ValueError(f"⚠️ Sorry, there is no free slot on {day} and none open after it yet.") from None
+        raise ValueError(f"⚠️ Sorry, there is no free slot on {day}. The next available date is {e.next_available}.") from None
+    except sqlite3.OperationalError as e:
+        if "no such table" not in str(e):
+            # e.g. "database is locked": never record a date without a slot behind it.
+            raise ValueError("⚠️ Sorry, we couldn't book your service right now. Please try again.") from None
+        update_last_service_date(email, day)  # Scheduler tables not migrated yet: just record the date
+    else:
+        profile_cache.invalidate(email)  # book() updated users.last_service_date
+
+
+@timed("schedule_service")
+def schedule_service(email, new_service_date):
+    """Books a service; raises ValueError with a message for the user when the date is not usable."""
+    profile = get_profile(email)
+    if not profile:
+        return "No service details found for this email."
+
+    if new_service_date.strip().lower() == "next":
+        try:
+            new_service_date = next_available_day()
+        except sqlite3.OperationalError:
+            new_service_date = None
+        if new_service_date is None:
+            raise ValueError("⚠️ No service slots are open at the moment. Please enter a date (YYYY-MM-DD).")
+
+    try:
+        new_date = datetime.datetime.strptime(new_service_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("⚠️ Error: Invalid date format. Please use YYYY-MM-DD.") from None
+    today = datetime.date.today()
+    if new_date < today:
+        raise ValueError("⚠️ Error: The selected date is in the past. Please choose a future date.")
+
+    book_slot(email, profile, new_date.isoformat())
+    eligibility = get_eligibility(profile.user_id)
+    if eligibility is not None and eligibility.free_service:
+        return f"✅ Your **free service** has been scheduled for {new_service_date}!"
+    else:
+        service_cost = get_dynamic_service_price(profile.product)
+        return f"🔴 Your service has been scheduled !! Your warranty has expired. **Estimated service cost:** {service_cost}"
+
+# ✅ Function to Fetch Last Service Date & Schedule Service (interactive CLI dialog)
+@timed("get_service_info")
 def get_service_info(email):
-    conn = sqlite3.connect("electronics_company.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-    SELECT users.name, products.name, users.last_service_date, users.warranty_expiry
-    FROM users
-    JOIN products ON users.product_id = products.id
-    WHERE users.email = ?
-    """, (email,))
-    user_data = cursor.fetchone()
-    conn.close()
-
-    if user_data:
-        name, model, last_service_date, warranty_expiry = user_data
-        today = datetime.date.today()
-        warranty_expiry_date = datetime.datetime.strptime(warranty_expiry, "%Y-%m-%d").date()
-
-        print(f"📅 Your last service date was: {last_service_date}.")
-        choice = input("Would you like to schedule a new service? (yes/no): ").strip().lower()
-
-        if choice == "yes":
-            while True:
-                new_service_date = input("Enter the new service date (YYYY-MM-DD): ").strip()
-                try:
-                    new_date = datetime.datetime.strptime(new_service_date, "%Y-%m-%d").date()
-                    if new_date < today:
-                        print("⚠️ Error: The selected date is in the past. Please choose a future date.")
-                        continue
-
-                    conn = sqlite3.connect("electronics_company.db")
-                    cursor = conn.cursor()
-                    
-                    if today <= warranty_expiry_date:
-                        cursor.execute("UPDATE users SET last_service_date = ? WHERE email = ?", (new_service_date, email))
-                        conn.commit()
-                        conn.close()
-                        return f"✅ Your **free service** has been scheduled for {new_service_date}!"
-                    else:
-                        service_cost = get_dynamic_service_price(model)
-                        cursor.execute("UPDATE users SET last_service_date = ? WHERE email = ?", (new_service_date, email))
-                        conn.commit()
-                        conn.close()
-                        return f"🔴 Your service has been scheduled !! Your warranty has expired. **Estimated service cost:** {service_cost}"
-
-                except ValueError:
-                    print("⚠️ Error: Invalid date format. Please use YYYY-MM-DD.")
-                    continue
-        else:
-            return "Okay, no service scheduled."
-    
-    return "No service details found for this email."
+    status = get_service_status(email)
+    if status is None:
+        return "No service details found for this email."
+
+    print(status)
+    choice = input(SERVICE_QUESTION).strip().lower()
+    if choice != "yes":
+        return "Okay, no service scheduled."
+
+    while True:
+        try:
+            return schedule_service(email, input(SERVICE_DATE_QUESTION).strip())
+        except ValueError as e:
+            print(e)
+
 # ✅ Function to Get Chatbot Response Using Gemini AI API (Restricted to Refrigerators)
+OFF_TOPIC_REPLY = "⚠️ I can only assist with **refrigerator-related queries**. Let me know if you need help with refrigerator warranty, maintenance, or servicing."
+
+@timed("chatbot_response")
 def chatbot_response(user_input):
-    if not any(keyword in user_input.lower() for keyword in refrigerator_keywords):
-        return "⚠️ I can only assist with **refrigerator-related queries**. Let me know if you need help with refrigerator warranty, maintenance, or servicing."
+    if "refrigerator" not in chat_router.intents(user_input):
+        return OFF_TOPIC_REPLY
 
     prompt = f"Answer this question specifically about refrigerators: {user_input}"
 
     try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-pro-002:generateContent?key={GEMINI_API_KEY}"
-        headers = {"Content-Type": "application/json"}
-        payload = {"contents": [{"parts": [{"text": prompt}]}]}        
-        response = requests.post(url, headers=headers, json=payload)
-
-        if response.status_code == 200:
-            return response.json()["candidates"][0]["content"]["parts"][0]["text"]
-        else:
-            return f"⚠️ API Error: {response.json()}"
+        return ask_gemini(prompt, fuzzy_text=user_input)  # Near-duplicates compare the question, not the template
+    except GeminiError as e:
+        return f"⚠️ API Error: {e.body}"
     except Exception as e:
         return f"⚠️ Error: {str(e)}"
 
+def stream_chatbot_response(user_input, cancel=None):
+    """Streaming chatbot_response(): yields the answer piece by piece."""
+    if "refrigerator" not in chat_router.intents(user_input):
+        yield OFF_TOPIC_REPLY
+        return
+
+    prompt = f"Answer this question specifically about refrigerators: {user_input}"
+
+    try:
+        yield from stream_gemini(prompt, fuzzy_text=user_input, cancel=cancel)
+    except GeminiError as e:
+        yield f"⚠️ API Error: {e.body}"
+    except Exception as e:
+        yield f"⚠️ Error: {str(e)}"
+
+# ✅ Function to Answer One Message (servicing is a dialog, handled by the caller)
+def respond(email, intent, user_input):
+    if intent == "maintenance":
+        return get_maintenance_plan(email)
+    elif intent == "warranty":
+        return get_warranty_info(email)
+    else:
+        return chatbot_response(user_input)
+
+def respond_stream(email, intent, user_input, cancel=None):
+    """Like respond(), but yields the reply in pieces as Gemini generates it."""
+    if intent == "maintenance":
+        yield from stream_maintenance_plan(email, cancel)
+    elif intent == "warranty":
+        yield get_warranty_info(email)
+    else:
+        yield from stream_chatbot_response(user_input, cancel)
+
 # ✅ Chatbot Interaction Loop (Now Includes Speech Recognition)
-if __name__ == "__main__":
-    email = input("Enter your registered email: ").strip()
+def main(email=None):
+    """Runs the CLI chat; main.py passes an email it has already validated."""
+    if email is None:
+        email = input("Enter your registered email: ").strip()
 
-    if not is_valid_email(email):
-        print("⚠️ Error: This email is not registered.")
-        exit()
+        if not is_valid_email(email):
+            print("⚠️ Error: This email is not registered.")
+            return
 
     while True:
         choice = input("\nDo you want to type or speak? (type/speak): ").strip().lower()
@@ -226,13 +322,23 @@ if __name__ == "__main__":
         if user_input == "exit":
             print("👋 Goodbye!")
             break
-        elif any(word in user_input for word in maintenance_keywords):
-            response = get_maintenance_plan(email)
-        elif any(word in user_input for word in servicing_keywords):
-            response = get_service_info(email)
-        elif "warranty" in user_input:
-            response = get_warranty_info(email)
-        else:
-            response = chatbot_response(user_input) 
 
-        print("Bot:", response)
+        with timed("route"):
+            intent = chat_router.route(user_input)
+        if intent == "servicing":
+            print("Bot:", get_service_info(email))
+            continue
+
+        # Print the answer as it streams in; Ctrl+C stops a long answer and keeps the chat going.
+        print("Bot:", end=" ", flush=True)
+        reply = respond_stream(email, intent, user_input)
+        try:
+            for chunk in reply:
+                print(chunk, end="", flush=True)
+        except KeyboardInterrupt:
+            reply.close()
+            print(" ⏹ (stopped)", end="")
+        print()
+
+if __name__ == "__main__":
+    main()
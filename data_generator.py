@@ -0,0 +1,174 @@
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import time
+
+from db_pool import DB_PATH
+
+# ✅ Building Blocks for Synthetic Rows
+BRANDS = ["LG", "Samsung", "Whirlpool", "Bosch", "Haier", "Godrej", "Panasonic", "Hitachi"]
+LINES = ["Smart Fridge", "Double Door", "Compact", "Side-by-Side", "French Door", "Single Door"]
+FIRST_NAMES = ["Alice", "Bob", "Carol", "Dan", "Eve", "Farah", "Gita", "Hiro", "Ivan", "Jui", "Kofi", "Lena"]
+LAST_NAMES = ["Johnson", "Smith", "Patel", "Garcia", "Kim", "Nguyen", "Okafor", "Rossi", "Sato", "Weber"]
+PLANS = ["Basic", "Standard", "Premium"]
+
+FEEDBACK_TEMPLATES = {
+    "POSITIVE": [
+        "I am happy with my {part}, it works great!",
+        "Excellent service, the {part} was fixed quickly. Thank you!",
+        "Really satisfied with the {part} after the last visit.",
+    ],
+    "NEGATIVE": [
+        "The {part} has an issue again and I am frustrated.",
+        "Terrible experience, the {part} stopped working.",
+        "Poor quality {part}, very bad noise at night.",
+    ],
+    "NEUTRAL": [
+        "The technician checked the {part} today.",
+        "Can you tell me when the {part} should be cleaned?",
+        "I replaced the {part} filter last week.",
+    ],
+}
+PARTS = ["compressor", "door seal", "ice maker", "thermostat", "water dispenser", "freezer", "defrost timer"]
+SENTIMENTS = list(FEEDBACK_TEMPLATES)
+
+
+def _batched(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _next_id(conn, table):
+    return conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+
+
+def _products(rng, start, count):
+    for i in range(start, start + count):
+        name = f"{rng.choice(BRANDS)} {rng.choice(LINES)} {i}"
+        yield (i, name, "Refrigerator", rng.choice([12, 18, 24, 36]), round(rng.uniform(299, 2999), 2))
+
+
+def _users(rng, start, count, product_ids, today):
+    for i in range(start, start + count):
+        expiry = today + datetime.timedelta(days=rng.randint(-730, 1095))
+        serviced = today - datetime.timedelta(days=rng.randint(0, 720))
+        yield (i, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"user{i}@example.com",
+               rng.randint(1, product_ids), expiry.isoformat(), serviced.isoformat(), rng.choice(PLANS), "Neutral")
+
+
+def _feedback(rng, start, count, user_ids, days, today):
+    # Pre-render texts, dates and times once; each row then only indexes into these lists.
+    texts = [(sentiment, [t.format(part=p) for t in templates for p in PARTS])
+             for sentiment, templates in FEEDBACK_TEMPLATES.items()]
+    # The `days` days before `today`, so recent-window queries and rollups see data.
+    first = today - datetime.timedelta(days=days)
+    dates = [(first + datetime.timedelta(days=d)).strftime("%Y-%m-%d") for d in range(days)]
+    times = [f"{h:02d}:{m:02d}:{sec:02d}" for h in range(24) for m in range(60) for sec in range(60)]
+    random_ = rng.random
+    for i in range(start, start + count):
+        sentiment, choices = texts[int(random_() * 3)]
+        yield (i, int(random_() * user_ids) + 1, choices[int(random_() * len(choices))], sentiment,
+               f"{dates[int(random_() * days)]} {times[int(random_() * 86400)]}")
+
+
+def generate(db_path=DB_PATH, users=10000, feedback=100000, products=50, agents=20, offers=10,
+             seed=42, batch_size=50000, days=730, as_of=None):
+    """Appends deterministic synthetic rows to `db_path`, creating the schema if needed.
+
+    The same seed and `as_of` date (default: today; warranty and offer dates are drawn
+    around it, feedback is dated in the `days` days before it) always produce the same rows.
+
+    Rows are inserted in `batch_size` chunks, one transaction each, with fsync relaxed for
+    the duration of the load. Secondary indexes from migrations.py are built after loading
+    when the database is new, which is much faster than maintaining them row by row.
+    """
+    from database import create_database
+    from migrations import migrate
+
+    new_database = not os.path.exists(db_path)
+    if new_database:
+        create_database(db_path, apply_migrations=False)
+
+    rng = random.Random(seed)
+    today = as_of or datetime.date.today()
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")  # 256 MB page cache while loading
+
+    plan = [
+        ("products", "INSERT INTO products (id, name, category, warranty_period, price) VALUES (?, ?, ?, ?, ?)",
+         products, lambda start: _products(rng, start, products)),
+        ("agents", "INSERT INTO agents (id, name, email, phone) VALUES (?, ?, ?, ?)", agents,
+         lambda start: ((i, f"Agent {i}", f"agent{i}@example.com", f"+1555{i:07d}") for i in range(start, start + agents))),
+        ("offers", "INSERT INTO offers (id, offer_details, valid_until) VALUES (?, ?, ?)", offers,
+         lambda start: ((i, f"{rng.randint(5, 30)}% off offer #{i}",
+                         (today + datetime.timedelta(days=rng.randint(-90, 365))).isoformat())
+                        for i in range(start, start + offers))),
+        ("users", """
+         INSERT INTO users (id, name, email, product_id, warranty_expiry, last_service_date, maintenance_plan, sentiment)
+         VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", users,
+         lambda start: _users(rng, start, users, _next_id(conn, "products") - 1, today)),
+        ("feedback", "INSERT INTO feedback (id, user_id, feedback_text, sentiment, timestamp) VALUES (?, ?, ?, ?, ?)",
+         feedback, lambda start: _feedback(rng, start, feedback, _next_id(conn, "users") - 1, days, today)),
+    ]
+
+    total_start = time.perf_counter()
+    for table, sql, count, rows in plan:
+        if not count:
+            continue
+        start = time.perf_counter()
+        done = 0
+        for batch in _batched(rows(_next_id(conn, table)), batch_size):
+            with conn:
+                conn.executemany(sql, batch)
+            done += len(batch)
+            if count > batch_size:
+                print(f"  {table}: {done:,}/{count:,} ({done / (time.perf_counter() - start):,.0f} rows/sec)", flush=True)
+        print(f"✅ {table}: {count:,} rows in {time.perf_counter() - start:.1f}s")
+
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if new_database:
+        print("🛠 Building indexes...")
+        migrate(conn)
+    conn.close()
+    print(f"✅ Generated data in {time.perf_counter() - total_start:.1f}s.")
+
+
+def generate_rows(conn, users, feedback, seed=42):
+    """Fills an already-open (schema-only) database; used by migrations.py verify."""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    with conn:
+        conn.executemany("INSERT INTO products (id, name, category, warranty_period, price) VALUES (?, ?, ?, ?, ?)",
+                         _products(rng, 1, 50))
+        conn.executemany("""
+        INSERT INTO users (id, name, email, product_id, warranty_expiry, last_service_date, maintenance_plan, sentiment)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", _users(rng, 1, users, 50, today))
+        conn.executemany("INSERT INTO feedback (id, user_id, feedback_text, sentiment, timestamp) VALUES (?, ?, ?, ?, ?)",
+                         _feedback(rng, 1, feedback, users, 730, today))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the database with deterministic synthetic data.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--feedback", type=int, default=100000)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--offers", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=730, help="Spread feedback timestamps over this many days")
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, help="Reference date (YYYY-MM-DD), default today")
+    args = parser.parse_args()
+    generate(args.db, args.users, args.feedback, args.products, args.agents, args.offers,
+             args.seed, args.batch_size, args.days, args.as_of)
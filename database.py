@@ -1,9 +1,11 @@
 import sqlite3
+from db_pool import DB_PATH
+from migrations import migrate
 
-def create_database():
+def create_database(db_path=DB_PATH, apply_migrations=True):
     print("🔄 Creating database and tables...")
 
-    conn = sqlite3.connect("electronics_company.db")
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
     # ✅ Create Products Table
@@ -69,6 +71,11 @@ def create_database():
     """)
 
     conn.commit()
+
+    # ✅ Apply Versioned Migrations (indexes etc.; see migrations.py)
+    if apply_migrations:
+        migrate(conn)
+
     conn.close()
 
     print("✅ Database and tables created successfully!")
@@ -0,0 +1,147 @@
+import os
+import queue
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+# ✅ Database Location & Pool Settings (overridable from .env)
+DB_PATH = os.getenv("DB_PATH", "electronics_company.db")
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+STATEMENT_CACHE_SIZE = 256
+
+
+class _Reader:
+    """Holds a thread's read connection in its threading.local; collected when the thread exits."""
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+class ConnectionPool:
+    """Bounded pool of write connections plus one read connection per live thread.
+
+    A thread's read connection is closed when the thread exits, so executor and
+    per-request threads don't leak connections.
+    """
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._local = threading.local()
+        self._all = []
+        self._lock = threading.RLock()  # _release() may run from a finalizer in a thread holding it
+        self._closed = False
+
+    def _connect(self):
+        # check_same_thread=False lets pooled connections move between threads;
+        # each one is only ever used by a single thread at a time.
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    def reader(self):
+        """Returns the calling thread's dedicated read connection."""
+        reader = getattr(self._local, "reader", None)
+        if reader is None:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed.")
+            reader = _Reader(self._connect())
+            weakref.finalize(reader, self._release, reader.conn)
+            self._local.reader = reader
+        return reader.conn
+
+    def _release(self, conn):
+        """Closes a reader whose thread has exited."""
+        with self._lock:
+            try:
+                self._all.remove(conn)
+            except ValueError:
+                return  # Already closed by close()
+        conn.close()
+
+    def open_connections(self):
+        with self._lock:
+            return len(self._all)
+
+    @contextmanager
+    def writer(self):
+        """Borrows a pooled connection; commits on success, rolls back on error."""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed.")
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                with conn:
+                    yield conn
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Closes every connection the pool has handed out."""
+        self._closed = True
+        with self._lock:
+            conns, self._all = self._all, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+        self._local = threading.local()
+
+
+# ✅ Shared Pool Used by chatbot.py and sentiment_analysis.py
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH, POOL_SIZE)
+    return _pool
+
+
+def init_pool(path=DB_PATH, size=POOL_SIZE):
+    """Replaces the shared pool, e.g. to point the app at another database file."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(path, size)
+    return _pool
+
+
+def fetch_one(sql, params=()):
+    return get_pool().reader().execute(sql, params).fetchone()
+
+
+def fetch_all(sql, params=()):
+    return get_pool().reader().execute(sql, params).fetchall()
+
+
+def execute(sql, params=()):
+    """Runs a single write statement in its own transaction and returns the row count."""
+    with get_pool().writer() as conn:
+        return conn.execute(sql, params).rowcount
+
+
+def executemany(sql, rows):
+    with get_pool().writer() as conn:
+        return conn.executemany(sql, rows).rowcount
@@ -0,0 +1,180 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+from db_pool import fetch_all, fetch_one
+from instrumentation import timed
+
+# ✅ Eligibility Settings (overridable from .env)
+ELIGIBILITY_REFRESH_SECONDS = float(os.getenv("ELIGIBILITY_REFRESH_SECONDS", "60"))  # Pick up new users/offers
+
+# SQLite turns DATE text into a day number (date.toordinal()), so Python never parses dates.
+TO_DAY = "CAST(julianday({}) - 1721424.5 AS INTEGER)"
+NEW_USERS = f"SELECT id, {TO_DAY.format('warranty_expiry')} FROM users WHERE id > ? ORDER BY id"
+USER_WARRANTY = f"SELECT {TO_DAY.format('warranty_expiry')} FROM users WHERE id = ?"
+ALL_OFFERS = f"SELECT id, offer_details, {TO_DAY.format('valid_until')} FROM offers ORDER BY id"
+# Users whose warranty changed (or who were deleted) since the last refresh, from the
+# user_changes log (shared with the user directory's email changes).
+CHANGED_USERS = f"""
+SELECT user_changes.seq, user_changes.user_id, {TO_DAY.format('users.warranty_expiry')}
+FROM user_changes LEFT JOIN users ON users.id = user_changes.user_id
+WHERE user_changes.seq > ? ORDER BY user_changes.seq
+"""
+
+# ✅ Migration 10: log warranty changes next to the user directory's email changes
+# The log table and delete trigger are created IF NOT EXISTS exactly as in migration 9,
+# so this migration works on its own as well as after it.
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS user_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS user_changes_delete AFTER DELETE ON users BEGIN
+        INSERT INTO user_changes (user_id) VALUES (OLD.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_changes_warranty AFTER UPDATE OF warranty_expiry ON users
+    WHEN OLD.warranty_expiry IS NOT NEW.warranty_expiry BEGIN
+        INSERT INTO user_changes (user_id) VALUES (NEW.id);
+    END""",
+]
+
+Eligibility = namedtuple("Eligibility", ["user_id", "in_warranty", "warranty_days_left", "free_service", "offers"])
+
+
+class EligibilityIndex:
+    """Per-user warranty/free-service status and the currently valid offers.
+
+    Warranty expiries live in an array indexed by user id (ids are dense), so a lookup is
+    one index and one integer comparison. Every `refresh_seconds` users above the id
+    watermark are appended, users in the user_changes log (changed warranty, deleted) are
+    re-read and the (small) offers table is reloaded; when the date changes the
+    valid-offer list is recomputed. reload_user() re-reads one user straight away.
+    """
+
+    def __init__(self, refresh_seconds=ELIGIBILITY_REFRESH_SECONDS, clock=time.monotonic, now=datetime.datetime.now):
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._now = now  # Wall clock: today's date and the time left until midnight
+        self._lock = threading.Lock()
+        self._expiry = array("i")  # Warranty-expiry day number by user id; 0 = not loaded
+        self._user_watermark = 0
+        self._change_watermark = None  # None until the first refresh reads the end of the log
+        self._offers = ()  # (id, details, valid-until day number) for every offer
+        self._valid_offers = ()
+        self._today = None
+        self._next_refresh = 0.0
+        self._day_ends = 0.0  # Clock reading at the next local midnight
+        self.refreshes = 0
+        self.lookups = 0
+        self.misses = 0
+
+    def _set_expiry(self, user_id, day):
+        if user_id >= len(self._expiry):
+            self._expiry.extend(array("i", [0]) * (user_id + 1 - len(self._expiry)))
+        self._expiry[user_id] = day or 0
+
+    def _maybe_refresh(self):
+        now = self._clock()
+        if now < self._next_refresh and now < self._day_ends:
+            return self._today
+        wall = self._now()
+        today = wall.date().toordinal()
+        with self._lock:
+            if now >= self._next_refresh:
+                self._load_changes()
+                for user_id, day in fetch_all(NEW_USERS, (self._user_watermark,)):
+                    self._set_expiry(user_id, day)
+                    self._user_watermark = user_id
+                self._offers = tuple(fetch_all(ALL_OFFERS))
+                self._next_refresh = now + self.refresh_seconds
+                self.refreshes += 1
+            self._valid_offers = tuple(details for _, details, day in self._offers if day is not None and day >= today)
+            self._today = today
+            midnight = datetime.datetime.combine(wall.date() + datetime.timedelta(days=1), datetime.time())
+            self._day_ends = now + (midnight - wall).total_seconds()
+        return today
+
+    def _load_changes(self):
+        """Re-reads users from the change log (caller holds the lock); a no-op before migration 10."""
+        try:
+            if self._change_watermark is None:
+                # The first refresh loads every user anyway, so start at the end of the log.
+                self._change_watermark = fetch_one("SELECT COALESCE(MAX(seq), 0) FROM user_changes")[0]
+                return
+            for seq, user_id, day in fetch_all(CHANGED_USERS, (self._change_watermark,)):
+                if user_id < len(self._expiry) or day:
+                    self._set_expiry(user_id, day)  # 0 for a deleted user
+                self._change_watermark = seq
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+
+    def reload_user(self, user_id):
+        """Re-reads one user's warranty (after it changed, or for a user newer than the last refresh)."""
+        row = fetch_one(USER_WARRANTY, (user_id,))
+        with self._lock:
+            if row is None:
+                if user_id < len(self._expiry):
+                    self._expiry[user_id] = 0
+                return False
+            self._set_expiry(user_id, row[0])
+        return True
+
+    def invalidate(self):
+        """Drops everything; the next lookup reloads all users and offers."""
+        with self._lock:
+            self._expiry = array("i")
+            self._user_watermark = 0
+            self._change_watermark = None
+            self._today = None
+            self._next_refresh = 0.0
+            self._day_ends = 0.0
+
+    def get(self, user_id):
+        """Returns the user's Eligibility, or None for an unknown user."""
+        today = self._maybe_refresh()
+        self.lookups += 1
+        expiries = self._expiry  # invalidate() swaps the array; read one consistent copy
+        expiry = expiries[user_id] if 0 < user_id < len(expiries) else 0
+        if not expiry:
+            self.misses += 1
+            if not self.reload_user(user_id):
+                return None
+            expiries = self._expiry
+            expiry = expiries[user_id] if user_id < len(expiries) else 0
+            if not expiry:
+                return None  # Unparseable warranty_expiry
+        days_left = expiry - today
+        in_warranty = days_left >= 0
+        return Eligibility(user_id, in_warranty, max(days_left, 0), in_warranty, self._valid_offers)
+
+    def offers(self):
+        """Details of every offer whose valid_until is today or later."""
+        self._maybe_refresh()
+        return self._valid_offers
+
+    def stats(self):
+        return {
+            "users": len(self._expiry) - self._expiry.count(0),
+            "valid_offers": len(self._valid_offers),
+            "refreshes": self.refreshes,
+            "lookups": self.lookups,
+            "misses": self.misses,
+        }
+
+
+# ✅ Shared Index Used by chatbot.py and sentiment_analysis.py
+eligibility_index = EligibilityIndex()
+
+
+@timed("eligibility_lookup")
+def get_eligibility(user_id):
+    return eligibility_index.get(user_id)
+
+
+def current_offers():
+    return eligibility_index.offers()
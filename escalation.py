@@ -0,0 +1,190 @@
+import argparse
+import os
+import sqlite3
+import time
+
+import db_pool
+from sentiment_engine import lexicon
+
+# ✅ Escalation Settings (overridable from .env)
+ESCALATION_STRATEGY = os.getenv("ESCALATION_STRATEGY", "least_loaded")  # or "round_robin"
+ESCALATION_AGENT_CAPACITY = int(os.getenv("ESCALATION_AGENT_CAPACITY", "5"))  # Open cases per agent
+
+# ✅ Schema (applied by migrations.py, version 5)
+# The queue is a partial index over queued rows ordered by (priority DESC, id), so
+# enqueue is one B-tree insert and taking the next case is one index seek. agent_load
+# keeps each agent's open-case count and last assignment time for picking an agent.
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS escalations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        feedback_text TEXT NOT NULL,
+        priority INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'assigned', 'resolved')),
+        agent_id INTEGER,
+        created_at REAL NOT NULL,
+        assigned_at REAL,
+        resolved_at REAL,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (agent_id) REFERENCES agents(id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_escalations_queue ON escalations(priority DESC, id) WHERE status = 'queued'",
+    "CREATE INDEX IF NOT EXISTS idx_escalations_assigned_at ON escalations(assigned_at) WHERE assigned_at IS NOT NULL",
+    """CREATE TABLE IF NOT EXISTS agent_load (
+        agent_id INTEGER PRIMARY KEY,
+        open_cases INTEGER NOT NULL DEFAULT 0,
+        last_assigned REAL NOT NULL DEFAULT 0,
+        FOREIGN KEY (agent_id) REFERENCES agents(id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_agent_load_least_loaded ON agent_load(open_cases, last_assigned)",
+    "INSERT OR IGNORE INTO agent_load (agent_id) SELECT id FROM agents",
+    """CREATE TRIGGER IF NOT EXISTS agents_load_row AFTER INSERT ON agents BEGIN
+        INSERT OR IGNORE INTO agent_load (agent_id) VALUES (NEW.id);
+    END""",
+]
+
+PICK_AGENT = {
+    "least_loaded": "SELECT agent_id FROM agent_load WHERE open_cases < ? ORDER BY open_cases, last_assigned LIMIT 1",
+    "round_robin": "SELECT agent_id FROM agent_load WHERE open_cases < ? ORDER BY last_assigned LIMIT 1",
+}
+
+# Takes the highest-priority, oldest queued case in a single statement.
+CLAIM_NEXT = """
+UPDATE escalations SET status = 'assigned', agent_id = ?, assigned_at = ?
+WHERE id = (SELECT id FROM escalations WHERE status = 'queued' ORDER BY priority DESC, id LIMIT 1)
+RETURNING id, user_id, feedback_text, priority, created_at
+"""
+
+
+def priority_for(text):
+    """More negative lexicon hits make a case more urgent."""
+    return sum(1 for match in lexicon.matches(text) if match.intent == "NEGATIVE")
+
+
+def enqueue(user_id, feedback_text, priority=None):
+    """Adds a case to the queue and returns its id."""
+    if priority is None:
+        priority = priority_for(feedback_text)
+    with db_pool.get_pool().writer() as conn:
+        return conn.execute(
+            "INSERT INTO escalations (user_id, feedback_text, priority, created_at) VALUES (?, ?, ?, ?)",
+            (user_id, feedback_text, priority, time.time())).lastrowid
+
+
+def _assign(conn, agent_id):
+    now = time.time()
+    case = conn.execute(CLAIM_NEXT, (agent_id, now)).fetchone()
+    if case is not None:
+        conn.execute("UPDATE agent_load SET open_cases = open_cases + 1, last_assigned = ? WHERE agent_id = ?",
+                     (now, agent_id))
+    return case
+
+
+def claim(agent_id):
+    """Agent-side dequeue: gives `agent_id` the next case, or None when the queue is empty.
+
+    BEGIN IMMEDIATE takes the write lock up front, so concurrent claimers queue on
+    SQLite's busy timeout instead of failing a read-to-write lock upgrade.
+    """
+    with db_pool.get_pool().writer() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        return _assign(conn, agent_id)
+
+
+def dispatch(strategy=ESCALATION_STRATEGY, capacity=ESCALATION_AGENT_CAPACITY, limit=100):
+    """Assigns queued cases to agents with spare capacity; returns [(case_id, agent_id)]."""
+    pick_agent = PICK_AGENT[strategy]
+    assigned = []
+    with db_pool.get_pool().writer() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        while len(assigned) < limit:
+            agent = conn.execute(pick_agent, (capacity,)).fetchone()
+            if agent is None:
+                break
+            case = _assign(conn, agent[0])
+            if case is None:
+                break
+            assigned.append((case[0], agent[0]))
+    return assigned
+
+
+def resolve(case_id):
+    """Closes an assigned case and frees a slot for its agent; returns False if it wasn't open."""
+    with db_pool.get_pool().writer() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "UPDATE escalations SET status = 'resolved', resolved_at = ? WHERE id = ? AND status = 'assigned' "
+            "RETURNING agent_id", (time.time(), case_id)).fetchone()
+        if row is None:
+            return False
+        conn.execute("UPDATE agent_load SET open_cases = open_cases - 1 WHERE agent_id = ?", row)
+        return True
+
+
+def escalate(user_id, feedback_text, priority=None):
+    """Queues a case and dispatches; returns (case_id, agent (name, phone) or None, queue position)."""
+    case_id = enqueue(user_id, feedback_text, priority)
+    dispatch()
+    row = db_pool.fetch_one(
+        "SELECT escalations.status, escalations.priority, agents.name, agents.phone FROM escalations "
+        "LEFT JOIN agents ON agents.id = escalations.agent_id WHERE escalations.id = ?", (case_id,))
+    if row[0] != "queued":
+        return case_id, (row[2], row[3]), 0
+    position = db_pool.fetch_one(
+        "SELECT COUNT(*) FROM escalations WHERE status = 'queued' AND (priority > ? OR (priority = ? AND id <= ?))",
+        (row[1], row[1], case_id))[0]
+    return case_id, None, position
+
+
+def queue_stats(window_seconds=3600):
+    """Queue depth, oldest waiting case and wait times of cases assigned in the last window."""
+    now = time.time()
+    depth, oldest = db_pool.fetch_one(
+        "SELECT COUNT(*), MIN(created_at) FROM escalations WHERE status = 'queued'")
+    waits = sorted(row[0] for row in db_pool.fetch_all(
+        "SELECT assigned_at - created_at FROM escalations WHERE assigned_at >= ?", (now - window_seconds,)))
+    open_cases = db_pool.fetch_one("SELECT COALESCE(SUM(open_cases), 0), COUNT(*) FROM agent_load")
+    stats = {
+        "queued": depth,
+        "oldest_wait_seconds": now - oldest if oldest else 0.0,
+        "assigned_in_window": len(waits),
+        "open_cases": open_cases[0],
+        "agents": open_cases[1],
+        "wait_p50_seconds": 0.0,
+        "wait_p95_seconds": 0.0,
+    }
+    if waits:
+        stats["wait_p50_seconds"] = waits[len(waits) // 2]
+        stats["wait_p95_seconds"] = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Escalation queue for negative feedback.")
+    parser.add_argument("--db", default=db_pool.DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show queue depth and wait times")
+    assign = commands.add_parser("dispatch", help="Assign queued cases to agents with spare capacity")
+    assign.add_argument("--strategy", choices=sorted(PICK_AGENT), default=ESCALATION_STRATEGY)
+    assign.add_argument("--capacity", type=int, default=ESCALATION_AGENT_CAPACITY)
+    take = commands.add_parser("claim", help="Claim the next case for an agent")
+    take.add_argument("agent_id", type=int)
+    close = commands.add_parser("resolve", help="Resolve a case")
+    close.add_argument("case_id", type=int)
+    args = parser.parse_args()
+
+    db_pool.init_pool(args.db)
+    try:
+        if args.command == "status":
+            for name, value in queue_stats().items():
+                print(f"{name:<22} {value:,.1f}" if isinstance(value, float) else f"{name:<22} {value:,}")
+        elif args.command == "dispatch":
+            assigned = dispatch(args.strategy, args.capacity, limit=10 ** 9)
+            print(f"✅ Assigned {len(assigned):,} cases.")
+        elif args.command == "claim":
+            case = claim(args.agent_id)
+            print(f"✅ Case #{case[0]} (priority {case[3]}): {case[2]}" if case else "Queue is empty.")
+        else:
+            print("✅ Resolved." if resolve(args.case_id) else "⚠️ Case is not open.")
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ {e} (run `python migrations.py migrate` first)")
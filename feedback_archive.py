@@ -0,0 +1,314 @@
+import argparse
+import datetime
+import gzip
+import io
+import json
+import os
+import sqlite3
+import time
+from collections import Counter, namedtuple
+
+from db_pool import DB_PATH
+from sentiment_rollups import SENTIMENT_WINDOW_DAYS, refresh
+
+try:
+    import zstandard  # Optional: smaller and faster archives than gzip
+except ImportError:
+    zstandard = None
+
+# ✅ Archive Settings (overridable from .env)
+FEEDBACK_ARCHIVE_DIR = os.getenv("FEEDBACK_ARCHIVE_DIR", "feedback_archive")
+FEEDBACK_ARCHIVE_DAYS = int(os.getenv("FEEDBACK_ARCHIVE_DAYS", "365"))  # Keep at least this much feedback live
+FEEDBACK_ARCHIVE_FORMAT = os.getenv("FEEDBACK_ARCHIVE_FORMAT", "zst" if zstandard else "gz")
+FEEDBACK_VACUUM_FREE_RATIO = float(os.getenv("FEEDBACK_VACUUM_FREE_RATIO", "0.2"))  # Full VACUUM above this
+
+# ✅ Schema (applied by migrations.py, version 8)
+# One row per archive part: where it is, which ids and times it covers and its sentiment
+# counts. Per-day counts of archived feedback stay in the sentiment rollups.
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS feedback_archive (
+        month TEXT NOT NULL,
+        part INTEGER NOT NULL,
+        file_name TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        min_id INTEGER NOT NULL,
+        max_id INTEGER NOT NULL,
+        first_timestamp TEXT NOT NULL,
+        last_timestamp TEXT NOT NULL,
+        positive INTEGER NOT NULL,
+        negative INTEGER NOT NULL,
+        neutral INTEGER NOT NULL,
+        bytes INTEGER NOT NULL,
+        archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (month, part)
+    )""",
+]
+
+COLUMNS = ("id", "user_id", "feedback_text", "sentiment", "timestamp")
+FeedbackRow = namedtuple("FeedbackRow", COLUMNS)
+
+
+def _month_bounds(month):
+    """'2025-01' -> ('2025-01-01', '2025-02-01')."""
+    year, number = map(int, month.split("-"))
+    following = datetime.date(year + number // 12, number % 12 + 1, 1)
+    return f"{month}-01", following.isoformat()
+
+
+def _open(path, mode):
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path} needs the zstandard package (pip install zstandard)")
+        return io.TextIOWrapper(zstandard.open(path, mode + "b"), encoding="utf-8")
+    return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+
+
+def archive_cutoff(days=FEEDBACK_ARCHIVE_DAYS, today=None):
+    """First day of the oldest month that must stay live (whole months are archived)."""
+    if days < SENTIMENT_WINDOW_DAYS:
+        raise ValueError(f"Archive horizon ({days} days) must cover the sentiment window ({SENTIMENT_WINDOW_DAYS} days).")
+    oldest = (today or datetime.date.today()) - datetime.timedelta(days=days)
+    return oldest.replace(day=1).isoformat()
+
+
+def _write_part(conn, month, archive_dir, file_format):
+    """Exports one month from a read snapshot into `<part>.tmp`; returns (path, summary) or None."""
+    start, end = _month_bounds(month)
+    conn.execute("BEGIN")  # One snapshot for the export; writers carry on meanwhile
+    try:
+        part = conn.execute("SELECT COALESCE(MAX(part), 0) + 1 FROM feedback_archive WHERE month = ?",
+                            (month,)).fetchone()[0]
+        file_name = f"feedback-{month}.{part}.jsonl.{file_format}"
+        path = os.path.join(archive_dir, file_name)
+        counts, rows, min_id, max_id, first, last = Counter(), 0, None, None, None, None
+        with _open(path + ".tmp", "w") as out:
+            for row in conn.execute(f"SELECT {', '.join(COLUMNS)} FROM feedback "
+                                    "WHERE timestamp >= ? AND timestamp < ? ORDER BY id", (start, end)):
+                out.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n")
+                counts[str(row[3]).upper()] += 1
+                rows += 1
+                min_id = row[0] if min_id is None else min(min_id, row[0])
+                max_id = row[0] if max_id is None else max(max_id, row[0])
+                first = row[4] if first is None else min(first, row[4])
+                last = row[4] if last is None else max(last, row[4])
+    finally:
+        conn.execute("ROLLBACK")
+    if not rows:
+        os.remove(path + ".tmp")
+        return None
+    with open(path + ".tmp", "rb") as f:
+        os.fsync(f.fileno())
+    return path, (month, part, file_name, rows, min_id, max_id, first, last,
+                  counts["POSITIVE"], counts["NEGATIVE"], counts["NEUTRAL"], os.path.getsize(path + ".tmp"))
+
+
+def _archive_month(conn, month, archive_dir, file_format):
+    """Moves one month of feedback into a new archive part; returns its summary row (or None).
+
+    The part is written outside any write transaction. The write lock is held only to
+    delete the exported id range and record the part; if the month's rows in that range
+    changed in between, the part is discarded and the month is retried on the next run.
+    """
+    written = _write_part(conn, month, archive_dir, file_format)
+    if written is None:
+        return None
+    path, summary = written
+    start, end = _month_bounds(month)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        refresh(conn)  # Count every row in the rollups before it leaves the table
+        deleted = conn.execute("DELETE FROM feedback WHERE id BETWEEN ? AND ? AND timestamp >= ? AND timestamp < ?",
+                               (summary[4], summary[5], start, end)).rowcount
+        if deleted != summary[3]:
+            conn.execute("ROLLBACK")
+            os.remove(path + ".tmp")
+            print(f"⚠️ Feedback from {month} changed while it was being archived; it will be retried next run.")
+            return None
+        os.replace(path + ".tmp", path)  # A crash before COMMIT leaves the rows live; the part is rewritten next run
+        conn.execute("INSERT INTO feedback_archive (month, part, file_name, rows, min_id, max_id, first_timestamp, "
+                     "last_timestamp, positive, negative, neutral, bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     summary)
+        conn.execute("INSERT INTO rollup_state (name, value) VALUES ('archived_before', ?) "
+                     "ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)", (end,))
+        conn.execute("COMMIT")
+        return summary
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def archive(conn, days=FEEDBACK_ARCHIVE_DAYS, archive_dir=FEEDBACK_ARCHIVE_DIR, file_format=FEEDBACK_ARCHIVE_FORMAT,
+            verbose=False):
+    """Moves every whole month older than the horizon into compressed archive parts.
+
+    Each month is exported from a read snapshot and then deleted in a short write
+    transaction, so a failed or interrupted run leaves that month live. Returns the summaries of the parts written.
+    """
+    cutoff = archive_cutoff(days)
+    os.makedirs(archive_dir, exist_ok=True)
+    months = [row[0] for row in conn.execute(
+        "SELECT DISTINCT substr(timestamp, 1, 7) FROM feedback WHERE timestamp < ? ORDER BY 1", (cutoff,))]
+    written = []
+    for month in months:
+        started = time.perf_counter()
+        summary = _archive_month(conn, month, archive_dir, file_format)
+        if summary:
+            written.append(summary)
+            if verbose:
+                print(f"  {month}: {summary[3]:,} rows -> {summary[2]} ({summary[11] / 1e6:,.1f} MB) "
+                      f"in {time.perf_counter() - started:.1f}s", flush=True)
+    return written
+
+
+# ✅ Compaction
+def compact(conn, free_ratio=FEEDBACK_VACUUM_FREE_RATIO, max_pages=None):
+    """Gives pages freed by archiving back to the file system; returns the bytes reclaimed.
+
+    With auto_vacuum=INCREMENTAL free pages are released a batch at a time (cheap, can run
+    after every archive). Otherwise the file is rebuilt with a full VACUUM, but only once
+    the free pages reach `free_ratio` of the file; that VACUUM also switches the database
+    to incremental mode, so later runs take the cheap path.
+    """
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    before = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if not free:
+        return 0
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        conn.execute(f"PRAGMA incremental_vacuum({max_pages or free})").fetchall()
+    elif free >= before * free_ratio:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    else:
+        return 0
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return (before - conn.execute("PRAGMA page_count").fetchone()[0]) * page_size
+
+
+def measure(conn, repeat=5):
+    """Database size and the latency of the dashboard/profile queries from migrations.py."""
+    from migrations import LATEST_USER_FEEDBACK, NEGATIVE_BY_PRODUCT, Check, run_check
+
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    stats = {
+        "db_mb": conn.execute("PRAGMA page_count").fetchone()[0] * page_size / 1e6,
+        "free_mb": conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size / 1e6,
+        "feedback_rows": conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0],
+    }
+    for check in (Check("negative_by_product_ms", NEGATIVE_BY_PRODUCT, ()),
+                  Check("latest_user_feedback_ms", LATEST_USER_FEEDBACK, (1,)),
+                  Check("feedback_count_ms", "SELECT COUNT(*) FROM feedback", ())):
+        stats[check.name] = run_check(conn, check, repeat)[1]
+    return stats
+
+
+# ✅ Reading Archived and Live Feedback Together
+def iter_archived(conn, since=None, until=None, user_id=None, sentiment=None, archive_dir=FEEDBACK_ARCHIVE_DIR):
+    """Yields archived FeedbackRows in time-partition order, opening only the parts that overlap the range."""
+    parts = conn.execute(
+        "SELECT file_name FROM feedback_archive WHERE last_timestamp >= ? AND first_timestamp < date(?, '+1 day') "
+        "ORDER BY month, part", (since or "", until or "9999-12-30"))
+    sentiment = sentiment.upper() if sentiment else None
+    for (file_name,) in parts.fetchall():
+        with _open(os.path.join(archive_dir, file_name), "r") as f:
+            for line in f:
+                row = json.loads(line)
+                if user_id is not None and row["user_id"] != user_id:
+                    continue
+                if sentiment and str(row["sentiment"]).upper() != sentiment:
+                    continue
+                if (since and row["timestamp"] < since) or (until and row["timestamp"][:10] > until):
+                    continue
+                yield FeedbackRow(*(row[column] for column in COLUMNS))
+
+
+def iter_feedback(conn, since=None, until=None, user_id=None, sentiment=None, archive_dir=FEEDBACK_ARCHIVE_DIR):
+    """Yields FeedbackRows from the archive and then the live table, as if nothing had been archived.
+
+    Dates are YYYY-MM-DD and inclusive.
+    """
+    has_archive = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'feedback_archive'").fetchone()
+    if has_archive:
+        yield from iter_archived(conn, since, until, user_id, sentiment, archive_dir)
+    clauses, params = [], []
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp < date(?, '+1 day')")
+        params.append(until)
+    if user_id is not None:
+        clauses.append("user_id = ?")
+        params.append(user_id)
+    if sentiment:
+        clauses.append("UPPER(sentiment) = ?")
+        params.append(sentiment.upper())
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    for row in conn.execute(f"SELECT {', '.join(COLUMNS)} FROM feedback{where} ORDER BY id", params):
+        yield FeedbackRow(*row)
+
+
+def get_feedback(conn, feedback_id, archive_dir=FEEDBACK_ARCHIVE_DIR):
+    """Looks a feedback row up by id, live or archived; None when it doesn't exist."""
+    row = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM feedback WHERE id = ?", (feedback_id,)).fetchone()
+    if row:
+        return FeedbackRow(*row)
+    for (file_name,) in conn.execute("SELECT file_name FROM feedback_archive WHERE ? BETWEEN min_id AND max_id",
+                                     (feedback_id,)).fetchall():
+        with _open(os.path.join(archive_dir, file_name), "r") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["id"] == feedback_id:
+                    return FeedbackRow(*(record[column] for column in COLUMNS))
+    return None
+
+
+def _print_stats(label, stats):
+    print(f"{label}: " + ", ".join(f"{name} {value:,.2f}" if isinstance(value, float) else f"{name} {value:,}"
+                                   for name, value in stats.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old feedback into compressed monthly archives.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--archive-dir", default=FEEDBACK_ARCHIVE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("archive", help="Archive whole months older than the horizon, then compact")
+    run.add_argument("--days", type=int, default=FEEDBACK_ARCHIVE_DAYS)
+    run.add_argument("--format", choices=["gz", "zst"], default=FEEDBACK_ARCHIVE_FORMAT)
+    run.add_argument("--no-compact", action="store_true")
+    commands.add_parser("compact", help="Reclaim free pages (incremental or full VACUUM)")
+    commands.add_parser("list", help="List archive parts")
+    export = commands.add_parser("export", help="Print feedback as JSON lines, archived and live")
+    export.add_argument("--since")
+    export.add_argument("--until")
+    export.add_argument("--user-id", type=int)
+    export.add_argument("--sentiment")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30, isolation_level=None)  # Transactions are explicit
+    conn.execute("PRAGMA journal_mode=WAL")
+    try:
+        if args.command == "archive":
+            before = measure(conn)
+            start = time.perf_counter()
+            parts = archive(conn, args.days, args.archive_dir, args.format, verbose=True)
+            print(f"✅ Archived {sum(part[3] for part in parts):,} rows into {len(parts)} parts "
+                  f"in {time.perf_counter() - start:.1f}s.")
+            if not args.no_compact:
+                print(f"✅ Reclaimed {compact(conn) / 1e6:,.1f} MB.")
+            _print_stats("   before", before)
+            _print_stats("   after ", measure(conn))
+        elif args.command == "compact":
+            print(f"✅ Reclaimed {compact(conn) / 1e6:,.1f} MB.")
+        elif args.command == "list":
+            for month, part, file_name, rows, size in conn.execute(
+                    "SELECT month, part, file_name, rows, bytes FROM feedback_archive ORDER BY month, part"):
+                print(f"{month} #{part}  {rows:>10,} rows  {size / 1e6:>8,.1f} MB  {file_name}")
+        else:
+            for row in iter_feedback(conn, args.since, args.until, args.user_id, args.sentiment, args.archive_dir):
+                print(json.dumps(row._asdict(), ensure_ascii=False))
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ {e} (run `python migrations.py migrate` first)")
+    finally:
+        conn.close()
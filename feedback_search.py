@@ -0,0 +1,211 @@
+import argparse
+import re
+import sqlite3
+import time
+from collections import namedtuple
+
+from db_pool import DB_PATH
+
+# ✅ Schema (applied by migrations.py, version 6)
+# feedback_fts is an external-content FTS5 index: it stores only the token index and reads
+# the text back from feedback by rowid. A row is indexed when its id is at or below the
+# backfill watermark (backfill() works upwards in batches) or above the ceiling (MAX(id)
+# when the index was created; the triggers index those as they arrive). The triggers
+# only touch indexed rows, so an existing table can be indexed while it is in use.
+INDEXED = "({id} > (SELECT ceiling FROM feedback_search_state) OR {id} <= (SELECT backfilled FROM feedback_search_state))"
+
+SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts USING fts5(
+        feedback_text, content='feedback', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TABLE IF NOT EXISTS feedback_search_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        backfilled INTEGER NOT NULL,
+        ceiling INTEGER NOT NULL
+    )""",
+    "INSERT OR IGNORE INTO feedback_search_state (id, backfilled, ceiling) SELECT 1, 0, COALESCE(MAX(id), 0) FROM feedback",
+    f"""CREATE TRIGGER IF NOT EXISTS feedback_fts_insert AFTER INSERT ON feedback WHEN {INDEXED.format(id="NEW.id")} BEGIN
+        INSERT INTO feedback_fts (rowid, feedback_text) VALUES (NEW.id, NEW.feedback_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS feedback_fts_delete AFTER DELETE ON feedback WHEN {INDEXED.format(id="OLD.id")} BEGIN
+        INSERT INTO feedback_fts (feedback_fts, rowid, feedback_text) VALUES ('delete', OLD.id, OLD.feedback_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS feedback_fts_update AFTER UPDATE OF feedback_text ON feedback
+    WHEN {INDEXED.format(id="OLD.id")} BEGIN
+        INSERT INTO feedback_fts (feedback_fts, rowid, feedback_text) VALUES ('delete', OLD.id, OLD.feedback_text);
+        INSERT INTO feedback_fts (rowid, feedback_text) VALUES (NEW.id, NEW.feedback_text);
+    END""",
+]
+
+SearchHit = namedtuple("SearchHit", ["feedback_id", "user_id", "sentiment", "timestamp", "snippet", "score"])
+
+SEARCH = """
+SELECT feedback.id, feedback.user_id, feedback.sentiment, feedback.timestamp,
+       snippet(feedback_fts, 0, ?, ?, '…', ?), bm25(feedback_fts)
+FROM feedback_fts JOIN feedback ON feedback.id = feedback_fts.rowid
+WHERE feedback_fts MATCH ? {filters}
+ORDER BY bm25(feedback_fts)
+LIMIT ?
+"""
+
+
+def match_query(text):
+    """Turns what an agent typed into an FTS5 query: every word must appear, "quoted text" as a phrase.
+
+    Quoting each term keeps punctuation and FTS5 operators (AND, NEAR, -, *) from being
+    parsed as query syntax. Returns "" when there is nothing to search for.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\w+)', text):
+        words = re.findall(r"\w+", phrase) if phrase else [word]
+        if words:
+            terms.append('"' + " ".join(words) + '"')
+    return " ".join(terms)
+
+
+def _filters(sentiment=None, user_id=None, since=None, until=None):
+    """SQL conditions and parameters for the optional filters (dates are YYYY-MM-DD, inclusive)."""
+    clauses, params = [], []
+    if sentiment:
+        clauses.append("UPPER(feedback.sentiment) = ?")
+        params.append(sentiment.upper())
+    if user_id is not None:
+        # Filtering index rowids by the user's feedback ids (idx_feedback_user_time) before the
+        # join means bm25() and the join run only for that user's matches, not every match.
+        clauses.append("feedback_fts.rowid IN (SELECT id FROM feedback WHERE user_id = ?)")
+        params.append(user_id)
+    if since:
+        clauses.append("feedback.timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("feedback.timestamp < date(?, '+1 day')")
+        params.append(until)
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+
+def search(conn, text, sentiment=None, user_id=None, since=None, until=None, limit=20,
+           highlight=("**", "**"), snippet_tokens=12, raw=False):
+    """Returns up to `limit` SearchHits for `text`, best bm25 match first.
+
+    Pass raw=True to use FTS5 query syntax as is (e.g. 'compressor NEAR(noise, 3)').
+    """
+    query = text if raw else match_query(text)
+    if not query:
+        return []
+    filters, params = _filters(sentiment, user_id, since, until)
+    rows = conn.execute(SEARCH.format(filters=filters),
+                        [highlight[0], highlight[1], snippet_tokens, query] + params + [limit])
+    return [SearchHit(*row) for row in rows]
+
+
+def count(conn, text, sentiment=None, user_id=None, since=None, until=None, raw=False):
+    """Number of indexed feedback rows matching `text` and the filters."""
+    query = text if raw else match_query(text)
+    if not query:
+        return 0
+    filters, params = _filters(sentiment, user_id, since, until)
+    return conn.execute(
+        "SELECT COUNT(*) FROM feedback_fts JOIN feedback ON feedback.id = feedback_fts.rowid "
+        f"WHERE feedback_fts MATCH ?{filters}", [query] + params).fetchone()[0]
+
+
+# ✅ Building the Index for Existing Rows
+def backfill(conn, batch_size=50000, max_batches=None, verbose=False):
+    """Indexes existing rows up to the ceiling in id order, one transaction per batch.
+
+    Safe to stop and resume at any point; returns how many rows were indexed.
+    """
+    indexed = batches = 0
+    start = time.perf_counter()
+    while max_batches is None or batches < max_batches:
+        with conn:
+            backfilled, ceiling = conn.execute("SELECT backfilled, ceiling FROM feedback_search_state").fetchone()
+            if backfilled >= ceiling:
+                break
+            upper = min(ceiling, backfilled + batch_size)
+            indexed += conn.execute(
+                "INSERT INTO feedback_fts (rowid, feedback_text) SELECT id, feedback_text FROM feedback "
+                "WHERE id > ? AND id <= ?", (backfilled, upper)).rowcount
+            conn.execute("UPDATE feedback_search_state SET backfilled = ?", (upper,))
+        batches += 1
+        if verbose:
+            print(f"  indexed ids up to {upper:,}/{ceiling:,} ({indexed / (time.perf_counter() - start):,.0f} rows/sec)",
+                  flush=True)
+    return indexed
+
+
+def optimize(conn):
+    """Merges the index's segments into one, which makes queries faster after a large backfill."""
+    with conn:
+        conn.execute("INSERT INTO feedback_fts (feedback_fts) VALUES ('optimize')")
+
+
+def rebuild(conn):
+    """Re-indexes the whole feedback table in one transaction (e.g. after editing rows with triggers off)."""
+    with conn:
+        conn.execute("INSERT INTO feedback_fts (feedback_fts) VALUES ('rebuild')")
+        conn.execute("UPDATE feedback_search_state SET backfilled = ceiling")
+
+
+def status(conn):
+    """How much of the feedback table is searchable."""
+    backfilled, ceiling = conn.execute("SELECT backfilled, ceiling FROM feedback_search_state").fetchone()
+    newest = conn.execute("SELECT COALESCE(MAX(id), 0) FROM feedback").fetchone()[0]
+    return {
+        "backfilled_through_id": backfilled,
+        "ceiling_id": ceiling,
+        "newest_id": newest,
+        "complete": backfilled >= ceiling,
+        "ids_pending": max(ceiling - backfilled, 0),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Full-text search over customer feedback.")
+    parser.add_argument("--db", default=DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    find = commands.add_parser("search", help="Ranked search with highlighted snippets")
+    find.add_argument("text", help='Words that must all appear; "quoted words" match as a phrase')
+    find.add_argument("--sentiment", choices=["positive", "negative", "neutral"])
+    find.add_argument("--user-id", type=int)
+    find.add_argument("--since", help="YYYY-MM-DD")
+    find.add_argument("--until", help="YYYY-MM-DD (inclusive)")
+    find.add_argument("--limit", type=int, default=20)
+    find.add_argument("--raw", action="store_true", help="Treat the text as an FTS5 query")
+    fill = commands.add_parser("backfill", help="Index rows that existed before the index was created")
+    fill.add_argument("--batch-size", type=int, default=50000)
+    fill.add_argument("--max-batches", type=int)
+    commands.add_parser("optimize", help="Merge index segments")
+    commands.add_parser("rebuild", help="Re-index every feedback row")
+    commands.add_parser("status", help="Show how much of the feedback table is indexed")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        if args.command == "search":
+            start = time.perf_counter()
+            hits = search(conn, args.text, args.sentiment, args.user_id, args.since, args.until, args.limit,
+                          highlight=("[", "]"), raw=args.raw)
+            elapsed = (time.perf_counter() - start) * 1000
+            for hit in hits:
+                print(f"#{hit.feedback_id:<9} user {hit.user_id:<8} {hit.sentiment:<8} {hit.timestamp}  {hit.snippet}")
+            print(f"✅ {len(hits)} results in {elapsed:.2f} ms.")
+            if not status(conn)["complete"]:
+                print("⚠️ The index is still being built; older feedback may be missing (run `backfill`).")
+        elif args.command == "backfill":
+            start = time.perf_counter()
+            added = backfill(conn, args.batch_size, args.max_batches, verbose=True)
+            print(f"✅ Indexed {added:,} feedback rows in {time.perf_counter() - start:.1f}s.")
+        elif args.command == "optimize":
+            optimize(conn)
+            print("✅ Index optimized.")
+        elif args.command == "rebuild":
+            rebuild(conn)
+            print("✅ Index rebuilt.")
+        else:
+            for name, value in status(conn).items():
+                print(f"{name:<22} {value:,}" if not isinstance(value, bool) else f"{name:<22} {value}")
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ {e} (run `python migrations.py migrate` first)")
+    finally:
+        conn.close()
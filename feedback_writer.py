@@ -0,0 +1,370 @@
+import argparse
+import atexit
+import csv
+import datetime
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import db_pool
+from sentiment_rollups import SENTIMENT_ROLLUPS, write_hook
+
+# ✅ Writer Settings (overridable from .env)
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "500"))
+FEEDBACK_FLUSH_MS = int(os.getenv("FEEDBACK_FLUSH_MS", "200"))
+FEEDBACK_QUEUE_SIZE = int(os.getenv("FEEDBACK_QUEUE_SIZE", "10000"))
+FEEDBACK_WRITE_RETRIES = int(os.getenv("FEEDBACK_WRITE_RETRIES", "3"))  # Extra attempts while the DB is locked
+FEEDBACK_REJECTED_PATH = os.getenv("FEEDBACK_REJECTED_PATH", "feedback_rejected.jsonl")  # Rows that could not be written
+
+INSERT_FEEDBACK = """
+INSERT INTO feedback (user_id, feedback_text, sentiment, timestamp)
+VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+"""
+
+# Called with the connection inside every feedback write transaction.
+WRITE_HOOKS = [write_hook] if SENTIMENT_ROLLUPS else []
+
+_STOP = object()
+
+
+def _now():
+    # Same UTC "YYYY-MM-DD HH:MM:SS" format SQLite's CURRENT_TIMESTAMP produces.
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def run_write_hooks(conn):
+    for hook in WRITE_HOOKS:
+        hook(conn)
+
+
+def _is_transient(error):
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+
+def _insert_each(conn, rows):
+    """Inserts one row per statement in the caller's transaction; returns [(row, error)] for
+    the rows that broke a constraint (SQLite undoes only that statement)."""
+    rejected = []
+    for row in rows:
+        try:
+            conn.execute(INSERT_FEEDBACK, row)
+        except sqlite3.IntegrityError as e:
+            rejected.append((row, str(e)))
+    return rejected
+
+
+def save_rejected(path, records):
+    """Appends rejected feedback records (dicts with an "error" key) to `path` as JSON lines."""
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not save rejected feedback rows: {e}")
+
+
+class FeedbackWriter:
+    """Buffers feedback rows and writes them with executemany in one transaction per batch.
+
+    A batch is flushed once it holds `batch_size` rows or `flush_interval_ms` after its
+    first row arrived. submit() blocks while `max_queue` rows are waiting (backpressure).
+    A locked database is retried `retries` times; if a row breaks a constraint the batch
+    is written row by row so only the bad rows are rejected. Rejected rows are appended,
+    with the error, to `rejected_path` (JSON lines) instead of being dropped.
+    """
+
+    def __init__(self, batch_size=FEEDBACK_BATCH_SIZE, flush_interval_ms=FEEDBACK_FLUSH_MS,
+                 max_queue=FEEDBACK_QUEUE_SIZE, retries=FEEDBACK_WRITE_RETRIES, rejected_path=FEEDBACK_REJECTED_PATH):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.retries = retries
+        self.rejected_path = rejected_path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._producers_done = threading.Condition(self._lock)
+        self._producers = 0  # submit() calls past the closed check that haven't queued their row yet
+        self._closed = False
+        self._batch = []  # Rows taken off the queue but not yet acknowledged with task_done()
+        self.error = None  # Set if the writer thread died
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_failed = 0
+        self.retried = 0
+        self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id, feedback_text, sentiment, timestamp=None, block=True, timeout=None):
+        """Queues one row; raises queue.Full if the queue stays full (non-blocking or timed out)."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Feedback writer is {'stopped' if self.error is None else 'dead'}.")
+            self._producers += 1
+        try:
+            # Outside the lock: a full queue blocks only this producer, not close() or the others.
+            self._queue.put((user_id, feedback_text, sentiment, timestamp or _now()), block, timeout)
+        finally:
+            with self._lock:
+                self._producers -= 1
+                if not self._producers:
+                    self._producers_done.notify_all()
+
+    def _run(self):
+        try:
+            self._loop()
+        except BaseException as e:
+            # Don't leave flush()/close() waiting on rows nobody will ever write.
+            self.error = e
+            print(f"⚠️ Feedback writer stopped: {e!r}")
+            self._reject(self._batch, f"writer stopped: {e!r}")
+            self._acknowledge(len(self._batch))
+            with self._lock:
+                self._closed = True
+                # Keep draining until every submit() already past the closed check has queued its row.
+                while True:
+                    self._drain(f"writer stopped: {e!r}")
+                    if self._producers_done.wait_for(lambda: not self._producers, timeout=0.05):
+                        break
+            self._drain(f"writer stopped: {e!r}")
+
+    def _loop(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                break
+            batch = self._batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            self._batch = []
+            self._acknowledge(len(batch))
+
+    def _acknowledge(self, count):
+        for _ in range(count):
+            self._queue.task_done()
+
+    def _drain(self, reason):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                self._reject([item], reason)
+            self._queue.task_done()
+
+    def _write(self, batch):
+        for attempt in range(self.retries + 1):
+            try:
+                with db_pool.get_pool().writer() as conn:
+                    conn.executemany(INSERT_FEEDBACK, batch)
+                    run_write_hooks(conn)
+                self.rows_written += len(batch)
+                self.batches_written += 1
+                return
+            except sqlite3.IntegrityError:
+                self._write_rows(batch)
+                return
+            except sqlite3.Error as e:
+                if not _is_transient(e) or attempt == self.retries:
+                    self._reject(batch, str(e))
+                    return
+                self.retried += 1
+                time.sleep(0.1 * 2 ** attempt)
+            except Exception as e:
+                self._reject(batch, repr(e))
+                return
+
+    def _write_rows(self, batch):
+        """One row per statement in a single transaction; rows breaking a constraint are rejected."""
+        try:
+            with db_pool.get_pool().writer() as conn:
+                rejected = _insert_each(conn, batch)
+                run_write_hooks(conn)
+        except sqlite3.Error as e:
+            self._reject(batch, str(e))
+            return
+        self.rows_written += len(batch) - len(rejected)
+        self.batches_written += 1
+        for row, error in rejected:
+            self._reject([row], error)
+
+    def _reject(self, rows, error):
+        if not rows:
+            return
+        self.rows_failed += len(rows)
+        print(f"⚠️ Failed to write {len(rows)} feedback rows ({error}); saved to {self.rejected_path}.")
+        save_rejected(self.rejected_path, [
+            {"user_id": user_id, "feedback_text": feedback_text, "sentiment": sentiment, "timestamp": timestamp,
+             "error": error}
+            for user_id, feedback_text, sentiment, timestamp in rows])
+
+    def flush(self):
+        """Blocks until every row submitted so far has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Writes whatever is still queued and stops the background thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True  # No new rows from here on...
+            self._producers_done.wait_for(lambda: not self._producers)  # ...and the accepted ones are queued
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "rows_written": self.rows_written,
+            "batches_written": self.batches_written,
+            "rows_failed": self.rows_failed,
+            "retried": self.retried,
+            "alive": self._thread.is_alive(),
+        }
+
+
+# ✅ Shared Writer Used by log_feedback()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_feedback_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = FeedbackWriter()
+                atexit.register(_writer.close)
+    return _writer
+
+
+def feedback_writer_stats():
+    """Metrics collector: the shared writer's stats, or {} while there is none (a scrape
+    must not start the writer thread)."""
+    writer = _writer
+    return {} if writer is None else writer.stats()
+
+
+# ✅ Bulk Import of Historical Feedback (CSV or JSONL)
+SENTIMENTS = {"POSITIVE", "NEGATIVE", "NEUTRAL"}
+
+
+def _read_records(path):
+    if path.endswith(".jsonl") or path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        yield {"line": number, "raw": line.rstrip("\n"), "_invalid": f"invalid JSON: {e}"}
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+
+def _parse_record(record):
+    """Returns (user_id, feedback_text, sentiment or None, timestamp or None); raises ValueError if malformed."""
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    if "_invalid" in record:
+        raise ValueError(record.pop("_invalid"))
+    try:
+        user_id = int(str(record.get("user_id")).strip())
+    except ValueError:
+        raise ValueError(f"user_id must be an integer, got {record.get('user_id')!r}") from None
+    feedback_text = record.get("feedback_text")
+    if not isinstance(feedback_text, str) or not feedback_text.strip():
+        raise ValueError("feedback_text is missing")
+    sentiment = (record.get("sentiment") or "").strip().upper() or None
+    if sentiment is not None and sentiment not in SENTIMENTS:
+        raise ValueError(f"unknown sentiment {record.get('sentiment')!r}")
+    return user_id, feedback_text, sentiment, record.get("timestamp") or None
+
+
+def import_feedback(path, db_path=None, batch_size=10000, rejected_path=FEEDBACK_REJECTED_PATH):
+    """Imports rows with user_id, feedback_text and optional sentiment/timestamp columns.
+
+    Rows without a sentiment are scored with sentiment_engine. Each batch of
+    `batch_size` rows is inserted in a single transaction. Malformed rows and rows for
+    unknown users are appended, with the reason, to `rejected_path` and the import goes
+    on. Returns (imported, rejected).
+    """
+    from sentiment_engine import score_batch
+
+    conn = sqlite3.connect(db_path or db_pool.DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    imported = rejected = 0
+    start = time.perf_counter()
+
+    def reject(records):
+        nonlocal rejected
+        rejected += len(records)
+        save_rejected(rejected_path, records)
+
+    def write(rows):
+        unscored = [row[1] for row in rows if row[2] is None]
+        scores = iter(score_batch(unscored))
+        rows = [(user_id, text, sentiment or next(scores)[0], timestamp) for user_id, text, sentiment, timestamp in rows]
+        try:
+            with conn:
+                conn.executemany(INSERT_FEEDBACK, rows)
+                run_write_hooks(conn)
+            failed = []
+        except sqlite3.IntegrityError:
+            with conn:  # Again row by row, keeping every row that is fine
+                failed = _insert_each(conn, rows)
+                run_write_hooks(conn)
+        reject([{"user_id": row[0], "feedback_text": row[1], "sentiment": row[2], "timestamp": row[3], "error": error}
+                for row, error in failed])
+        return len(rows) - len(failed)
+
+    batch = []
+    for record in _read_records(path):
+        try:
+            batch.append(_parse_record(record))
+        except ValueError as e:
+            reject([dict(record, error=str(e)) if isinstance(record, dict) else {"record": record, "error": str(e)}])
+            continue
+        if len(batch) >= batch_size:
+            imported += write(batch)
+            batch = []
+            print(f"  {imported:,} rows imported ({imported / (time.perf_counter() - start):,.0f} rows/sec), "
+                  f"{rejected:,} rejected", flush=True)
+    if batch:
+        imported += write(batch)
+    conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Imported {imported:,} feedback rows from {path} in {elapsed:.1f}s.")
+    if rejected:
+        print(f"⚠️ Rejected {rejected:,} rows; saved with the reason to {rejected_path}.")
+    return imported, rejected
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import historical feedback from CSV or JSONL.")
+    parser.add_argument("path", help="CSV (with header) or JSONL file")
+    parser.add_argument("--db", default=db_pool.DB_PATH)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--rejected", default=FEEDBACK_REJECTED_PATH, help="Where rejected rows are saved (JSONL)")
+    args = parser.parse_args()
+    import_feedback(args.path, args.db, args.batch_size, args.rejected)
@@ -0,0 +1,276 @@
+import contextlib
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from instrumentation import timed
+
+# ✅ Load API key & client settings from .env file
+load_dotenv()
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-pro-002")
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "64"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class GeminiError(Exception):
+    """Raised when Gemini answers with a non-success status after all retries."""
+
+    def __init__(self, status_code, body):
+        super().__init__(f"Gemini API returned HTTP {status_code}")
+        self.status_code = status_code
+        self.body = body
+
+
+class StreamMetrics:
+    """Time-to-first-token and outcome counts for streamed generations (thread-safe)."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._ttft = deque(maxlen=window)  # Seconds, for the most recent `window` streams
+        self.streams = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def record_first_token(self, seconds):
+        with self._lock:
+            self._ttft.append(seconds)
+
+    def record_finish(self, outcome):
+        with self._lock:
+            self.streams += 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self):
+        with self._lock:
+            ttft = sorted(self._ttft)
+            counts = {"streams": self.streams, "completed": self.completed,
+                      "cancelled": self.cancelled, "failed": self.failed}
+        if not ttft:
+            return dict(counts, ttft_p50_ms=0.0, ttft_p95_ms=0.0)
+        return dict(counts, ttft_p50_ms=ttft[len(ttft) // 2] * 1000,
+                    ttft_p95_ms=ttft[min(len(ttft) - 1, int(len(ttft) * 0.95))] * 1000)
+
+
+class GeminiClient:
+    """Shared keep-alive client for the Gemini generateContent API."""
+
+    def __init__(self, api_key=GEMINI_API_KEY, base_url=GEMINI_API_BASE, model=GEMINI_MODEL,
+                 timeout=GEMINI_TIMEOUT, max_retries=GEMINI_MAX_RETRIES,
+                 max_in_flight=GEMINI_MAX_IN_FLIGHT, backoff_base=0.5, backoff_max=8.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.stream_metrics = StreamMetrics()
+        # requests is imported here rather than at module load: it is the bulk of this
+        # module's import time, and GeminiError/iterate_in_thread don't need it.
+        import requests
+        from requests.adapters import HTTPAdapter
+        self._transport_errors = (requests.ConnectionError, requests.Timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_in_flight)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    def _url(self, method):
+        return f"{self.base_url}/models/{self.model}:{method}"
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        delay = min(self.backoff_base * (2 ** attempt), self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)  # Jitter so retries from many chats spread out
+
+    def _post(self, method, payload, stream=False, params=None, limit=True):
+        """POSTs with a capped number of concurrent calls, retrying on 429/5xx and connection errors.
+
+        With limit=False the caller already holds an in-flight slot (streams keep theirs
+        until the body has been read).
+        """
+        attempt = 0
+        while True:
+            try:
+                with self._in_flight if limit else contextlib.nullcontext():
+                    response = self.session.post(
+                        self._url(method), params=dict(params or {}, key=self.api_key), json=payload,
+                        timeout=self.timeout, stream=stream,
+                    )
+            except self._transport_errors:
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code == 200:
+                return response
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                retry_after = response.headers.get("Retry-After")
+                response.close()
+                time.sleep(self._backoff(attempt, retry_after))
+                attempt += 1
+                continue
+
+            try:
+                body = response.json()
+            except ValueError:
+                body = response.text
+            raise GeminiError(response.status_code, body)
+
+    @timed("gemini_generate")
+    def generate(self, prompt):
+        """Returns the text of the first candidate for `prompt`."""
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        response = self._post("generateContent", payload)
+        return response.json()["candidates"][0]["content"]["parts"][0]["text"]
+
+    async def agenerate(self, prompt):
+        """Awaitable generate() for asyncio callers; the blocking call runs in the default executor."""
+        import asyncio  # Already loaded by any caller with a running loop; keeps the CLI from paying for it
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.generate, prompt)
+
+    def stream_generate(self, prompt, cancel=None):
+        """Yields the first candidate's text piece by piece as Gemini generates it.
+
+        The server-sent-events body is read only as fast as the caller consumes the
+        generator, so a slow consumer slows the upstream read instead of buffering it.
+        Setting `cancel` (a threading.Event) or closing the generator stops the stream
+        and frees the connection. The in-flight slot is held until the stream ends.
+        """
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        start = time.perf_counter()
+        outcome = "failed"
+        with self._in_flight:
+            response = None
+            try:
+                # Inside the try so HTTP and connection errors are recorded as failed streams too.
+                response = self._post("streamGenerateContent", payload, stream=True, params={"alt": "sse"}, limit=False)
+                first = True
+                for line in response.iter_lines(chunk_size=None):
+                    if cancel is not None and cancel.is_set():
+                        outcome = "cancelled"
+                        return
+                    if not line.startswith(b"data:"):
+                        continue
+                    try:
+                        candidate = json.loads(line[5:])["candidates"][0]
+                    except (ValueError, KeyError, IndexError):
+                        raise GeminiError(response.status_code, line.decode("utf-8", "replace")) from None
+                    text = "".join(part.get("text", "") for part in candidate.get("content", {}).get("parts", []))
+                    if not text:
+                        continue
+                    if first:
+                        self.stream_metrics.record_first_token(time.perf_counter() - start)
+                        first = False
+                    yield text
+                outcome = "completed"
+            except GeneratorExit:
+                outcome = "cancelled"
+                raise
+            finally:
+                if response is not None:
+                    response.close()
+                self.stream_metrics.record_finish(outcome)
+
+    def astream_generate(self, prompt, max_buffered=16):
+        """Async version of stream_generate(); see iterate_in_thread() for backpressure and cancellation."""
+        return iterate_in_thread(lambda cancel: self.stream_generate(prompt, cancel), max_buffered)
+
+    def close(self):
+        self.session.close()
+
+
+async def iterate_in_thread(make_iterator, max_buffered=16):
+    """Runs the blocking iterator `make_iterator(cancel)` on the default executor and yields its items.
+
+    At most `max_buffered` items wait for the consumer; after that the producer thread
+    blocks, which in turn stops it reading from the network. When the consumer stops
+    early (break, aclose() or task cancellation) `cancel` is set and the iterator closed.
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    credits = threading.Semaphore(max_buffered)
+    cancel = threading.Event()
+
+    def send(message):
+        try:
+            loop.call_soon_threadsafe(items.put_nowait, message)
+        except RuntimeError:
+            cancel.set()  # Event loop already closed
+
+    def produce():
+        iterator = make_iterator(cancel)
+        try:
+            for item in iterator:
+                while not credits.acquire(timeout=0.1):
+                    if cancel.is_set():
+                        return
+                if cancel.is_set():
+                    return
+                send((True, item))
+        except Exception as e:
+            send((False, e))
+            return
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+        send((False, None))
+
+    loop.run_in_executor(None, produce)
+    try:
+        while True:
+            ok, value = await items.get()
+            if not ok:
+                if value is not None:
+                    raise value
+                return
+            credits.release()
+            yield value
+    finally:
+        cancel.set()
+
+
+# ✅ Shared Client Used by chatbot.py
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient()
+    return _client
+
+
+def set_client(client):
+    """Swaps the shared client, e.g. for one pointed at a local stub server."""
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    if previous is not None and previous is not client:
+        previous.close()
+    return client
@@ -17,7 +17,7 @@ def insert_data():
     print("🔄 Inserting sample users...")
     users_data = [
         ("Alice Johnson", "alice@example.com", 1, "2025-06-15", "2024-06-01", "Premium", "Neutral"),
-        ("Bob Smith", "bob@example.com", 2, "2024-01-10", "2026-11-05", "Standard", "Positive")
+        ("Bob Smith", "bob@example.com", 2, "2024-01-10", "2024-05-07", "Standard", "Positive")
     ]
     for user in users_data:
         cursor.execute("SELECT email FROM users WHERE email = ?", (user[1],))
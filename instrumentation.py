@@ -0,0 +1,229 @@
+import atexit
+import cProfile
+import functools
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from time import perf_counter
+
+# ✅ Instrumentation Settings (overridable from .env)
+METRICS_ENABLED = os.getenv("METRICS", "0") != "0"
+METRICS_DUMP = os.getenv("METRICS_DUMP")  # Write the JSON snapshot here at exit
+PROFILE_DIR = os.getenv("PROFILE_DIR")  # Write one .prof file per profiled call here
+PROFILE_OPERATIONS = {name for name in os.getenv("PROFILE_OPERATIONS", "*").split(",") if name}
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1.0"))
+
+# Upper bounds in seconds, from sub-millisecond cache hits to slow Gemini answers.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; observe() is a bisect and a few increments."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, error=False):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+            if error:
+                self.errors += 1
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile (the usual histogram estimate)."""
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "count": self.count,
+                "errors": self.errors,
+                "sum_seconds": self.sum,
+                "mean_ms": self.sum / self.count * 1000 if self.count else 0.0,
+                "max_ms": self.max * 1000,
+                "p50_ms": self.quantile(0.50) * 1000 if self.count else 0.0,
+                "p95_ms": self.quantile(0.95) * 1000 if self.count else 0.0,
+                "p99_ms": self.quantile(0.99) * 1000 if self.count else 0.0,
+            }
+
+
+# ✅ Registry
+_active = METRICS_ENABLED or bool(PROFILE_DIR)
+_histograms = {}
+_collectors = {}  # Counters (cache hits, queue depth, ...) come from components' stats()
+_registry_lock = threading.Lock()
+_profiler_lock = threading.Lock()  # cProfile can only profile one call at a time
+
+
+def enable(metrics=True, profile_dir=None):
+    """Turns recording (and optionally per-call profiling) on at runtime."""
+    global METRICS_ENABLED, PROFILE_DIR, _active
+    METRICS_ENABLED = metrics
+    PROFILE_DIR = profile_dir
+    _active = METRICS_ENABLED or bool(PROFILE_DIR)
+
+
+def observe(operation, seconds, error=False):
+    histogram = _histograms.get(operation)
+    if histogram is None:
+        with _registry_lock:
+            histogram = _histograms.setdefault(operation, Histogram())
+    histogram.observe(seconds, error)
+
+
+def register_collector(name, stats):
+    """Adds `stats()` (a dict of numbers, e.g. a cache's stats) to every export under `name`."""
+    _collectors[name] = stats
+
+
+def reset():
+    with _registry_lock:
+        _histograms.clear()
+
+
+def _start_profiler(operation):
+    if not PROFILE_DIR or ("*" not in PROFILE_OPERATIONS and operation not in PROFILE_OPERATIONS):
+        return None
+    if random.random() >= PROFILE_SAMPLE_RATE or not _profiler_lock.acquire(blocking=False):
+        return None  # Not sampled, or another call is already being profiled
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _stop_profiler(profiler, operation):
+    profiler.disable()
+    _profiler_lock.release()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler.dump_stats(os.path.join(PROFILE_DIR, f"{operation}-{time.time_ns()}.prof"))
+
+
+class timed:
+    """Records the latency of a block or function under `operation`.
+
+    Use as `@timed("name")` or `with timed("name"):` (a fresh instance per block).
+    While instrumentation is off the decorated function costs one flag check.
+    """
+    __slots__ = ("operation", "_start", "_profiler")
+
+    def __init__(self, operation):
+        self.operation = operation
+        self._start = None
+        self._profiler = None
+
+    def __enter__(self):
+        if _active:
+            self._profiler = _start_profiler(self.operation) if PROFILE_DIR else None
+            self._start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._start is not None:
+            _finish(self.operation, perf_counter() - self._start, exc_type is not None, self._profiler)
+        return False
+
+    def __call__(self, func):
+        operation = self.operation
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _active:
+                return func(*args, **kwargs)
+            profiler = _start_profiler(operation) if PROFILE_DIR else None
+            start = perf_counter()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                _finish(operation, perf_counter() - start, failed, profiler)
+        return wrapper
+
+
+def _finish(operation, elapsed, failed, profiler):
+    if METRICS_ENABLED:
+        observe(operation, elapsed, failed)
+    if profiler is not None:
+        _stop_profiler(profiler, operation)
+
+
+# ✅ Export
+def _collected():
+    collected = {}
+    for name, stats in list(_collectors.items()):
+        try:
+            collected[name] = stats()
+        except Exception as e:
+            collected[name] = {"error": str(e)}
+    return collected
+
+
+def snapshot():
+    """Everything recorded so far as a JSON-friendly dict."""
+    with _registry_lock:
+        histograms = dict(_histograms)
+    return {
+        "operations": {name: histogram.snapshot() for name, histogram in sorted(histograms.items())},
+        "collectors": _collected(),
+    }
+
+
+def json_text():
+    return json.dumps(snapshot(), indent=2, sort_keys=True)
+
+
+def prometheus_text():
+    """Renders every metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        histograms = sorted(_histograms.items())
+    lines = ["# HELP app_operation_duration_seconds Latency of instrumented operations.",
+             "# TYPE app_operation_duration_seconds histogram"]
+    for name, histogram in histograms:
+        with histogram._lock:
+            counts, total, count = list(histogram.counts), histogram.sum, histogram.count
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'app_operation_duration_seconds_bucket{{operation="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'app_operation_duration_seconds_sum{{operation="{name}"}} {total}')
+        lines.append(f'app_operation_duration_seconds_count{{operation="{name}"}} {count}')
+    lines.append("# TYPE app_operation_errors_total counter")
+    for name, histogram in histograms:
+        lines.append(f'app_operation_errors_total{{operation="{name}"}} {histogram.errors}')
+    for collector, stats in sorted(_collected().items()):
+        for key, value in sorted(stats.items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"# TYPE {collector}_{key} gauge")
+                lines.append(f"{collector}_{key} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _dump_at_exit():
+    if METRICS_DUMP and METRICS_ENABLED:
+        with open(METRICS_DUMP, "w", encoding="utf-8") as f:
+            f.write(json_text())
+
+
+atexit.register(_dump_at_exit)
@@ -0,0 +1,197 @@
+import string
+from bisect import bisect_right
+from collections import namedtuple
+
+IntentMatch = namedtuple("IntentMatch", ["intent", "keyword", "start", "end", "priority"])
+
+# Punctuation becomes whitespace so str.split() yields words; hyphenated terms like
+# "auto-defrost" stay together. str.translate/split run in C, unlike a regex tokenizer.
+_PUNCTUATION_TO_SPACE = str.maketrans({char: " " for char in string.punctuation if char not in "-_"})
+
+
+# Token placed between texts by intents_many(); it never matches and breaks multi-word keywords.
+_SEPARATOR = "\x00"
+
+
+def _tokenize(text):
+    return text.lower().translate(_PUNCTUATION_TO_SPACE).split()
+
+
+def _find_word(normalized, word, position, skip=0):
+    """Offset of the (skip + 1)-th whole-word `word` at or after `position`."""
+    while True:
+        position = normalized.find(word, position)
+        end = position + len(word)
+        if ((position == 0 or normalized[position - 1].isspace())
+                and (end == len(normalized) or normalized[end].isspace())):
+            if skip == 0:
+                return position
+            skip -= 1
+        position += 1
+
+
+class _Spans:
+    """Character spans of keyword hits, located left to right from a cursor.
+
+    Hits arrive in word order, so the text between two hits is searched once (with
+    str.count/str.find) instead of from the start for every hit.
+    """
+
+    def __init__(self, normalized, words):
+        self.normalized = normalized
+        self.words = words
+        self.index = -1  # Last located word, its offset, and the offset just after it
+        self.start = 0
+        self.position = 0
+
+    def span(self, first, end):
+        words = self.words
+        if first != self.index:
+            skip = words[self.index + 1:first].count(words[first])  # Same word earlier in the gap
+            self.start = _find_word(self.normalized, words[first], self.position, skip)
+            self.index = first
+            self.position = self.start + len(words[first])
+        stop = self.position
+        for k in range(first + 1, end):  # The rest of a multi-word keyword
+            stop = _find_word(self.normalized, words[k], stop) + len(words[k])
+        return self.start, stop
+
+
+def _word_forms(word):
+    """The word plus the plural spellings that should match it ("fridge" -> "fridges")."""
+    return frozenset((word, word + "s", word + "es"))
+
+
+class IntentRouter:
+    """Routes text to intents with a single pass over its words.
+
+    Every keyword of every intent is compiled into one table keyed on the keyword's
+    first word, so the cost per message depends on its length and not on how many
+    keywords are registered. Matching is whole-word and accepts plural endings.
+    """
+
+    def __init__(self):
+        self._intents = {}  # name -> (priority, keywords)
+        # first word -> [(remaining word forms, keyword, [(intent, priority), ...], intent names), ...]
+        self._table = None
+        self._first_words = frozenset()
+
+    def add_intent(self, name, keywords, priority=0):
+        """Registers `keywords` for intent `name`; higher priority wins in route()."""
+        self._intents[name] = (priority, list(keywords))
+        self._table = None
+
+    def compile(self):
+        owners = {}
+        for name, (priority, keywords) in self._intents.items():
+            for keyword in keywords:
+                words = tuple(_tokenize(keyword))
+                if words:
+                    owners.setdefault(words, []).append((name, priority))
+
+        self._table = {}
+        for words, intents in owners.items():
+            intents.sort(key=lambda owner: -owner[1])
+            names = tuple(intent for intent, _ in intents)
+            rest = tuple(_word_forms(word) for word in words[1:])
+            for form in _word_forms(words[0]):
+                self._table.setdefault(form, []).append((rest, " ".join(words), intents, names))
+        # Longest keywords first so "service plan" wins over "service" at the same position,
+        # then exact spellings before plural ones ("services" over "service" + "s").
+        for form, entries in self._table.items():
+            entries.sort(key=lambda entry: (-len(entry[0]), entry[1].split(" ")[0] != form))
+        self._first_words = frozenset(self._table)
+        return self
+
+    def _scan(self, words):
+        """Yields (first index, end index, table entry) for each keyword hit in `words`.
+
+        Within one intent, a hit that overlaps an earlier one is skipped (and at the same
+        position the longest keyword wins). Hits of different intents may overlap, so
+        every matched intent is reported. The yielded entry lists only the intents the
+        hit counts for.
+        """
+        if self._table is None:
+            self.compile()
+        candidates = self._first_words.intersection(words)
+        if not candidates:
+            return
+
+        # Only positions holding a keyword's first word are visited, so long messages
+        # with few hits cost little more than the tokenizing itself.
+        positions = []
+        for word in candidates:
+            index = -1
+            try:
+                while True:
+                    index = words.index(word, index + 1)
+                    positions.append(index)
+            except ValueError:
+                pass
+        positions.sort()
+
+        resume = {}  # intent -> first word index after its latest hit
+        after = resume.get
+        for i in positions:
+            for entry in self._table[words[i]]:
+                rest, keyword, intents, names = entry
+                if len(names) == 1:
+                    if after(names[0], 0) > i:
+                        continue
+                    free = None
+                else:
+                    free = [owner for owner in intents if after(owner[0], 0) <= i]
+                    if not free:
+                        continue
+                end = i + 1 + len(rest)
+                if not rest or (end <= len(words) and all(
+                        words[i + 1 + k] in forms for k, forms in enumerate(rest))):
+                    if free is not None and len(free) < len(intents):
+                        entry = (rest, keyword, free, tuple(intent for intent, _ in free))
+                    for name in entry[3]:
+                        resume[name] = end
+                    yield i, end, entry
+
+    def matches(self, text):
+        """Returns every (intent, keyword, position) hit in `text`, found in a single scan."""
+        normalized = text.lower().translate(_PUNCTUATION_TO_SPACE)
+        words = normalized.split()
+        found = []
+        spans = _Spans(normalized, words)
+        for i, end, (_, keyword, intents, _) in self._scan(words):
+            start, stop = spans.span(i, end)
+            for intent, priority in intents:
+                found.append(IntentMatch(intent, keyword, start, stop, priority))
+        return found
+
+    def intents_many(self, texts):
+        """Returns the set of matched intents for each text, scanning the whole batch at once."""
+        texts = [text.replace(_SEPARATOR, " ") for text in texts]
+        words = _tokenize(f" {_SEPARATOR} ".join(texts))
+        separators = []
+        index = -1
+        try:
+            while True:
+                index = words.index(_SEPARATOR, index + 1)
+                separators.append(index)
+        except ValueError:
+            pass
+
+        found = [set() for _ in texts]
+        for i, _, entry in self._scan(words):
+            found[bisect_right(separators, i)].update(entry[3])
+        return found
+
+    def intents(self, text):
+        found = set()
+        for _, _, entry in self._scan(_tokenize(text)):
+            found.update(entry[3])
+        return found
+
+    def route(self, text, default=None):
+        """Returns the highest-priority matched intent (earliest match breaks ties)."""
+        best = None
+        for match in self.matches(text):
+            if best is None or match.priority > best.priority:
+                best = match
+        return best.intent if best else default
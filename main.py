@@ -1,28 +1,103 @@
+import argparse
 import sys
-import os
-from PyQt5.QtWidgets import QApplication
-from chatbot import is_valid_email
-from sentiment_analysis import SentimentApp
 
-if __name__ == "__main__":
-    email = input("Enter your registered email: ").strip()
+# ✅ Every mode imports its own dependencies once it has been chosen, so asking for the
+# email (or a text-only chat) never loads PyQt5, speech_recognition or the HTTP server.
+
 
-    if not is_valid_email(email):
+def check_email(email):
+    from user_directory import lookup_user
+
+    if lookup_user(email) is None:
         print("⚠️ Error: This email is not registered in our system.")
-        exit()
+        sys.exit(1)
+    return email
+
+
+def run_chat(email):
+    import chatbot
+
+    print("🔄 Launching chatbot...")
+    chatbot.main(email)
+
+
+def run_sentiment(email):
+    from PyQt5.QtWidgets import QApplication
+    from sentiment_analysis import SentimentApp
+
+    print("🔄 Launching sentiment analysis application...")
+    app = QApplication(sys.argv)
+    sentiment_app = SentimentApp(email=email)
+    sentiment_app.show()
+    sys.exit(app.exec_())
+
+
+def run_migrations(db_path, target):
+    import sqlite3
+    from migrations import migrate
+
+    conn = sqlite3.connect(db_path)
+    try:
+        migrate(conn, target)
+    finally:
+        conn.close()
+
 
+def run_server(host, port, workers):
+    import asyncio
+    import chat_server
+
+    try:
+        asyncio.run(chat_server.main(chat_server.CHAT_HOST if host is None else host,
+                                     chat_server.CHAT_PORT if port is None else port,
+                                     workers or chat_server.CHAT_WORKERS))
+    except KeyboardInterrupt:
+        print("👋 Chat server stopped.")
+
+
+def interactive():
+    """The original prompt-driven launcher, used when no subcommand is given."""
+    email = check_email(input("Enter your registered email: ").strip())
     chatbot_mode = input("Type 'chatbot' to use chatbot or 'sentiment' to provide feedback: ").strip().lower()
 
     if chatbot_mode == "chatbot":
-        print("🔄 Launching chatbot...")
-        os.system("python chatbot.py")  # ✅ Executes chatbot.py
-
+        run_chat(email)
     elif chatbot_mode == "sentiment":
-        print("🔄 Launching sentiment analysis application...")
-        app = QApplication(sys.argv)
-        sentiment_app = SentimentApp()
-        sentiment_app.show()
-        sys.exit(app.exec_())  # ✅ Runs sentiment_analysis.py
-
+        run_sentiment(email)
     else:
         print("⚠️ Invalid choice. Please restart and select 'chatbot' or 'sentiment'.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Customer support assistant: chatbot, feedback app or chat server.")
+    commands = parser.add_subparsers(dest="command")
+    chat = commands.add_parser("chat", help="Chat in the terminal (text or voice)")
+    chat.add_argument("--email", help="Registered email (asked for when omitted)")
+    sentiment = commands.add_parser("sentiment", help="Open the feedback and sentiment analysis app")
+    sentiment.add_argument("--email", help="Registered email (asked for when omitted)")
+    serve = commands.add_parser("serve", help="Serve the chatbot over HTTP to many sessions")
+    serve.add_argument("--host", help="Defaults to CHAT_HOST")
+    serve.add_argument("--port", type=int, help="Defaults to CHAT_PORT")
+    serve.add_argument("--workers", type=int, help="Defaults to CHAT_WORKERS")
+    upgrade = commands.add_parser("migrate", help="Apply pending database schema migrations")
+    upgrade.add_argument("--db", help="Defaults to DB_PATH")
+    upgrade.add_argument("--target", type=int, help="Stop at this schema version")
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        interactive()
+    elif args.command == "serve":
+        run_server(args.host, args.port, args.workers)
+    elif args.command == "migrate":
+        from db_pool import DB_PATH
+        run_migrations(args.db or DB_PATH, args.target)
+    else:
+        email = check_email(args.email or input("Enter your registered email: ").strip())
+        if args.command == "chat":
+            run_chat(email)
+        else:
+            run_sentiment(email)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import argparse
+import importlib
+import os
+import sqlite3
+import tempfile
+import time
+from collections import namedtuple
+
+# ✅ A migration is a numbered list of idempotent steps (SQL strings or callables taking
+# the connection) plus the queries whose plan and timing it is expected to improve.
+# A check's `uses` (an index name, or e.g. "PRIMARY KEY") must appear in its query plan
+# after the migration, otherwise the migration is rolled back.
+Migration = namedtuple("Migration", ["version", "description", "steps", "checks"])
+Check = namedtuple("Check", ["name", "sql", "params", "uses"], defaults=(None,))
+
+
+# Feature modules own their DDL (SCHEMA) but import db_pool, the cache and so on, and
+# database.py imports this module; so they are only imported when their migration runs.
+def schema(module):
+    """Step that executes `module.SCHEMA`."""
+    def step(conn):
+        for statement in importlib.import_module(module).SCHEMA:
+            conn.execute(statement)
+    return step
+
+
+def call(module, function, **kwargs):
+    """Step that calls `module.function(conn, **kwargs)`."""
+    return lambda conn: getattr(importlib.import_module(module), function)(conn, **kwargs)
+
+
+NEGATIVE_BY_PRODUCT = """
+SELECT products.name, COUNT(*)
+FROM feedback
+JOIN users ON users.id = feedback.user_id
+JOIN products ON products.id = users.product_id
+WHERE feedback.sentiment = 'NEGATIVE' AND feedback.timestamp >= datetime('now', '-30 days')
+GROUP BY products.name
+"""
+
+LATEST_USER_FEEDBACK = """
+SELECT sentiment, timestamp FROM feedback WHERE user_id = ? ORDER BY timestamp DESC LIMIT 5
+"""
+
+MIGRATIONS = [
+    Migration(1, "Secondary indexes for feedback and users lookups", [
+        "CREATE INDEX IF NOT EXISTS idx_feedback_user_id ON feedback(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback(timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_feedback_sentiment ON feedback(sentiment)",
+        "CREATE INDEX IF NOT EXISTS idx_users_product_id ON users(product_id)",
+    ], [
+        Check("feedback by user", "SELECT COUNT(*) FROM feedback WHERE user_id = ?", (1,)),
+        Check("feedback last 7 days", "SELECT COUNT(*) FROM feedback WHERE timestamp >= datetime('now', '-7 days')", ()),
+        Check("negative feedback", "SELECT COUNT(*) FROM feedback WHERE sentiment = ?", ("NEGATIVE",)),
+        Check("users by product", "SELECT COUNT(*) FROM users WHERE product_id = ?", (1,)),
+    ]),
+    # The users JOIN products profile lookup is already a UNIQUE(email) seek plus a rowid
+    # seek, so the join that gains from covering indexes is feedback -> users -> products.
+    # Both new indexes start with the columns of a migration 1 index, which is dropped.
+    Migration(2, "Covering indexes for feedback joins", [
+        "CREATE INDEX IF NOT EXISTS idx_feedback_sentiment_time_user ON feedback(sentiment, timestamp, user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_feedback_user_time ON feedback(user_id, timestamp, sentiment)",
+        "DROP INDEX IF EXISTS idx_feedback_sentiment",
+        "DROP INDEX IF EXISTS idx_feedback_user_id",
+    ], [
+        Check("negative feedback by product (30 days)", NEGATIVE_BY_PRODUCT, ()),
+        Check("latest feedback of a user", LATEST_USER_FEEDBACK, (1,)),
+    ]),
+    Migration(3, "Checkpoint table for batch audio transcription", [
+        """CREATE TABLE IF NOT EXISTS transcription_checkpoint (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            status TEXT NOT NULL,
+            feedback_id INTEGER,
+            processed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )""",
+    ], [
+        Check("checkpoint of a file", "SELECT status, size, mtime FROM transcription_checkpoint WHERE path = ?",
+              ("42_call.wav",), "sqlite_autoindex_transcription_checkpoint_1"),
+    ]),
+    # Backfills the rollups from existing feedback; later rows are added incrementally.
+    Migration(4, "Sentiment rollup tables for dashboards", [
+        schema("sentiment_rollups"),
+        call("sentiment_rollups", "refresh", update_users=False),
+    ], [
+        Check("sentiment by product (30 days)", "SELECT product_id, sentiment, SUM(count) FROM sentiment_daily "
+              "WHERE day >= date('now', '-30 days') GROUP BY product_id, sentiment", (), "PRIMARY KEY"),
+        Check("sentiment of a user", "SELECT sentiment, SUM(count) FROM sentiment_user_daily "
+              "WHERE user_id = ? AND day >= date('now', '-30 days') GROUP BY sentiment", (1,), "PRIMARY KEY"),
+    ]),
+    Migration(5, "Escalation queue and agent load tables", [schema("escalation")], [
+        Check("head of the escalation queue",
+              "SELECT id FROM escalations WHERE status = 'queued' ORDER BY priority DESC, id LIMIT 1", (),
+              "idx_escalations_queue"),
+        Check("least loaded agent", "SELECT agent_id FROM agent_load WHERE open_cases < ? "
+              "ORDER BY open_cases, last_assigned LIMIT 1", (5,), "idx_agent_load_least_loaded"),
+    ]),
+    # Creates the (empty) full-text index; existing rows are indexed by `feedback_search.py backfill`.
+    Migration(6, "Full-text search index over feedback text", [schema("feedback_search")], [
+        Check("full-text match", "SELECT rowid FROM feedback_fts WHERE feedback_fts MATCH ? ORDER BY rank LIMIT 20",
+              ("compressor",), "VIRTUAL TABLE INDEX"),
+    ]),
+    Migration(7, "Service slots, bookings and technicians", [
+        schema("scheduler"),
+        call("scheduler", "seed_technicians"),
+        call("scheduler", "open_slots"),
+    ], [
+        Check("free slot on a day", "SELECT technician_id FROM service_slots WHERE day = date('now', '+1 day') "
+              "AND booked < capacity ORDER BY booked, technician_id LIMIT 1", (), "PRIMARY KEY"),
+        Check("active booking of a user", "SELECT id, day FROM service_bookings WHERE user_id = ? AND status = 'booked'",
+              (1,), "idx_service_bookings_active"),
+    ]),
+    Migration(8, "Summary table for archived feedback months", [schema("feedback_archive")], [
+        Check("parts of an archived month", "SELECT COALESCE(MAX(part), 0) FROM feedback_archive WHERE month = ?",
+              ("2024-01",), "sqlite_autoindex_feedback_archive_1"),
+    ]),
+    Migration(9, "Change log of user emails for the in-memory user directory", [schema("user_directory")], [
+        Check("changes since a watermark", "SELECT seq, user_id FROM user_changes WHERE seq > ? ORDER BY seq LIMIT 100",
+              (0,), "INTEGER PRIMARY KEY"),
+    ]),
+    Migration(10, "Log warranty changes for the eligibility index", [schema("eligibility")], [
+        Check("changed warranties since a watermark", "SELECT user_changes.user_id, users.warranty_expiry "
+              "FROM user_changes LEFT JOIN users ON users.id = user_changes.user_id WHERE user_changes.seq > ?",
+              (0,), "INTEGER PRIMARY KEY"),
+    ]),
+    Migration(11, "Completed status for service bookings whose day has passed", [
+        call("scheduler", "allow_completed_status"),
+    ], [
+        Check("active booking of a user", "SELECT id, day FROM service_bookings WHERE user_id = ? AND status = 'booked'",
+              (1,), "idx_service_bookings_active"),
+    ]),
+    # Re-applies migration 9's schema, which now also logs product changes (IF NOT EXISTS throughout).
+    Migration(12, "Log product changes for the user directory", [schema("user_directory")], []),
+]
+
+
+def ensure_version_table(conn):
+    with conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migration_checks (
+            version INTEGER NOT NULL,
+            check_name TEXT NOT NULL,
+            phase TEXT NOT NULL CHECK (phase IN ('before', 'after')),
+            query_plan TEXT NOT NULL,
+            avg_ms REAL NOT NULL,
+            recorded_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+
+
+def current_version(conn):
+    ensure_version_table(conn)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+class SchemaOutdated(RuntimeError):
+    """The database has pending migrations; tools that must not migrate on their own raise this."""
+
+
+def require_current(conn, minimum=None):
+    """Returns the schema version, or raises SchemaOutdated if it is below `minimum` (by
+    default the latest migration). Never writes."""
+    try:
+        version = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+    except sqlite3.OperationalError:
+        version = 0  # Never migrated
+    needed = minimum if minimum is not None else MIGRATIONS[-1].version
+    if version < needed:
+        raise SchemaOutdated(f"Database schema is at version {version} but version {needed} is needed; "
+                             "run `python main.py migrate` first.")
+    return version
+
+
+def run_check(conn, check, repeat=5):
+    """Returns (query plan, average milliseconds) for one check query."""
+    plan = " | ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {check.sql}", check.params))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute(check.sql, check.params).fetchall()
+    return plan, (time.perf_counter() - start) / repeat * 1000
+
+
+def _record_checks(conn, migration, phase):
+    results = []
+    for check in migration.checks:
+        try:
+            plan, avg_ms = run_check(conn, check)
+        except sqlite3.OperationalError:
+            if phase == "after":
+                raise
+            results.append((check.name, "(table not created yet)", None))
+            continue
+        if phase == "after" and check.uses and check.uses not in plan:
+            raise RuntimeError(f"Migration {migration.version}: '{check.name}' should use {check.uses}, "
+                               f"but its plan is: {plan}")
+        results.append((check.name, plan, avg_ms))
+        conn.execute(
+            "INSERT INTO schema_migration_checks (version, check_name, phase, query_plan, avg_ms) VALUES (?, ?, ?, ?, ?)",
+            (migration.version, check.name, phase, plan, avg_ms))
+    return results
+
+
+def migrate(conn, target=None, verbose=True):
+    """Applies every pending migration up to `target`, each in its own transaction."""
+    version = current_version(conn)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= version or (target is not None and migration.version > target):
+            continue
+        if verbose:
+            print(f"🛠 Applying migration {migration.version}: {migration.description}...")
+        with conn:
+            conn.execute("BEGIN")  # DDL included, so a failed step leaves no partial migration
+            before = _record_checks(conn, migration, "before")
+            for step in migration.steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                         (migration.version, migration.description))
+            after = _record_checks(conn, migration, "after")
+        applied.append(migration.version)
+        if verbose:
+            for (name, plan_before, ms_before), (_, plan_after, ms_after) in zip(before, after):
+                print(f"   {name}: {'-' if ms_before is None else f'{ms_before:.2f}'} ms -> {ms_after:.2f} ms")
+                print(f"      before: {plan_before}")
+                print(f"      after:  {plan_after}")
+    if verbose and not applied:
+        print(f"✅ Schema is up to date (version {version}).")
+    return applied
+
+
+# ✅ Verifying Migrations Against a Generated Large Dataset
+def verify(users=100000, feedback=1000000):
+    """Builds a throwaway database of the given size and migrates it, printing every check."""
+    from data_generator import generate_rows
+    from database import create_database
+
+    workdir = tempfile.mkdtemp(prefix="verify_migrations_")
+    path = os.path.join(workdir, "verify.db")
+    create_database(path, apply_migrations=False)
+    conn = sqlite3.connect(path)
+    print(f"🔄 Generating {users:,} users and {feedback:,} feedback rows...")
+    generate_rows(conn, users, feedback)
+    migrate(conn)
+    conn.close()
+    os.remove(path)
+    os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    from db_pool import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Versioned schema migrations for electronics_company.db.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    up = commands.add_parser("migrate", help="Apply pending migrations")
+    up.add_argument("--db", default=DB_PATH)
+    up.add_argument("--target", type=int)
+    status = commands.add_parser("status", help="Show the current schema version")
+    status.add_argument("--db", default=DB_PATH)
+    check = commands.add_parser("verify", help="Measure every migration on a generated large dataset")
+    check.add_argument("--users", type=int, default=100000)
+    check.add_argument("--feedback", type=int, default=1000000)
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        verify(args.users, args.feedback)
+    else:
+        conn = sqlite3.connect(args.db)
+        if args.command == "migrate":
+            migrate(conn, args.target)
+        else:
+            print(f"Schema version: {current_version(conn)} (latest: {MIGRATIONS[-1].version})")
+        conn.close()
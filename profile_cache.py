@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from db_pool import fetch_one, execute
+from instrumentation import timed
+
+# ✅ Cache Settings (overridable from .env)
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))
+PROFILE_CACHE_NEGATIVE_TTL = float(os.getenv("PROFILE_CACHE_NEGATIVE_TTL", "5"))  # Unknown emails: new sign-ups show up quickly
+
+CustomerProfile = namedtuple("CustomerProfile", [
+    "user_id", "name", "product_id", "product", "warranty_expiry",
+    "last_service_date", "maintenance_plan",
+])
+
+PROFILE_QUERY = """
+SELECT users.id, users.name, users.product_id, products.name, users.warranty_expiry,
+       users.last_service_date, users.maintenance_plan
+FROM users
+JOIN products ON users.product_id = products.id
+WHERE users.email = ?
+"""
+
+
+class ProfileCache:
+    """LRU cache of customer profiles with a per-entry time-to-live.
+
+    invalidate() bumps a generation counter for emails that are being loaded, and a load
+    only stores its row if the generation is unchanged. A row read before a concurrent
+    update is therefore never cached. The counters exist only while a load is in flight.
+    """
+
+    def __init__(self, max_size=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL, negative_ttl=PROFILE_CACHE_NEGATIVE_TTL,
+                 clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._loading = {}  # email -> number of loads in flight
+        self._generations = {}  # email -> invalidations seen while it was loading
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, email):
+        """Returns the cached profile for `email`, loading it with one query on a miss."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(email)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generations.get(email, 0)
+            self._loading[email] = self._loading.get(email, 0) + 1
+
+        try:
+            row = fetch_one(PROFILE_QUERY, (email,))
+        except BaseException:
+            with self._lock:
+                self._finish_load(email, generation)
+            raise
+        profile = CustomerProfile(*row) if row else None
+        with self._lock:
+            # Invalidated while loading: the row is used this once but not cached.
+            if not self._finish_load(email, generation):
+                # Unknown emails are cached too (briefly) so repeated bad logins don't hit SQLite.
+                self._entries[email] = (now + (self.ttl if profile else self.negative_ttl), profile)
+                self._entries.move_to_end(email)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return profile
+
+    def _finish_load(self, email, generation):
+        """Ends one load (caller holds the lock); returns True if `email` was invalidated meanwhile."""
+        stale = self._generations.get(email, 0) != generation
+        self._loading[email] -= 1
+        if not self._loading[email]:
+            del self._loading[email]
+            self._generations.pop(email, None)
+        return stale
+
+    def invalidate(self, email):
+        with self._lock:
+            if email in self._loading:
+                self._generations[email] = self._generations.get(email, 0) + 1
+            if self._entries.pop(email, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+            }
+
+    def prometheus_text(self):
+        """Renders the counters in the Prometheus text exposition format."""
+        stats = self.stats()
+        lines = []
+        for key in ("hits", "misses", "evictions", "invalidations"):
+            lines.append(f"# TYPE profile_cache_{key}_total counter")
+            lines.append(f"profile_cache_{key}_total {stats[key]}")
+        lines.append("# TYPE profile_cache_size gauge")
+        lines.append(f"profile_cache_size {stats['size']}")
+        return "\n".join(lines) + "\n"
+
+
+# ✅ Shared Cache Used by chatbot.py
+profile_cache = ProfileCache()
+
+
+@timed("profile_lookup")
+def get_profile(email):
+    return profile_cache.get(email)
+
+
+def update_last_service_date(email, new_service_date):
+    """Writes the new service date and drops the cached profile (write-through invalidation)."""
+    try:
+        return execute("UPDATE users SET last_service_date = ? WHERE email = ?", (new_service_date, email))
+    finally:
+        profile_cache.invalidate(email)
@@ -0,0 +1,266 @@
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+# ✅ Cache Settings (overridable from .env)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+# Jaccard similarity needed for a near-duplicate hit; 0 turns fuzzy matching off.
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0"))
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "my", "me", "i", "it", "to", "of", "and", "or", "for",
+    "in", "on", "with", "do", "does", "can", "you", "your", "this", "that", "what", "how", "why",
+}
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_prompt(prompt):
+    """Lower-cases and collapses whitespace so formatting differences share a cache entry."""
+    return " ".join(prompt.lower().split())
+
+
+def prompt_tokens(prompt):
+    return frozenset(word for word in _WORD_RE.findall(prompt.lower()) if word not in STOPWORDS)
+
+
+def cache_key(prompt, model):
+    return hashlib.sha256(f"{model}\n{normalize_prompt(prompt)}".encode()).hexdigest()
+
+
+class ResponseCache:
+    """Persistent SQLite cache of Gemini answers keyed on model + normalized prompt.
+
+    Near-duplicate matching compares `fuzzy_text`, the part of the prompt the user wrote,
+    not the full prompt: shared template words would make every entry look alike.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 similarity=LLM_CACHE_SIMILARITY):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS response_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            prompt TEXT NOT NULL,
+            fuzzy INTEGER NOT NULL DEFAULT 0,
+            fuzzy_text TEXT,
+            response TEXT NOT NULL,
+            latency REAL NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        if "fuzzy_text" not in {row[1] for row in self._conn.execute("PRAGMA table_info(response_cache)")}:
+            self._conn.execute("ALTER TABLE response_cache ADD COLUMN fuzzy_text TEXT")  # Caches from before it existed
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_last_access ON response_cache(last_access)")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        self._fuzzy_index = None  # token -> {key}, built on first fuzzy lookup
+        self._fuzzy_tokens = {}   # key -> (model, tokens)
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    # ✅ Near-Duplicate Index (only entries stored with a fuzzy_text take part)
+    def _load_fuzzy_index(self):
+        self._fuzzy_index = {}
+        for key, model, fuzzy_text in self._conn.execute(
+                "SELECT key, model, fuzzy_text FROM response_cache WHERE fuzzy = 1 AND fuzzy_text IS NOT NULL"):
+            self._index_fuzzy(key, model, fuzzy_text)
+
+    def _index_fuzzy(self, key, model, fuzzy_text):
+        tokens = prompt_tokens(fuzzy_text)
+        self._fuzzy_tokens[key] = (model, tokens)
+        for token in tokens:
+            self._fuzzy_index.setdefault(token, set()).add(key)
+
+    def _unindex_fuzzy(self, key):
+        if self._fuzzy_index is None or key not in self._fuzzy_tokens:
+            return
+        _, tokens = self._fuzzy_tokens.pop(key)
+        for token in tokens:
+            keys = self._fuzzy_index.get(token)
+            if keys:
+                keys.discard(key)
+
+    def _nearest(self, fuzzy_text, model):
+        if self._fuzzy_index is None:
+            self._load_fuzzy_index()
+        tokens = prompt_tokens(fuzzy_text)
+        if not tokens:
+            return None
+        # An entry at least `similarity` similar shares at least `needed` of these tokens, so it
+        # holds one of the rarest len(tokens) - needed + 1; only their postings are read.
+        index = self._fuzzy_index
+        needed = max(1, math.ceil(self.similarity * len(tokens) - 1e-9))
+        rarest = sorted(tokens, key=lambda token: len(index.get(token, ())))[:len(tokens) - needed + 1]
+        best_key, best_score = None, 0.0
+        for key in set().union(*(index.get(token, ()) for token in rarest)):
+            entry_model, entry_tokens = self._fuzzy_tokens[key]
+            if entry_model != model:
+                continue
+            shared = len(tokens & entry_tokens)
+            score = shared / (len(tokens) + len(entry_tokens) - shared)
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key if best_score >= self.similarity else None
+
+    # ✅ Lookups & Inserts
+    def _lookup(self, key, now):
+        row = self._conn.execute(
+            "SELECT response, latency, created_at FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        response, latency, created_at = row
+        if created_at + self.ttl < now:
+            self._delete([key])
+            return None
+        self._conn.execute(
+            "UPDATE response_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        self.saved_seconds += latency
+        return response
+
+    def get(self, prompt, model, fuzzy_text=None):
+        """Returns a cached answer or None; with `fuzzy_text` (the user's own words in the
+        prompt) an entry whose fuzzy_text is a near-duplicate also answers."""
+        now = time.time()
+        with self._lock:
+            response = self._lookup(cache_key(prompt, model), now)
+            if response is not None:
+                self.hits += 1
+                return response
+            if fuzzy_text is not None and self.similarity > 0:
+                key = self._nearest(fuzzy_text, model)
+                if key is not None:
+                    response = self._lookup(key, now)
+                    if response is not None:
+                        self.fuzzy_hits += 1
+                        return response
+            self.misses += 1
+            return None
+
+    def put(self, prompt, model, response, latency, fuzzy_text=None):
+        key = cache_key(prompt, model)
+        now = time.time()
+        fuzzy_text = None if fuzzy_text is None else normalize_prompt(fuzzy_text)
+        with self._lock:
+            cursor = self._conn.execute("""
+            INSERT OR IGNORE INTO response_cache (key, model, prompt, fuzzy, fuzzy_text, response, latency,
+                                                  created_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, model, normalize_prompt(prompt), int(fuzzy_text is not None), fuzzy_text, response, latency,
+                  now, now))
+            if cursor.rowcount == 0:
+                self._conn.execute("""
+                UPDATE response_cache SET response = ?, latency = ?, created_at = ?, last_access = ?
+                WHERE key = ?
+                """, (response, latency, now, now, key))
+            else:
+                self._count += 1
+            if fuzzy_text is not None and self._fuzzy_index is not None and key not in self._fuzzy_tokens:
+                self._index_fuzzy(key, model, fuzzy_text)
+            if self._count > self.max_entries:
+                self._evict(now)
+
+    def get_or_generate(self, prompt, model, generate, fuzzy_text=None):
+        """Answers from the cache, otherwise calls `generate(prompt)` and stores the result."""
+        response = self.get(prompt, model, fuzzy_text)
+        if response is not None:
+            return response
+        start = time.perf_counter()
+        response = generate(prompt)
+        self.put(prompt, model, response, time.perf_counter() - start, fuzzy_text)
+        return response
+
+    # ✅ Eviction: expired entries first, then least recently used
+    def _delete(self, keys):
+        self._conn.executemany("DELETE FROM response_cache WHERE key = ?", [(key,) for key in keys])
+        self._count -= len(keys)
+        for key in keys:
+            self._unindex_fuzzy(key)
+
+    def _evict(self, now):
+        expired = [row[0] for row in self._conn.execute(
+            "SELECT key FROM response_cache WHERE created_at < ?", (now - self.ttl,))]
+        self._delete(expired)
+        excess = self._count - self.max_entries
+        if excess > 0:
+            # Trim an extra 10% so eviction doesn't run on every insert once full.
+            limit = excess + self.max_entries // 10
+            oldest = [row[0] for row in self._conn.execute(
+                "SELECT key FROM response_cache ORDER BY last_access LIMIT ?", (limit,))]
+            self._delete(oldest)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+            self._count = 0
+            self._fuzzy_index = None
+            self._fuzzy_tokens = {}
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.fuzzy_hits + self.misses
+            return {
+                "entries": self._count,
+                "hits": self.hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.fuzzy_hits) / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
+
+    def report(self):
+        stats = self.stats()
+        # Lifetime figures come from the table, session figures from the counters above.
+        saved_total, hits_total = self._conn.execute(
+            "SELECT COALESCE(SUM(latency * hits), 0), COALESCE(SUM(hits), 0) FROM response_cache").fetchone()
+        return (
+            f"📦 Entries: {stats['entries']}\n"
+            f"🎯 This session: {stats['hits']} hits, {stats['fuzzy_hits']} near-duplicate hits, "
+            f"{stats['misses']} misses (hit rate {stats['hit_rate']:.1%}), "
+            f"{stats['saved_seconds']:.2f}s of Gemini latency saved\n"
+            f"⏱ All time: {hits_total} hits, {saved_total:.2f}s of Gemini latency saved"
+        )
+
+    def close(self):
+        self._conn.close()
+
+
+# ✅ Shared Cache Used by chatbot.py
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = get_response_cache()
+    if command == "clear":
+        cache.clear()
+        print("✅ Response cache cleared.")
+    else:
+        print(cache.report())
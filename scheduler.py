@@ -0,0 +1,315 @@
+import argparse
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+import db_pool
+
+# ✅ Scheduling Settings (overridable from .env)
+SERVICE_TECHNICIANS = int(os.getenv("SERVICE_TECHNICIANS", "3"))  # Seeded when the technicians table is empty
+SERVICE_SLOTS_PER_DAY = int(os.getenv("SERVICE_SLOTS_PER_DAY", "4"))  # Visits per technician per day
+SERVICE_HORIZON_DAYS = int(os.getenv("SERVICE_HORIZON_DAYS", "60"))  # How far ahead slots are open
+SERVICE_CLOSED_WEEKDAYS = {int(day) for day in os.getenv("SERVICE_CLOSED_WEEKDAYS", "6").split(",") if day}  # 6 = Sunday
+SERVICE_CALENDAR_REFRESH_SECONDS = float(os.getenv("SERVICE_CALENDAR_REFRESH_SECONDS", "30"))
+
+# ✅ Schema (applied by migrations.py, version 7)
+# One service_slots row per (day, technician) holds its capacity and how much of it is
+# booked; a booking is a conditional increment of `booked`, so capacity can't be exceeded
+# however many sessions book at once. Each user has at most one active booking; one for
+# a day that has passed is marked completed (migration 11) rather than cancelled.
+BOOKINGS_TABLE = """CREATE TABLE IF NOT EXISTS service_bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    technician_id INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'booked' CHECK (status IN ('booked', 'cancelled', 'completed')),
+    created_at REAL NOT NULL,
+    cancelled_at REAL,
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (day, technician_id) REFERENCES service_slots(day, technician_id)
+)"""
+BOOKINGS_INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_service_bookings_active ON service_bookings(user_id) WHERE status = 'booked'",
+    "CREATE INDEX IF NOT EXISTS idx_service_bookings_day ON service_bookings(day, technician_id)",
+]
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS technicians (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        daily_capacity INTEGER NOT NULL DEFAULT 4
+    )""",
+    """CREATE TABLE IF NOT EXISTS service_slots (
+        day TEXT NOT NULL,
+        technician_id INTEGER NOT NULL,
+        capacity INTEGER NOT NULL,
+        booked INTEGER NOT NULL DEFAULT 0 CHECK (booked >= 0 AND booked <= capacity),
+        PRIMARY KEY (day, technician_id),
+        FOREIGN KEY (technician_id) REFERENCES technicians(id)
+    ) WITHOUT ROWID""",
+    BOOKINGS_TABLE,
+] + BOOKINGS_INDEXES
+
+# Least-booked technician with room on the day (or the requested technician), in one statement.
+CLAIM_SLOT = """
+UPDATE service_slots SET booked = booked + 1
+WHERE day = ?1 AND technician_id = (
+    SELECT technician_id FROM service_slots
+    WHERE day = ?1 AND booked < capacity AND (?2 IS NULL OR technician_id = ?2)
+    ORDER BY booked, technician_id LIMIT 1)
+RETURNING technician_id, capacity - booked
+"""
+
+RELEASE_SLOT = """
+UPDATE service_slots SET booked = booked - 1 WHERE day = ? AND technician_id = ? AND booked > 0
+RETURNING capacity - booked
+"""
+
+FREE_SLOTS = "SELECT day, technician_id, capacity - booked FROM service_slots WHERE day >= ? AND booked < capacity"
+
+# Ends the user's active booking: an upcoming one is cancelled (the caller releases its
+# slot), one whose day has passed was presumably the visit and is marked completed.
+END_ACTIVE_BOOKING = """
+UPDATE service_bookings SET status = CASE WHEN day >= ?1 THEN 'cancelled' ELSE 'completed' END,
+    cancelled_at = CASE WHEN day >= ?1 THEN ?2 END
+WHERE user_id = ?3 AND status = 'booked'
+RETURNING day, technician_id, status
+"""
+
+Booking = namedtuple("Booking", ["booking_id", "day", "technician_id"])
+
+
+class SlotUnavailable(ValueError):
+    """The day has no free slot; `next_available` is the first later day that has one (or None)."""
+
+    def __init__(self, day, next_available):
+        super().__init__(f"No free service slot on {day}.")
+        self.day = day
+        self.next_available = next_available
+
+
+def seed_technicians(conn, count=SERVICE_TECHNICIANS, capacity=SERVICE_SLOTS_PER_DAY):
+    if conn.execute("SELECT COUNT(*) FROM technicians").fetchone()[0] == 0:
+        conn.executemany("INSERT INTO technicians (name, daily_capacity) VALUES (?, ?)",
+                         [(f"Technician {i}", capacity) for i in range(1, count + 1)])
+
+
+def allow_completed_status(conn):
+    """Migration 11: rebuilds service_bookings with 'completed' allowed (SQLite can't alter a CHECK)."""
+    if "'completed'" in conn.execute("SELECT sql FROM sqlite_master WHERE name = 'service_bookings'").fetchone()[0]:
+        return
+    conn.execute("DROP INDEX IF EXISTS idx_service_bookings_active")
+    conn.execute("DROP INDEX IF EXISTS idx_service_bookings_day")
+    conn.execute("ALTER TABLE service_bookings RENAME TO service_bookings_old")
+    conn.execute(BOOKINGS_TABLE)
+    conn.execute("INSERT INTO service_bookings SELECT * FROM service_bookings_old")
+    conn.execute("DROP TABLE service_bookings_old")
+    for statement in BOOKINGS_INDEXES:
+        conn.execute(statement)
+
+
+def open_slots(conn, days=SERVICE_HORIZON_DAYS, today=None):
+    """Creates every technician's slots for the open days in the next `days` days (idempotent)."""
+    today = today or datetime.date.today()
+    open_days = [((today + datetime.timedelta(days=offset)).isoformat(),) for offset in range(days)
+                 if (today + datetime.timedelta(days=offset)).weekday() not in SERVICE_CLOSED_WEEKDAYS]
+    conn.executemany("INSERT OR IGNORE INTO service_slots (day, technician_id, capacity) "
+                     "SELECT ?, id, daily_capacity FROM technicians", open_days)
+
+
+class ServiceCalendar:
+    """In-memory index of free capacity by day and technician.
+
+    Days with a free slot are kept in sorted lists (overall and per technician), so the
+    next available day is one bisect. The database stays authoritative: bookings update
+    the index as they commit, and it is reloaded every `refresh_seconds` to pick up
+    bookings made by other processes. Reloading also opens the slots of days that have
+    come into the booking horizon.
+    """
+
+    def __init__(self, refresh_seconds=SERVICE_CALENDAR_REFRESH_SECONDS, clock=time.monotonic):
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._free = {}  # day -> {technician_id: free slots}
+        self._days = []
+        self._technician_days = {}
+        self._next_refresh = 0.0
+        self._opened_through = None
+        self.refreshes = 0
+
+    def refresh(self):
+        today = datetime.date.today()
+        if self._opened_through != today:
+            with db_pool.get_pool().writer() as conn:
+                open_slots(conn, today=today)
+            self._opened_through = today
+        free, technician_days = {}, {}
+        for day, technician_id, slots in db_pool.fetch_all(FREE_SLOTS, (today.isoformat(),)):
+            free.setdefault(day, {})[technician_id] = slots
+            technician_days.setdefault(technician_id, []).append(day)
+        with self._lock:
+            self._free = free
+            self._days = sorted(free)
+            self._technician_days = {technician_id: sorted(days) for technician_id, days in technician_days.items()}
+            self._next_refresh = self._clock() + self.refresh_seconds
+            self.refreshes += 1
+
+    def _maybe_refresh(self):
+        if self._clock() >= self._next_refresh:
+            self.refresh()
+
+    def next_available(self, after=None, technician_id=None):
+        """First day on or after `after` (YYYY-MM-DD, default today) with a free slot, or None."""
+        self._maybe_refresh()
+        after = after or datetime.date.today().isoformat()
+        with self._lock:
+            days = self._days if technician_id is None else self._technician_days.get(technician_id, [])
+            index = bisect_left(days, after)
+            return days[index] if index < len(days) else None
+
+    def free_slots(self, day):
+        """{technician_id: free slots} on `day`."""
+        self._maybe_refresh()
+        with self._lock:
+            return dict(self._free.get(day, {}))
+
+    def update(self, day, technician_id, free):
+        """Records a slot's remaining capacity after a booking, cancellation or failed claim."""
+        with self._lock:
+            technicians = self._free.setdefault(day, {})
+            days = self._technician_days.setdefault(technician_id, [])
+            index = bisect_left(days, day)
+            listed = index < len(days) and days[index] == day
+            if free > 0:
+                technicians[technician_id] = free
+                if not listed:
+                    days.insert(index, day)
+            else:
+                technicians.pop(technician_id, None)
+                if listed:
+                    del days[index]
+            index = bisect_left(self._days, day)
+            listed = index < len(self._days) and self._days[index] == day
+            if technicians and not listed:
+                insort(self._days, day)
+            elif not technicians:
+                self._free.pop(day, None)
+                if listed:
+                    del self._days[index]
+
+    def mark_full(self, day, technician_id=None):
+        with self._lock:
+            technicians = list(self._free.get(day, {})) if technician_id is None else [technician_id]
+        for technician in technicians:
+            self.update(day, technician, 0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "open_days": len(self._days),
+                "free_slots": sum(sum(slots.values()) for slots in self._free.values()),
+                "refreshes": self.refreshes,
+            }
+
+
+# ✅ Shared Calendar Used by chatbot.py
+service_calendar = ServiceCalendar()
+
+
+def book(user_id, day, technician_id=None):
+    """Books a slot on `day` (YYYY-MM-DD) for the user and returns the Booking.
+
+    The user's previous active booking, if any, is released in the same transaction (or
+    marked completed when its day has passed; that slot is left as it was) and
+    users.last_service_date is set to `day`. Raises SlotUnavailable when the day is full
+    (or outside the booking horizon).
+    """
+    released = None
+    with db_pool.get_pool().writer() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        slot = conn.execute(CLAIM_SLOT, (day, technician_id)).fetchone()
+        if slot is not None:
+            previous = conn.execute(
+                END_ACTIVE_BOOKING, (datetime.date.today().isoformat(), time.time(), user_id)).fetchone()
+            if previous is not None and previous[2] == "cancelled":
+                freed = conn.execute(RELEASE_SLOT, previous[:2]).fetchone()
+                released = previous[:2] + (freed[0],) if freed else None
+            booking_id = conn.execute(
+                "INSERT INTO service_bookings (user_id, day, technician_id, created_at) VALUES (?, ?, ?, ?)",
+                (user_id, day, slot[0], time.time())).lastrowid
+            conn.execute("UPDATE users SET last_service_date = ? WHERE id = ?", (day, user_id))
+
+    if slot is None:
+        service_calendar.mark_full(day, technician_id)
+        raise SlotUnavailable(day, service_calendar.next_available(day, technician_id))
+    service_calendar.update(day, slot[0], slot[1])
+    if released is not None:
+        service_calendar.update(*released)
+    return Booking(booking_id, day, slot[0])
+
+
+def cancel(user_id):
+    """Cancels the user's upcoming booking; returns False when there was none (a booking
+    whose day has passed is marked completed instead)."""
+    with db_pool.get_pool().writer() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        previous = conn.execute(
+            END_ACTIVE_BOOKING, (datetime.date.today().isoformat(), time.time(), user_id)).fetchone()
+        cancelled = previous is not None and previous[2] == "cancelled"
+        freed = conn.execute(RELEASE_SLOT, previous[:2]).fetchone() if cancelled else None
+    if freed is not None:
+        service_calendar.update(previous[0], previous[1], freed[0])
+    return cancelled
+
+
+def active_booking(user_id):
+    row = db_pool.fetch_one("SELECT id, day, technician_id FROM service_bookings WHERE user_id = ? AND status = 'booked'",
+                            (user_id,))
+    return Booking(*row) if row else None
+
+
+def next_available_day(after=None, technician_id=None):
+    return service_calendar.next_available(after, technician_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service slot calendar and bookings.")
+    parser.add_argument("--db", default=db_pool.DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("next", help="Show the next day with a free slot")
+    show = commands.add_parser("day", help="Show free slots per technician on a day")
+    show.add_argument("day", help="YYYY-MM-DD")
+    reserve = commands.add_parser("book", help="Book a slot for a user")
+    reserve.add_argument("user_id", type=int)
+    reserve.add_argument("day", help="YYYY-MM-DD")
+    reserve.add_argument("--technician-id", type=int)
+    drop = commands.add_parser("cancel", help="Cancel a user's booking")
+    drop.add_argument("user_id", type=int)
+    args = parser.parse_args()
+
+    db_pool.init_pool(args.db)
+    try:
+        if args.command == "next":
+            print(f"📅 Next available day: {next_available_day() or 'none in the booking horizon'}")
+        elif args.command == "day":
+            slots = service_calendar.free_slots(args.day)
+            for technician_id, free in sorted(slots.items()):
+                print(f"Technician #{technician_id:<4} {free} free")
+            print(f"✅ {sum(slots.values())} free slots on {args.day}.")
+        elif args.command == "book":
+            try:
+                booking = book(args.user_id, args.day, args.technician_id)
+                print(f"✅ Booking #{booking.booking_id}: {booking.day} with technician #{booking.technician_id}.")
+            except SlotUnavailable as e:
+                print(f"⚠️ {e} Next available: {e.next_available or 'none'}.")
+        else:
+            print("✅ Cancelled." if cancel(args.user_id) else "⚠️ No active booking.")
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ {e} (run `python migrations.py migrate` first)")
+    finally:
+        db_pool.get_pool().close()
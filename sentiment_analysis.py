@@ -1,58 +1,97 @@
 import os
 import sqlite3
-import speech_recognition as sr
+import threading
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QListWidget
 from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from dotenv import load_dotenv
+from db_pool import fetch_one
+from eligibility import current_offers
+from escalation import escalate
+from feedback_writer import feedback_writer_stats, get_feedback_writer
+from instrumentation import register_collector, timed
+from sentiment_engine import analyze_sentiment, get_action_items
+from speech_worker import SPEECH_PHRASE_SECONDS, SpeechError, microphone_source, transcribe
+from user_directory import lookup_user
 
 # ✅ Load API Key
 load_dotenv()
 ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY")
 
-# ✅ Database Connection Function
-def get_human_agent_info():
-    """Fetches contact details of a human agent from the database."""
-    conn = sqlite3.connect("electronics_company.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT name, phone FROM agents LIMIT 1")  # Fetch a human agent
-    agent_info = cursor.fetchone()
-    conn.close()
-    
+# ✅ Escalation to a Human Agent (queued and load-balanced, see escalation.py)
+@timed("get_human_agent_info")
+def get_human_agent_info(user_id=None, feedback_text=""):
+    """Escalates the feedback and returns the contact details of the agent it was assigned to."""
+    if user_id is not None:
+        try:
+            case_id, agent_info, position = escalate(user_id, feedback_text)
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ Escalation queue unavailable ({e}); run `python migrations.py migrate`.")
+        else:
+            if agent_info:
+                return f"⚠️ Connecting you to **{agent_info[0]}** at {agent_info[1]} (case #{case_id})"
+            return f"⚠️ All agents are busy. Your case #{case_id} is number {position} in the queue."
+
+    agent_info = fetch_one("SELECT name, phone FROM agents LIMIT 1")  # Fetch a human agent
+
     if agent_info:
         return f"⚠️ Connecting you to **{agent_info[0]}** at {agent_info[1]}"
     else:
         return "⚠️ No human agent available at the moment."
 
+@timed("get_available_offers")
 def get_available_offers():
-    """Fetches available offers from the database."""
-    conn = sqlite3.connect("electronics_company.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT offer_details FROM offers")  # Fetch available offers
-    offers = cursor.fetchall()
-    conn.close()
-    
+    """Lists the offers that haven't expired (precomputed by eligibility.py)."""
+    offers = current_offers()
+
     if offers:
-        return "🎉 Special Offers: " + ", ".join([offer[0] for offer in offers])
+        return "🎉 Special Offers: " + ", ".join(offers)
     else:
         return "No special offers available at the moment."
 
+@timed("log_feedback")
 def log_feedback(user_id, feedback_text, sentiment):
-    """Logs user feedback into the `feedback` table."""
-    conn = sqlite3.connect("electronics_company.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-    INSERT INTO feedback (user_id, feedback_text, sentiment) 
-    VALUES (?, ?, ?)
-    """, (user_id, feedback_text, sentiment))
-    conn.commit()
-    conn.close()
-    print("✅ Feedback logged successfully.")
+    """Queues user feedback for the `feedback` table (written in batches by FeedbackWriter)."""
+    try:
+        get_feedback_writer().submit(user_id, feedback_text, sentiment)
+    except RuntimeError as e:
+        print(f"⚠️ Feedback not saved: {e}")
+        return
+    print("✅ Feedback received and queued for saving.")
+
+register_collector("feedback_writer", feedback_writer_stats)
+
+class SpeechThread(QThread):
+    """Captures and recognizes speech off the UI thread; results arrive as Qt signals."""
+    partial = pyqtSignal(str)
+    recognized = pyqtSignal(str)
+    failed = pyqtSignal(str, str)  # (reason, message)
+
+    def __init__(self, open_source=microphone_source, parent=None, **options):
+        super().__init__(parent)
+        self._open_source = open_source
+        self._options = dict(options)
+        self._options.setdefault("phrase_seconds", SPEECH_PHRASE_SECONDS)  # Partial results; cancel between phrases
+        self._cancel = threading.Event()
+
+    def run(self):
+        try:
+            text = transcribe(self._open_source, cancel=self._cancel, on_partial=self.partial.emit, **self._options)
+        except SpeechError as e:
+            self.failed.emit(e.reason, e.message)
+        else:
+            self.recognized.emit(text)
+
+    def cancel(self):
+        self._cancel.set()
 
 class SentimentApp(QWidget):
-    def __init__(self):
+    def __init__(self, open_source=microphone_source, email=None):
         super().__init__()
         self.setWindowTitle('Customer Feedback & Sentiment Analysis')
+        self.email = email  # The logged-in customer; feedback is attributed to them
+        self.open_source = open_source  # e.g. speech_worker.wav_source(path) for recorded feedback
+        self.speechThread = None
         self.initUI()
 
     def initUI(self):
@@ -78,24 +117,44 @@ class SentimentApp(QWidget):
         self.layout.addWidget(self.actionItemsList)
 
     def listen_and_analyze(self):
-        """Captures audio and processes the feedback."""
-        recognizer = sr.Recognizer()
-        with sr.Microphone() as source:
-            print("🎤 Speak now...")
-            self.sentimentLabel.setText("Listening... Please speak now.")
-            recognizer.adjust_for_ambient_noise(source)
-            try:
-                audio = recognizer.listen(source, timeout=5)
-                text = recognizer.recognize_google(audio)
-                print(f"🗣 Recognized Speech: {text}")
-                self.process_text(text)
-            except sr.UnknownValueError:
-                print("❌ Could not understand the audio.")
-                self.sentimentLabel.setText("Error: Could not understand.")
-            except sr.RequestError:
-                print("⚠️ API unavailable. Check your internet connection.")
-                self.sentimentLabel.setText("Error: Speech API unavailable.")
+        """Starts background capture, or cancels it if it is already running."""
+        if self.speechThread is not None and self.speechThread.isRunning():
+            self.speechThread.cancel()
+            self.speechButton.setEnabled(False)  # Re-enabled once the worker stops
+            return
+
+        print("🎤 Speak now...")
+        self.sentimentLabel.setText("Listening... Please speak now.")
+        self.speechButton.setText('Cancel Listening')
+        self.speechThread = SpeechThread(self.open_source, self)
+        self.speechThread.partial.connect(self.on_partial_speech)
+        self.speechThread.recognized.connect(self.on_speech_recognized)
+        self.speechThread.failed.connect(self.on_speech_failed)
+        self.speechThread.finished.connect(self.on_speech_finished)
+        self.speechThread.start()
+
+    def on_partial_speech(self, text):
+        self.sentimentLabel.setText(f"Heard so far: {text}")
+
+    def on_speech_recognized(self, text):
+        print(f"🗣 Recognized Speech: {text}")
+        self.process_text(text)
+
+    def on_speech_failed(self, reason, message):
+        if reason == "unavailable":
+            print("⚠️ API unavailable. Check your internet connection.")
+            self.sentimentLabel.setText("Error: Speech API unavailable.")
+        elif reason == "cancelled":
+            self.sentimentLabel.setText("Listening cancelled.")
+        else:
+            print(f"❌ {message}")
+            self.sentimentLabel.setText("Error: Could not understand.")
 
+    def on_speech_finished(self):
+        self.speechButton.setText('Speak Now for Feedback Analysis')
+        self.speechButton.setEnabled(True)
+
+    @timed("process_text")
     def process_text(self, text):
         """Processes the speech-to-text output for sentiment analysis."""
         sentiment = self.analyze_sentiment_text(text)
@@ -107,7 +166,7 @@ class SentimentApp(QWidget):
         for item in action_items:
             self.actionItemsList.addItem(item)
 
-        # ✅ Fetch user ID (assuming the user exists in DB)
+        # ✅ Fetch user ID of the logged-in customer
         user_id = self.get_user_id()
 
         if user_id:
@@ -116,7 +175,7 @@ class SentimentApp(QWidget):
         # ✅ Handling additional functionalities
         if sentiment == "NEGATIVE":
             print("We are sorry for the inconvenience!!")
-            agent_info = get_human_agent_info()
+            agent_info = get_human_agent_info(user_id, text)
             print(f"⚠️ {agent_info}")  # Display in terminal
             # ✅ Ensure action items are displayed
             if not action_items:
@@ -134,39 +193,22 @@ class SentimentApp(QWidget):
 
     def analyze_sentiment_text(self, text):
         """Performs a simple sentiment analysis on user feedback."""
-        negative_words = ["angry", "frustrated", "bad", "issue", "poor", "terrible"]
-        positive_words = ["happy", "great", "thank you", "satisfied", "excellent", "amazing"]
-
-        text = text.lower()
-        if any(word in text for word in negative_words):
-            return "NEGATIVE"
-        elif any(word in text for word in positive_words):
-            return "POSITIVE"
-        else:
-            return "NEUTRAL"
+        return analyze_sentiment(text)
 
     def get_action_items(self, text):
         """Suggests action items based on the detected sentiment."""
-        action_items = []
-        if any(word in text for word in ["angry", "bad", "issue", "frustrated"]):
-            action_items.append("Apologize for the inconvenience.")
-            action_items.append("Escalate the issue to a manager.")
-        if any(word in text for word in ["happy", "great", "thank you", "excellent"]):
-            action_items.append("Thank the customer for their feedback.")
-            action_items.append("Recommend additional services.")
-        return action_items
+        return get_action_items(text)
 
     def get_user_id(self):
-        """Fetches the user ID based on stored email or customer details (mock logic)."""
-        conn = sqlite3.connect("electronics_company.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM users LIMIT 1")  # Fetching first user for simplicity
-        user = cursor.fetchone()
-        conn.close()
-        return user[0] if user else None
+        """Fetches the user ID for the email the app was opened with (None if unknown)."""
+        user = lookup_user(self.email) if self.email else None
+        if user is None:
+            print("⚠️ No registered email given; feedback will not be saved.")
+            return None
+        return user.user_id
 
 if __name__ == "__main__":
     app = QApplication([])
-    window = SentimentApp()
+    window = SentimentApp(email=input("Enter your registered email: ").strip())
     window.show()
     app.exec_()  # 🔥 This starts the Qt event loop
@@ -0,0 +1,165 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, tee
+
+from db_pool import DB_PATH
+from intent_router import IntentRouter
+
+# ✅ Sentiment Lexicon (the word lists SentimentApp has always used)
+NEGATIVE_WORDS = ["angry", "frustrated", "bad", "issue", "poor", "terrible"]
+POSITIVE_WORDS = ["happy", "great", "thank you", "satisfied", "excellent", "amazing"]
+APOLOGY_TRIGGERS = ["angry", "bad", "issue", "frustrated"]
+THANKS_TRIGGERS = ["happy", "great", "thank you", "excellent"]
+
+APOLOGY_ACTIONS = ["Apologize for the inconvenience.", "Escalate the issue to a manager."]
+THANKS_ACTIONS = ["Thank the customer for their feedback.", "Recommend additional services."]
+
+# One compiled pass finds every lexicon hit; sentiment and action items are derived from it.
+lexicon = IntentRouter()
+lexicon.add_intent("NEGATIVE", NEGATIVE_WORDS, priority=2)
+lexicon.add_intent("POSITIVE", POSITIVE_WORDS, priority=1)
+lexicon.add_intent("apology", APOLOGY_TRIGGERS)
+lexicon.add_intent("thanks", THANKS_TRIGGERS)
+lexicon.compile()
+
+
+def _resolve(found):
+    if "NEGATIVE" in found:
+        sentiment = "NEGATIVE"
+    elif "POSITIVE" in found:
+        sentiment = "POSITIVE"
+    else:
+        sentiment = "NEUTRAL"
+    action_items = []
+    if "apology" in found:
+        action_items.extend(APOLOGY_ACTIONS)
+    if "thanks" in found:
+        action_items.extend(THANKS_ACTIONS)
+    return sentiment, action_items
+
+
+def score(text):
+    """Returns (sentiment, action_items) for one piece of feedback."""
+    return _resolve(lexicon.intents(text))
+
+
+def analyze_sentiment(text):
+    return score(text)[0]
+
+
+def get_action_items(text):
+    return score(text)[1]
+
+
+def score_batch(texts):
+    """Scores a list of texts with a single lexicon scan over the whole batch."""
+    return [_resolve(found) for found in lexicon.intents_many(texts)]
+
+
+def _batches(texts, batch_size):
+    iterator = iter(texts)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def score_stream(texts, batch_size=1000, workers=1):
+    """Scores any iterable of texts, yielding one list of (sentiment, action_items) per batch.
+
+    With workers > 1 batches are spread over a process pool. Only a few batches per
+    worker are in flight at once, so memory stays bounded however long the stream is.
+    """
+    if workers <= 1:
+        for batch in _batches(texts, batch_size):
+            yield score_batch(batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for batch in _batches(texts, batch_size):
+            pending.append(pool.submit(score_batch, batch))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+# ✅ Re-Scoring the `feedback` Table
+def _feedback_rows(conn, chunk_size):
+    """Streams (id, feedback_text) using keyset pagination so no chunk rescans earlier rows."""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, feedback_text FROM feedback WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, chunk_size)).fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield from rows
+
+
+def rescore_feedback(db_path=DB_PATH, chunk_size=10000, workers=os.cpu_count() or 1, dry_run=False):
+    """Re-scores every feedback row in id-ordered chunks, one transaction per chunk."""
+    reader = sqlite3.connect(db_path)
+    writer = sqlite3.connect(db_path, timeout=30)
+    writer.execute("PRAGMA journal_mode=WAL")
+    total = reader.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+    print(f"🔄 Re-scoring {total:,} feedback rows ({workers} worker(s), chunks of {chunk_size:,})...")
+
+    rows_to_score, rows_to_update = tee(_feedback_rows(reader, chunk_size))
+    done = changed = 0
+    start = time.perf_counter()
+    for batch in score_stream((text for _, text in rows_to_score), chunk_size, workers):
+        chunk_ids = [row_id for row_id, _ in islice(rows_to_update, len(batch))]
+        if not dry_run:
+            updates = [(sentiment, row_id, sentiment) for row_id, (sentiment, _) in zip(chunk_ids, batch)]
+            with writer:
+                changed += writer.executemany(
+                    "UPDATE feedback SET sentiment = ? WHERE id = ? AND sentiment != ?", updates).rowcount
+        done += len(chunk_ids)
+        elapsed = time.perf_counter() - start
+        print(f"  {done:,}/{total:,} rows ({done / total:.0%}) | {done / elapsed:,.0f} rows/sec | {changed:,} changed",
+              flush=True)
+
+    elapsed = time.perf_counter() - start
+    reader.close()
+    writer.close()
+    if changed:
+        # Rollup counts were taken from the old sentiments.
+        from sentiment_rollups import refresh_rollups
+        try:
+            refresh_rollups(db_path, full=True)
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ Sentiment rollups not rebuilt: {e}")
+    print(f"✅ Re-scored {done:,} rows in {elapsed:.1f}s ({done / elapsed if elapsed else 0:,.0f} rows/sec), "
+          f"{changed:,} sentiments changed.")
+    return done, changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch sentiment scoring for customer feedback.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rescore = commands.add_parser("rescore", help="Re-score the feedback table in chunks")
+    rescore.add_argument("--db", default=DB_PATH)
+    rescore.add_argument("--chunk-size", type=int, default=10000)
+    rescore.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    rescore.add_argument("--dry-run", action="store_true", help="Score without writing results back")
+
+    score_cmd = commands.add_parser("score", help="Score lines from stdin and print sentiment<TAB>text")
+    score_cmd.add_argument("--workers", type=int, default=1)
+
+    args = parser.parse_args()
+    if args.command == "rescore":
+        rescore_feedback(args.db, args.chunk_size, args.workers, args.dry_run)
+    else:
+        lines_to_score, lines_to_print = tee(line.rstrip("\n") for line in sys.stdin)
+        for batch in score_stream(lines_to_score, 1000, args.workers):
+            for (sentiment, _), text in zip(batch, lines_to_print):
+                print(f"{sentiment}\t{text}")
@@ -0,0 +1,271 @@
+import argparse
+import datetime
+import os
+import sqlite3
+import time
+from collections import Counter
+
+from db_pool import DB_PATH
+
+# ✅ Rollup Settings (overridable from .env)
+SENTIMENT_ROLLUPS = os.getenv("SENTIMENT_ROLLUPS", "1") != "0"  # Refresh from FeedbackWriter on every batch
+SENTIMENT_WINDOW_DAYS = int(os.getenv("SENTIMENT_WINDOW_DAYS", "30"))
+SENTIMENT_USER_BATCH = int(os.getenv("SENTIMENT_USER_BATCH", "1000"))  # Users per transaction when the window moves
+
+# ✅ Schema (applied by migrations.py, version 4)
+# Counts per (day, product) and per (user, day), keyed so a date range is one index
+# range scan. rollup_state holds the feedback.id watermark, the last user-sentiment cutoff
+# and how far an interrupted move of that cutoff got.
+# Feedback whose user no longer exists is counted under product 0 (no such product).
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS sentiment_daily (
+        day TEXT NOT NULL,
+        product_id INTEGER NOT NULL,
+        sentiment TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (day, product_id, sentiment)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS sentiment_user_daily (
+        user_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        sentiment TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (user_id, day, sentiment)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_sentiment_user_daily_day ON sentiment_user_daily(day)",
+    """CREATE TABLE IF NOT EXISTS rollup_state (
+        name TEXT PRIMARY KEY,
+        value
+    )""",
+]
+
+NEW_FEEDBACK = """
+SELECT feedback.id, feedback.user_id, COALESCE(users.product_id, 0), substr(feedback.timestamp, 1, 10),
+       UPPER(feedback.sentiment)
+FROM feedback LEFT JOIN users ON users.id = feedback.user_id
+WHERE feedback.id > ? AND feedback.id <= ?
+"""
+
+UPSERT_DAILY = """
+INSERT INTO sentiment_daily (day, product_id, sentiment, count) VALUES (?, ?, ?, ?)
+ON CONFLICT (day, product_id, sentiment) DO UPDATE SET count = count + excluded.count
+"""
+
+UPSERT_USER_DAILY = """
+INSERT INTO sentiment_user_daily (user_id, day, sentiment, count) VALUES (?, ?, ?, ?)
+ON CONFLICT (user_id, day, sentiment) DO UPDATE SET count = count + excluded.count
+"""
+
+# Majority sentiment over the window; ties and users without recent feedback are Neutral.
+UPDATE_USER_SENTIMENT = """
+UPDATE users SET sentiment = (
+    SELECT CASE
+        WHEN neg > pos AND neg >= neu THEN 'Negative'
+        WHEN pos > neg AND pos >= neu THEN 'Positive'
+        ELSE 'Neutral'
+    END
+    FROM (SELECT COALESCE(SUM(CASE WHEN sentiment = 'NEGATIVE' THEN count END), 0) AS neg,
+                 COALESCE(SUM(CASE WHEN sentiment = 'POSITIVE' THEN count END), 0) AS pos,
+                 COALESCE(SUM(CASE WHEN sentiment = 'NEUTRAL' THEN count END), 0) AS neu
+          FROM sentiment_user_daily WHERE user_id = users.id AND day >= ?)
+)
+WHERE id = ?
+"""
+
+NEGATIVE_RATE_BY_PRODUCT = """
+SELECT products.id, products.name, SUM(CASE WHEN sentiment = 'NEGATIVE' THEN count ELSE 0 END) AS negative,
+       SUM(count) AS total
+FROM sentiment_daily JOIN products ON products.id = sentiment_daily.product_id
+WHERE day >= ?
+GROUP BY products.id
+ORDER BY negative * 1.0 / total DESC
+"""
+
+
+def _get_state(conn, name, default=None):
+    row = conn.execute("SELECT value FROM rollup_state WHERE name = ?", (name,)).fetchone()
+    return default if row is None else row[0]
+
+
+def _set_state(conn, name, value):
+    conn.execute("INSERT OR REPLACE INTO rollup_state (name, value) VALUES (?, ?)", (name, value))
+
+
+def _cutoff(days, as_of=None):
+    # Feedback timestamps are UTC (CURRENT_TIMESTAMP), so the window is too.
+    today = as_of or datetime.datetime.now(datetime.timezone.utc).date()
+    return (today - datetime.timedelta(days=days - 1)).isoformat()
+
+
+def _refresh_users(conn, user_ids, window_days):
+    cutoff = _cutoff(window_days)
+    conn.executemany(UPDATE_USER_SENTIMENT, [(cutoff, user_id) for user_id in user_ids])
+
+
+def refresh(conn, batch_size=50000, update_users=True, window_days=SENTIMENT_WINDOW_DAYS):
+    """Folds feedback rows above the watermark into the rollups; returns how many were added.
+
+    Must run inside the caller's transaction (FeedbackWriter's batch, or refresh_rollups()),
+    so the counts and the watermark always move together. The sentiment of every user
+    with new feedback is recomputed over the last `window_days` days.
+    """
+    last_id = _get_state(conn, "feedback_id", 0)
+    newest = conn.execute("SELECT COALESCE(MAX(id), 0) FROM feedback").fetchone()[0]
+    added = 0
+    while last_id < newest:
+        upper = min(newest, last_id + batch_size)
+        daily, user_daily = Counter(), Counter()
+        for _, user_id, product_id, day, sentiment in conn.execute(NEW_FEEDBACK, (last_id, upper)):
+            daily[day, product_id, sentiment] += 1
+            user_daily[user_id, day, sentiment] += 1
+            added += 1
+        conn.executemany(UPSERT_DAILY, [key + (count,) for key, count in daily.items()])
+        conn.executemany(UPSERT_USER_DAILY, [key + (count,) for key, count in user_daily.items()])
+        if update_users:
+            _refresh_users(conn, {user_id for user_id, _, _ in user_daily}, window_days)
+        last_id = upper
+    _set_state(conn, "feedback_id", last_id)
+    return added
+
+
+_hook_failed = False
+
+
+def write_hook(conn):
+    """FeedbackWriter hook: keeps the rollups (and the sentiment of the batch's users)
+    current inside each batch's transaction. Moving the window for everyone else is left
+    to refresh_rollups(), so a batch never touches more users than it has rows.
+
+    A failure here (e.g. migration 4 not applied yet) is rolled back on its own and
+    reported, so the feedback batch itself is still written; a later refresh catches up.
+    """
+    global _hook_failed
+    conn.execute("SAVEPOINT rollups")
+    try:
+        refresh(conn)
+    except sqlite3.Error as e:
+        conn.execute("ROLLBACK TO rollups")
+        if not _hook_failed:  # Report once, not on every batch
+            print(f"⚠️ Sentiment rollups not refreshed: {e}")
+        _hook_failed = True
+    conn.execute("RELEASE rollups")
+
+
+def refresh_user_sentiment(conn, window_days=SENTIMENT_WINDOW_DAYS, as_of=None, batch_size=SENTIMENT_USER_BATCH):
+    """Moves the rolling window forward: re-derives users.sentiment for everyone whose
+    feedback is entering or leaving it since the previous call. Returns users updated.
+
+    Runs outside any transaction of the caller: users are updated `batch_size` at a time,
+    each batch in its own short transaction that also records the last user done, so
+    writers are only blocked briefly and an interrupted run resumes where it stopped.
+    """
+    cutoff = _cutoff(window_days, as_of)
+    previous = _get_state(conn, "user_sentiment_cutoff")
+    if previous == cutoff:
+        return 0  # Same day: new feedback already refreshed its users in refresh()
+    last_user = 0
+    if _get_state(conn, "user_sentiment_moving_to") == cutoff:
+        last_user = _get_state(conn, "user_sentiment_user", 0)
+    if previous is None:
+        query, params = "SELECT id FROM users WHERE id > ? ORDER BY id LIMIT ?", ()
+    else:
+        query = ("SELECT DISTINCT user_id FROM sentiment_user_daily WHERE user_id > ? AND day >= ? "
+                 "ORDER BY user_id LIMIT ?")
+        params = (min(previous, cutoff),)
+    updated = 0
+    while True:
+        user_ids = [row[0] for row in conn.execute(query, (last_user, *params, batch_size))]
+        if not user_ids:
+            break
+        with conn:
+            conn.executemany(UPDATE_USER_SENTIMENT, [(cutoff, user_id) for user_id in user_ids])
+            _set_state(conn, "user_sentiment_moving_to", cutoff)
+            _set_state(conn, "user_sentiment_user", user_ids[-1])
+        last_user = user_ids[-1]
+        updated += len(user_ids)
+    with conn:
+        _set_state(conn, "user_sentiment_cutoff", cutoff)
+        conn.execute("DELETE FROM rollup_state WHERE name IN ('user_sentiment_moving_to', 'user_sentiment_user')")
+    return updated
+
+
+def rebuild(conn):
+    """Drops all rollup counts and rebuilds them from the whole feedback table
+    (needed after existing rows change, e.g. a sentiment_engine rescore).
+
+    Days before `archived_before` (set by feedback_archive.py) are no longer in the
+    feedback table, so their counts are kept as they are.
+    """
+    archived_before = _get_state(conn, "archived_before", "")
+    conn.execute("DELETE FROM sentiment_daily WHERE day >= ?", (archived_before,))
+    conn.execute("DELETE FROM sentiment_user_daily WHERE day >= ?", (archived_before,))
+    conn.execute("DELETE FROM rollup_state WHERE name != 'archived_before'")
+    return refresh(conn, update_users=False)
+
+
+def refresh_rollups(db_path=DB_PATH, full=False, window_days=SENTIMENT_WINDOW_DAYS):
+    """Catches the rollups up with the feedback table and rolls users.sentiment forward.
+
+    Run it daily (e.g. from cron) so users.sentiment follows the window as days pass.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    start = time.perf_counter()
+    with conn:
+        added = rebuild(conn) if full else refresh(conn, window_days=window_days)
+    users = refresh_user_sentiment(conn, window_days)
+    conn.close()
+    print(f"✅ Rolled up {added:,} feedback rows and refreshed {users:,} users' sentiment "
+          f"in {time.perf_counter() - start:.2f}s.")
+    return added
+
+
+# ✅ Dashboard Queries (answered from the rollups, independent of feedback size)
+def negative_rate_by_product(conn, days=7, as_of=None):
+    """Returns [(product_id, product_name, negative, total, negative_rate)] over the last `days` days."""
+    return [(product_id, name, negative, total, negative / total)
+            for product_id, name, negative, total in conn.execute(NEGATIVE_RATE_BY_PRODUCT, (_cutoff(days, as_of),))]
+
+
+def daily_sentiment(conn, days=30, as_of=None):
+    """Returns {day: {sentiment: count}} across all products."""
+    result = {}
+    for day, sentiment, count in conn.execute(
+            "SELECT day, sentiment, SUM(count) FROM sentiment_daily WHERE day >= ? GROUP BY day, sentiment",
+            (_cutoff(days, as_of),)):
+        result.setdefault(day, {})[sentiment] = count
+    return result
+
+
+def user_sentiment_counts(conn, user_id, days=None, as_of=None):
+    """Returns {sentiment: count} for one user, over all time or the last `days` days."""
+    cutoff = "" if days is None else _cutoff(days, as_of)
+    return dict(conn.execute(
+        "SELECT sentiment, SUM(count) FROM sentiment_user_daily WHERE user_id = ? AND day >= ? GROUP BY sentiment",
+        (user_id, cutoff)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental sentiment rollups over the feedback table.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    update = commands.add_parser("refresh", help="Roll up new feedback and refresh users.sentiment")
+    update.add_argument("--db", default=DB_PATH)
+    update.add_argument("--full", action="store_true", help="Rebuild every rollup from scratch")
+    update.add_argument("--window-days", type=int, default=SENTIMENT_WINDOW_DAYS)
+    report = commands.add_parser("report", help="Negative rate per product")
+    report.add_argument("--db", default=DB_PATH)
+    report.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        refresh_rollups(args.db, args.full, args.window_days)
+    else:
+        conn = sqlite3.connect(args.db)
+        start = time.perf_counter()
+        rows = negative_rate_by_product(conn, args.days)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{'product':<32} | {'negative':>8} | {'total':>8} | {'rate':>6}")
+        for _, name, negative, total, rate in rows:
+            print(f"{name:<32} | {negative:>8,} | {total:>8,} | {rate:>6.1%}")
+        print(f"✅ {len(rows)} products over the last {args.days} days in {elapsed:.2f} ms.")
+        conn.close()
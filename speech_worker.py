@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+
+import speech_recognition as sr
+
+# ✅ Speech Settings (overridable from .env)
+SPEECH_MAX_RETRIES = int(os.getenv("SPEECH_MAX_RETRIES", "2"))
+SPEECH_CHUNK_SECONDS = float(os.getenv("SPEECH_CHUNK_SECONDS", "15"))
+# Background capture listens in short phrases, so partial text streams and cancel is seen
+# within SPEECH_LISTEN_TIMEOUT (silence) or SPEECH_PHRASE_SECONDS (speech).
+SPEECH_PHRASE_SECONDS = float(os.getenv("SPEECH_PHRASE_SECONDS", "4"))
+SPEECH_LISTEN_TIMEOUT = float(os.getenv("SPEECH_LISTEN_TIMEOUT", "5"))
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+
+
+def _recognize_vosk(recognizer, audio):
+    # recognize_vosk answers with the raw Vosk JSON, e.g. '{"text" : "hello"}'.
+    text = json.loads(recognizer.recognize_vosk(audio)).get("text", "")
+    if not text:
+        raise sr.UnknownValueError()
+    return text
+
+
+# Recognizer backends: name -> function(recognizer, audio) returning text.
+# sphinx, vosk and whisper run locally without network access once their packages are installed.
+RECOGNIZERS = {
+    "google": lambda recognizer, audio: recognizer.recognize_google(audio),
+    "sphinx": lambda recognizer, audio: recognizer.recognize_sphinx(audio),
+    "vosk": _recognize_vosk,
+    "whisper": lambda recognizer, audio: recognizer.recognize_whisper(audio, model=WHISPER_MODEL).strip(),
+}
+
+
+class SpeechError(Exception):
+    """Speech could not be turned into text; `reason` is timeout, unknown, unavailable or cancelled."""
+
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.message = message
+        self.reason = reason
+
+
+class SpeechCancelled(SpeechError):
+    def __init__(self):
+        super().__init__("Speech recognition cancelled.", "cancelled")
+
+
+def microphone_source():
+    return sr.Microphone()
+
+
+def wav_source(path):
+    """Source factory for a pre-recorded WAV/AIFF/FLAC file (headless runs and benchmarks)."""
+    return lambda: sr.AudioFile(path)
+
+
+def _recognize_file(recognizer, source, recognize, chunk_seconds, cancel, on_partial):
+    # Long recordings are read chunk by chunk so memory stays bounded by one chunk.
+    parts = []
+    while True:
+        if cancel is not None and cancel.is_set():
+            raise SpeechCancelled()
+        audio = recognizer.record(source, duration=chunk_seconds)
+        if not audio.frame_data:
+            return parts
+        try:
+            parts.append(recognize(recognizer, audio))
+        except sr.UnknownValueError:
+            continue  # Silence or noise in this chunk; keep going
+        if on_partial:
+            on_partial(" ".join(parts))
+
+
+def _recognize_microphone(recognizer, source, recognize, listen_timeout, phrase_seconds, cancel, on_partial):
+    recognizer.adjust_for_ambient_noise(source, duration=1)
+    parts = []
+    while cancel is None or not cancel.is_set():
+        try:
+            audio = recognizer.listen(source, timeout=listen_timeout, phrase_time_limit=phrase_seconds)
+            parts.append(recognize(recognizer, audio))
+        except (sr.WaitTimeoutError, sr.UnknownValueError):
+            if parts:
+                return parts  # The speaker has finished
+            raise
+        if on_partial:
+            on_partial(" ".join(parts))
+        if phrase_seconds is None:
+            return parts  # Single-utterance mode
+    raise SpeechCancelled()
+
+
+def transcribe(open_source=microphone_source, recognize="google", max_retries=SPEECH_MAX_RETRIES,
+               listen_timeout=SPEECH_LISTEN_TIMEOUT, phrase_seconds=None, chunk_seconds=SPEECH_CHUNK_SECONDS,
+               cancel=None, on_partial=None, on_retry=None, recognizer=None):
+    """Captures audio from `open_source()` and returns the recognized text.
+
+    Microphone input is listened to phrase by phrase (`phrase_seconds` long) and files
+    are read in `chunk_seconds` chunks; `on_partial` receives the text so far after each
+    one. Timeouts and unintelligible audio are retried at most `max_retries` times, with
+    `on_retry(error)` called before each retry. `cancel` (a threading.Event) is checked
+    between phrases/chunks. Raises SpeechError when no text could be produced.
+    """
+    recognizer = recognizer or sr.Recognizer()
+    if isinstance(recognize, str):
+        recognize = RECOGNIZERS[recognize]
+
+    attempt = 0
+    while True:
+        if cancel is not None and cancel.is_set():
+            raise SpeechCancelled()
+        try:
+            with open_source() as source:
+                if isinstance(source, sr.AudioFile):
+                    parts = _recognize_file(recognizer, source, recognize, chunk_seconds, cancel, on_partial)
+                else:
+                    parts = _recognize_microphone(recognizer, source, recognize, listen_timeout,
+                                                  phrase_seconds, cancel, on_partial)
+            if parts:
+                return " ".join(parts)
+            raise sr.UnknownValueError()
+        except sr.RequestError as e:
+            raise SpeechError(f"Speech API unavailable: {e}", "unavailable") from e
+        except (sr.WaitTimeoutError, sr.UnknownValueError) as e:
+            reason = "timeout" if isinstance(e, sr.WaitTimeoutError) else "unknown"
+            if attempt >= max_retries:
+                message = "No speech detected." if reason == "timeout" else "Could not understand the audio."
+                raise SpeechError(message, reason) from e
+            attempt += 1
+            if on_retry:
+                on_retry(e)
+
+
+class SpeechWorker(threading.Thread):
+    """Runs transcribe() on a background thread and reports through callbacks."""
+
+    def __init__(self, open_source=microphone_source, on_partial=None, on_result=None, on_error=None, **options):
+        super().__init__(name="speech-worker", daemon=True)
+        self._open_source = open_source
+        self._on_result = on_result
+        self._on_error = on_error
+        self._options = dict(options, on_partial=on_partial)
+        self._options.setdefault("phrase_seconds", SPEECH_PHRASE_SECONDS)
+        self._cancel = threading.Event()
+        self.text = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.text = transcribe(self._open_source, cancel=self._cancel, **self._options)
+        except SpeechError as e:
+            self.error = e
+            if self._on_error:
+                self._on_error(e)
+            return
+        if self._on_result:
+            self._on_result(self.text)
+
+    def cancel(self):
+        self._cancel.set()
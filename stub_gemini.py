@@ -0,0 +1,107 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ✅ Local Stand-In for the Gemini API (point GEMINI_API_BASE at it)
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real endpoint
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        server.requests += 1
+
+        if server.delay:
+            time.sleep(server.delay)
+        if server.error_rate and random.random() < server.error_rate:
+            self._send_json(503, {"error": {"code": 503, "message": "Stub overloaded"}})
+            return
+        path = self.path.split("?")[0]
+        prompt = payload["contents"][0]["parts"][0]["text"]
+        if path.endswith(":streamGenerateContent"):
+            self._send_stream(server.reply(prompt), server.token_delay)
+        elif path.endswith(":generateContent"):
+            self._send_json(200, {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": server.reply(prompt)}]}}]
+            })
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {self.path}"}})
+
+    def _send_stream(self, text, token_delay):
+        # Server-sent events over chunked encoding, one word per event, like ?alt=sse.
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = text.split(" ")
+        try:
+            for i, word in enumerate(words):
+                if i and token_delay:
+                    time.sleep(token_delay)
+                event = {"candidates": [{"content": {"role": "model", "parts": [
+                    {"text": word if i == 0 else " " + word}]}}]}
+                if i == len(words) - 1:
+                    event["candidates"][0]["finishReason"] = "STOP"
+                data = f"data: {json.dumps(event)}\r\n\r\n".encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.disconnects += 1  # Client cancelled the stream
+            self.close_connection = True
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+
+def default_reply(prompt):
+    return f"Stub answer for: {prompt.strip()[:80]}"
+
+
+def start_stub_server(host="127.0.0.1", port=0, delay=0.0, error_rate=0.0, reply=default_reply, token_delay=0.0):
+    """Starts the stub in a daemon thread and returns (server, base_url) for GeminiClient.
+
+    `delay` is waited before answering (time to first token when streaming) and
+    `token_delay` between streamed words.
+    """
+    server = ThreadingHTTPServer((host, port), StubGeminiHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.error_rate = error_rate
+    server.reply = reply
+    server.token_delay = token_delay
+    server.requests = 0
+    server.disconnects = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1beta"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stub of the Gemini API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with 503")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed words")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.host, args.port, args.delay, args.error_rate, token_delay=args.token_delay)
+    print(f"✅ Stub Gemini API running. Set GEMINI_API_BASE={base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,24 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_generator  # noqa: E402
+import db_pool  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A small generated database (users user1@example.com ... user300@example.com), migrated
+    to the latest version and used by the shared connection pool for the test."""
+    path = str(tmp_path / "test.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_generator.generate(path, users=300, feedback=2000, products=5, agents=3, offers=2)
+    pool = db_pool.init_pool(path)
+    yield path
+    pool.close()
+    db_pool.init_pool(db_pool.DB_PATH)
@@ -0,0 +1,50 @@
+import sqlite3
+
+import pytest
+
+from analytics_export import UNKNOWN, Analytics, export
+
+BY_PLAN = """
+SELECT COALESCE(users.maintenance_plan, ?), SUM(UPPER(feedback.sentiment) = 'NEGATIVE'), COUNT(*)
+FROM feedback LEFT JOIN users ON users.id = feedback.user_id
+WHERE feedback.timestamp >= ?
+GROUP BY 1
+"""
+
+BY_PRODUCT = """
+SELECT COALESCE(products.name, ?), SUM(UPPER(feedback.sentiment) = 'NEGATIVE'), COUNT(*)
+FROM feedback LEFT JOIN users ON users.id = feedback.user_id LEFT JOIN products ON products.id = users.product_id
+GROUP BY 1
+"""
+
+
+def as_groups(rows):
+    return {label: (negative, total) for label, negative, total, *_ in rows}
+
+
+@pytest.mark.parametrize("file_format", ["npy", "parquet"])
+def test_aggregations_match_sql(db, tmp_path, file_format):
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("DELETE FROM users WHERE id IN (1, 2)")  # Their feedback has no user any more
+    out = str(tmp_path / "analytics")
+
+    manifest = export(db, out, file_format, chunk_rows=333)
+    analytics = Analytics(out)
+
+    assert manifest["tables"]["feedback"]["rows"] == conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+    assert as_groups(analytics.negative_rate_by_product()) == as_groups(conn.execute(BY_PRODUCT, (UNKNOWN,)))
+    since = conn.execute("SELECT date(MAX(timestamp), '-90 days') FROM feedback").fetchone()[0]
+    assert as_groups(analytics.negative_rate_by_plan(since=since)) == as_groups(conn.execute(BY_PLAN, (UNKNOWN, since)))
+    assert as_groups(analytics.negative_rate_by_plan())[UNKNOWN][1] > 0
+    conn.close()
+
+
+def test_warranty_split_covers_every_feedback_row(db, tmp_path):
+    out = str(tmp_path / "analytics")
+    export(db, out)
+
+    groups = as_groups(Analytics(out).negative_rate_by_warranty())
+
+    assert set(groups) <= {"In warranty", "Out of warranty", UNKNOWN}
+    assert sum(total for _, total in groups.values()) == 2000
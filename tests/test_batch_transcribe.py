@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import wave
+
+import pytest
+
+import batch_transcribe
+from batch_transcribe import RECOGNIZERS, run_batch
+from database import create_database
+from migrations import SchemaOutdated, migrate
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    monkeypatch.setitem(RECOGNIZERS, "fake", lambda recognizer, audio: "terrible noise from the fridge")
+    return "fake"
+
+
+def record(path, seconds=1):
+    with wave.open(str(path), "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(8000)
+        out.writeframes(b"\0\0" * 8000 * seconds)
+    return str(path)
+
+
+def run(paths, db, backend, **options):
+    return run_batch([str(path) for path in paths], db, backend, workers=1, **options)
+
+
+def test_files_are_logged_once(db, tmp_path, fake_backend):
+    record(tmp_path / "7_call.wav")
+    record(tmp_path / "8_call.wav")
+    record(tmp_path / "no_owner.wav")
+
+    stats = run([tmp_path], db, fake_backend)
+    assert (stats["files"], stats["ok"], stats["NEGATIVE"]) == (2, 2, 2)
+    assert run([tmp_path], db, fake_backend)["files"] == 0  # Checkpointed
+
+    conn = sqlite3.connect(db)
+    rows = conn.execute("SELECT user_id, feedback_text FROM feedback WHERE feedback_text LIKE 'terrible noise%'")
+    assert sorted(rows) == [(7, "terrible noise from the fridge"), (8, "terrible noise from the fridge")]
+    conn.close()
+
+
+def test_file_removed_while_transcribing_is_still_checkpointed(db, tmp_path, fake_backend, monkeypatch):
+    path = record(tmp_path / "7_call.wav")
+    transcribe_file = batch_transcribe.transcribe_file
+
+    def transcribe_then_remove(*args):
+        result = transcribe_file(*args)
+        os.remove(path)
+        return result
+
+    monkeypatch.setattr(batch_transcribe, "transcribe_file", transcribe_then_remove)
+    assert run([path], db, fake_backend)["ok"] == 1
+
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT status FROM transcription_checkpoint WHERE path = ?", (path,)).fetchone() == ("ok",)
+    conn.close()
+
+
+def test_needs_only_the_checkpoint_migration(tmp_path, fake_backend, capsys):
+    db = str(tmp_path / "old.db")
+    create_database(db, apply_migrations=False)
+    conn = sqlite3.connect(db, isolation_level=None)
+    migrate(conn, target=2, verbose=False)
+    audio = record(tmp_path / "7_call.wav")
+
+    with pytest.raises(SchemaOutdated):
+        run([audio], db, fake_backend)
+    migrate(conn, target=3, verbose=False)
+    assert run([audio], db, fake_backend)["ok"] == 1
+    conn.close()
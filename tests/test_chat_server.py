@@ -0,0 +1,78 @@
+import http.client
+import json
+from urllib.parse import urlsplit
+
+import pytest
+
+from chat_server import start_chat_server
+from profile_cache import profile_cache
+from user_directory import user_directory
+
+
+@pytest.fixture
+def chat(db):
+    user_directory.invalidate()
+    profile_cache.clear()
+    server, base_url = start_chat_server(workers=4)
+    address = urlsplit(base_url)
+    conn = http.client.HTTPConnection(address.hostname, address.port, timeout=10)
+    yield server, conn
+    conn.close()
+    user_directory.invalidate()
+    profile_cache.clear()
+
+
+def call(conn, method, path, body=None):
+    conn.request(method, path, body=None if body is None else json.dumps(body),
+                 headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    data = response.read()
+    if response.getheader("Content-Type") == "application/x-ndjson":
+        return response.status, [json.loads(line) for line in data.splitlines()]
+    return response.status, json.loads(data) if data else None
+
+
+def test_service_dialog_over_one_keep_alive_connection(chat):
+    server, conn = chat
+    status, body = call(conn, "POST", "/sessions", {"email": "user1@example.com"})
+    assert status == 201
+    messages = f"/sessions/{body['session_id']}/messages"
+
+    status, body = call(conn, "POST", messages, {"text": "I need a service"})
+    assert status == 200 and body["pending"] == "confirm"
+    assert "last service date" in body["reply"]
+    assert call(conn, "POST", messages, {"text": "no"})[1] == {"reply": "Okay, no service scheduled.", "pending": None}
+    assert server.requests == 3
+
+
+def test_streamed_dialog_step_ends_with_done(chat):
+    _, conn = chat
+    session_id = call(conn, "POST", "/sessions", {"email": "user2@example.com"})[1]["session_id"]
+
+    status, events = call(conn, "POST", f"/sessions/{session_id}/messages?stream=1", {"text": "service please"})
+
+    assert status == 200
+    assert "last service date" in events[0]["delta"]
+    assert events[-1] == {"done": True, "pending": "confirm"}
+
+
+def test_sessions_open_and_close(chat):
+    _, conn = chat
+    assert call(conn, "POST", "/sessions", {"email": "nobody@example.com"})[0] == 404
+    session_id = call(conn, "POST", "/sessions", {"email": "user3@example.com"})[1]["session_id"]
+    assert call(conn, "GET", "/health")[1]["sessions"] == 1
+
+    assert call(conn, "DELETE", f"/sessions/{session_id}")[0] == 204
+    assert call(conn, "POST", f"/sessions/{session_id}/messages", {"text": "hi"})[0] == 404
+    assert call(conn, "GET", "/health")[1]["sessions"] == 0
+
+
+def test_bad_requests_are_rejected(chat):
+    _, conn = chat
+    session_id = call(conn, "POST", "/sessions", {"email": "user4@example.com"})[1]["session_id"]
+
+    assert call(conn, "POST", f"/sessions/{session_id}/messages", {"text": 5})[0] == 400
+    assert call(conn, "GET", "/sessions")[0] == 405
+    assert call(conn, "GET", "/nowhere")[0] == 404
+    conn.request("POST", "/sessions", body="not json")
+    assert conn.getresponse().status == 400
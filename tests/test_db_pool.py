@@ -0,0 +1,76 @@
+import gc
+import sqlite3
+import threading
+
+import pytest
+
+from db_pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(db):
+    pool = ConnectionPool(db, size=2)
+    yield pool
+    pool.close()
+
+
+def test_each_thread_gets_its_own_reader(pool):
+    readers = []
+
+    def read():
+        readers.append(pool.reader())
+        assert pool.reader() is readers[-1]
+
+    threads = [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(conn) for conn in readers}) == 3
+
+
+def test_reader_is_closed_when_its_thread_exits(pool):
+    pool.reader()
+    for _ in range(20):
+        thread = threading.Thread(target=lambda: pool.reader().execute("SELECT 1").fetchone())
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert pool.open_connections() == 1  # Only this thread's reader is left
+
+
+def test_writer_commits_or_rolls_back(pool):
+    with pool.writer() as conn:
+        conn.execute("UPDATE users SET maintenance_plan = 'Gold' WHERE id = 1")
+    with pytest.raises(ZeroDivisionError):
+        with pool.writer() as conn:
+            conn.execute("UPDATE users SET maintenance_plan = 'Lost' WHERE id = 2")
+            1 / 0
+
+    plans = dict(pool.reader().execute("SELECT id, maintenance_plan FROM users WHERE id IN (1, 2)"))
+    assert plans[1] == "Gold" and plans[2] != "Lost"
+
+
+def test_writers_are_bounded_and_reused(pool):
+    with pool.writer():
+        with pool.writer():
+            assert pool.open_connections() == 2
+    with pool.writer():
+        pass
+
+    assert pool.open_connections() == 2
+
+
+def test_closed_pool_refuses_new_connections(pool):
+    conn = pool.reader()
+    pool.close()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    with pytest.raises(RuntimeError, match="closed"):
+        pool.reader()
+    with pytest.raises(RuntimeError, match="closed"):
+        with pool.writer():
+            pass
@@ -0,0 +1,83 @@
+import datetime
+import sqlite3
+
+from database import create_database
+from eligibility import SCHEMA, EligibilityIndex
+from migrations import migrate
+
+TODAY = datetime.datetime.now()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def set_warranty(db, user_id, day):
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("UPDATE users SET warranty_expiry = ? WHERE id = ?", (day.isoformat(), user_id))
+    conn.close()
+
+
+def test_warranty_status_and_days_left(db):
+    set_warranty(db, 1, TODAY.date() + datetime.timedelta(days=10))
+    set_warranty(db, 2, TODAY.date() - datetime.timedelta(days=1))
+    index = EligibilityIndex(now=lambda: TODAY)
+
+    assert index.get(1)[1:4] == (True, 10, True)
+    assert index.get(2)[1:4] == (False, 0, False)
+    assert index.get(999999) is None
+
+
+def test_changed_and_deleted_users_are_picked_up_on_refresh(db):
+    clock = Clock()
+    index = EligibilityIndex(refresh_seconds=60, clock=clock, now=lambda: TODAY)
+    set_warranty(db, 3, TODAY.date() - datetime.timedelta(days=5))
+    assert index.get(3).in_warranty is False
+
+    set_warranty(db, 3, TODAY.date() + datetime.timedelta(days=5))
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("DELETE FROM users WHERE id = 4")
+    conn.close()
+    assert index.get(3).in_warranty is False  # Not refreshed yet
+    clock.now = 61
+
+    assert index.get(3).in_warranty is True
+    assert index.get(4) is None
+
+
+def test_offers_expire_when_the_day_changes(db):
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("DELETE FROM offers")
+        conn.execute("INSERT INTO offers (offer_details, valid_until) VALUES ('Last day', ?)", (TODAY.date().isoformat(),))
+    conn.close()
+    clock, now = Clock(), [TODAY.replace(hour=23, minute=0)]
+    index = EligibilityIndex(refresh_seconds=10 ** 6, clock=clock, now=lambda: now[0])
+    assert index.offers() == ("Last day",)
+
+    clock.now, now[0] = 3601, TODAY.replace(hour=23) + datetime.timedelta(hours=1)
+
+    assert index.offers() == ()
+
+
+def test_migration_10_does_not_need_migration_9(tmp_path):
+    path = str(tmp_path / "old.db")
+    create_database(path, apply_migrations=False)
+    conn = sqlite3.connect(path, isolation_level=None)
+    migrate(conn, target=8, verbose=False)
+    conn.execute("INSERT INTO users (name, email, product_id, warranty_expiry) VALUES ('A', 'a@example.com', 1, '2020-01-01')")
+
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.execute("UPDATE users SET warranty_expiry = '2099-01-01'")
+    conn.execute("DELETE FROM users")
+
+    assert conn.execute("SELECT COUNT(*) FROM user_changes").fetchone()[0] == 2
+    conn.close()
+
@@ -0,0 +1,59 @@
+import threading
+
+import escalation
+from escalation import claim, dispatch, enqueue, escalate, queue_stats, resolve
+
+
+def test_highest_priority_then_oldest_case_is_claimed_first(db):
+    low = enqueue(1, "question", priority=0)
+    first_urgent = enqueue(2, "broken", priority=3)
+    second_urgent = enqueue(3, "broken too", priority=3)
+
+    assert [claim(1)[0] for _ in range(3)] == [first_urgent, second_urgent, low]
+    assert claim(1) is None
+
+
+def test_priority_comes_from_negative_words(db):
+    assert escalation.priority_for("terrible, broken and a bad issue") > escalation.priority_for("bad")
+    assert escalation.priority_for("thank you") == 0
+
+
+def test_dispatch_spreads_cases_within_agent_capacity(db):
+    cases = [enqueue(user_id, "bad") for user_id in range(1, 6)]
+
+    assigned = dispatch(capacity=1)
+
+    assert [case_id for case_id, _ in assigned] == cases[:3]
+    assert sorted(agent_id for _, agent_id in assigned) == [1, 2, 3]
+    assert queue_stats()["queued"] == 2 and queue_stats()["open_cases"] == 3
+
+
+def test_resolving_frees_the_agent_for_the_next_case(db):
+    capacity = escalation.ESCALATION_AGENT_CAPACITY * 3  # Three agents
+    taken = [escalate(user_id, "bad") for user_id in range(1, capacity + 1)]
+    case_id, agent, position = escalate(capacity + 1, "terrible")
+    assert all(agent is not None for _, agent, _ in taken)
+    assert (agent, position) == (None, 1)
+
+    assert resolve(taken[0][0]) is True
+    assert resolve(taken[0][0]) is False
+    freed_agent = escalation.db_pool.fetch_one("SELECT agent_id FROM escalations WHERE id = ?", (taken[0][0],))[0]
+    assert dispatch() == [(case_id, freed_agent)]
+
+
+def test_concurrent_claims_never_share_a_case(db):
+    for user_id in range(1, 41):
+        enqueue(user_id, "bad")
+    claimed = []
+
+    def work(agent_id):
+        while (case := claim(agent_id)) is not None:
+            claimed.append(case[0])
+
+    threads = [threading.Thread(target=work, args=(agent_id,)) for agent_id in (1, 2, 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(set(claimed)) and len(claimed) == 40
@@ -0,0 +1,80 @@
+import sqlite3
+
+import pytest
+
+import feedback_archive
+from feedback_archive import archive, archive_cutoff, get_feedback, iter_feedback
+
+
+@pytest.fixture
+def conn(db):
+    conn = sqlite3.connect(db, isolation_level=None)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def archive_dir(tmp_path):
+    path = tmp_path / "archive"
+    path.mkdir()
+    return path
+
+
+def total_counted(conn):
+    return conn.execute("SELECT SUM(count) FROM sentiment_daily").fetchone()[0]
+
+
+def test_old_months_move_to_the_archive_and_stay_readable(conn, archive_dir):
+    live_before = conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+    oldest_id = conn.execute("SELECT MIN(id) FROM feedback").fetchone()[0]
+
+    parts = archive(conn, days=365, archive_dir=str(archive_dir), file_format="gz")
+
+    archived = sum(part[3] for part in parts)
+    assert archived > 0
+    assert conn.execute("SELECT COUNT(*) FROM feedback WHERE timestamp < ?", (archive_cutoff(365),)).fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0] == live_before - archived
+    assert sum(1 for _ in iter_feedback(conn, archive_dir=str(archive_dir))) == live_before
+    assert get_feedback(conn, oldest_id, archive_dir=str(archive_dir)).id == oldest_id
+    assert total_counted(conn) == live_before  # The rollups still count archived rows
+
+
+def test_rows_written_during_the_export_are_not_blocked_or_lost(db, conn, archive_dir, monkeypatch):
+    other = sqlite3.connect(db, timeout=0)
+    month = conn.execute("SELECT substr(MIN(timestamp), 1, 7) FROM feedback").fetchone()[0]
+    open_part = feedback_archive._open
+
+    def open_while_writing(path, mode):
+        with other:  # Would fail with "database is locked" if the export held the write lock
+            other.execute("INSERT INTO feedback (user_id, feedback_text, sentiment, timestamp) "
+                          "VALUES (1, 'late import', 'NEUTRAL', ?)", (f"{month}-15 12:00:00",))
+        return open_part(path, mode)
+
+    monkeypatch.setattr(feedback_archive, "_open", open_while_writing)
+    summary = feedback_archive._archive_month(conn, month, str(archive_dir), "gz")
+
+    assert summary is not None
+    assert conn.execute("SELECT feedback_text FROM feedback WHERE timestamp LIKE ?", (f"{month}%",)).fetchall() == [
+        ("late import",)]  # Not in the part, so still live for the next run
+    other.close()
+
+
+def test_month_changed_during_the_export_is_retried(db, conn, archive_dir, monkeypatch):
+    other = sqlite3.connect(db)
+    month = conn.execute("SELECT substr(MIN(timestamp), 1, 7) FROM feedback").fetchone()[0]
+    live = conn.execute("SELECT COUNT(*) FROM feedback WHERE timestamp LIKE ?", (f"{month}%",)).fetchone()[0]
+    open_part = feedback_archive._open
+
+    def open_while_deleting(path, mode):
+        with other:
+            other.execute("DELETE FROM feedback WHERE id = (SELECT MAX(id) FROM feedback WHERE timestamp LIKE ?)",
+                          (f"{month}%",))
+        return open_part(path, mode)
+
+    monkeypatch.setattr(feedback_archive, "_open", open_while_deleting)
+
+    assert feedback_archive._archive_month(conn, month, str(archive_dir), "gz") is None
+    assert conn.execute("SELECT COUNT(*) FROM feedback WHERE timestamp LIKE ?", (f"{month}%",)).fetchone()[0] == live - 1
+    assert conn.execute("SELECT COUNT(*) FROM feedback_archive").fetchone()[0] == 0
+    assert list(archive_dir.iterdir()) == []
+    other.close()
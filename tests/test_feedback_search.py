@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+
+from database import create_database
+from feedback_search import backfill, count, match_query, search, status
+from migrations import migrate
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """A database with 50 feedback rows written before the search index (migration 6) existed."""
+    path = str(tmp_path / "search.db")
+    create_database(path, apply_migrations=False)
+    conn = sqlite3.connect(path)
+    migrate(conn, target=5, verbose=False)
+    with conn:
+        conn.executemany("INSERT INTO users (id, name, email, product_id, warranty_expiry) "
+                         "VALUES (?, ?, ?, 1, '2030-01-01')",
+                         [(i, f"User {i}", f"user{i}@example.com") for i in (1, 2)])
+        conn.executemany("INSERT INTO feedback (user_id, feedback_text, sentiment) VALUES (?, ?, ?)",
+                         [(1 + i % 2, f"old compressor noise number {i}", "NEGATIVE") for i in range(50)])
+    migrate(conn, verbose=False)
+    yield conn
+    conn.close()
+
+
+def add(conn, text, user_id=1, sentiment="POSITIVE"):
+    with conn:
+        return conn.execute("INSERT INTO feedback (user_id, feedback_text, sentiment) VALUES (?, ?, ?)",
+                            (user_id, text, sentiment)).lastrowid
+
+
+def test_new_rows_are_searchable_before_the_backfill(conn):
+    add(conn, "The ice maker is jammed")
+
+    assert [hit.snippet for hit in search(conn, "ice maker")] == ["The **ice** **maker** is jammed"]
+    assert count(conn, "compressor") == 0
+    assert status(conn)["ids_pending"] == 50
+
+
+def test_backfill_resumes_in_batches(conn):
+    assert backfill(conn, batch_size=20, max_batches=1) == 20
+    assert count(conn, "compressor") == 20
+    assert backfill(conn, batch_size=20) == 30
+
+    assert count(conn, "compressor") == 50
+    assert status(conn)["complete"] is True
+
+
+def test_triggers_follow_updates_and_deletes(conn):
+    backfill(conn)
+    row_id = add(conn, "door seal leaks")
+    with conn:
+        conn.execute("UPDATE feedback SET feedback_text = 'door hinge squeaks' WHERE id = ?", (row_id,))
+        conn.execute("UPDATE feedback SET feedback_text = 'quiet now' WHERE id = 1")
+        conn.execute("DELETE FROM feedback WHERE id = 2")
+
+    assert count(conn, "seal") == 0 and count(conn, "hinge") == 1
+    assert count(conn, "compressor") == 48
+    conn.execute("INSERT INTO feedback_fts (feedback_fts) VALUES ('integrity-check')")  # Raises if out of sync
+
+
+def test_filters_and_query_escaping(conn):
+    backfill(conn)
+    add(conn, "compressor fixed, great service", user_id=2)
+
+    assert count(conn, "compressor", sentiment="positive") == 1
+    assert count(conn, "compressor", user_id=2) == 26
+    assert {hit.user_id for hit in search(conn, "compressor", user_id=1, limit=100)} == {1}
+    assert match_query('NEAR "door seal" -noise*') == '"NEAR" "door seal" "noise"'
+    assert search(conn, "AND OR NOT") == []
+    assert search(conn, "!!!") == []
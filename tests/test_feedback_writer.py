@@ -0,0 +1,169 @@
+import contextlib
+import json
+import sqlite3
+import threading
+
+import pytest
+
+import db_pool
+from feedback_writer import FeedbackWriter
+
+
+def feedback_count():
+    return db_pool.fetch_one("SELECT COUNT(*) FROM feedback")[0]
+
+
+def rejected_rows(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def writer(db, tmp_path):
+    writer = FeedbackWriter(batch_size=50, flush_interval_ms=20, rejected_path=str(tmp_path / "rejected.jsonl"))
+    yield writer
+    writer.close()
+
+
+def test_batches_are_written(writer):
+    before = feedback_count()
+    for i in range(120):
+        writer.submit(1 + i % 300, f"feedback {i}", "POSITIVE")
+    writer.flush()
+
+    assert feedback_count() == before + 120
+    assert writer.stats()["rows_written"] == 120
+    assert writer.rows_failed == 0
+
+
+def test_bad_row_is_rejected_alone(writer):
+    before = feedback_count()
+    writer.submit(1, "fine", "POSITIVE")
+    writer.submit(10 ** 9, "unknown user", "NEGATIVE")  # Breaks the users foreign key
+    writer.submit(2, "also fine", "NEUTRAL")
+    writer.flush()
+
+    assert feedback_count() == before + 2
+    assert writer.rows_failed == 1
+    [row] = rejected_rows(writer.rejected_path)
+    assert row["user_id"] == 10 ** 9 and "FOREIGN KEY" in row["error"]
+
+
+def test_locked_database_is_retried(writer, monkeypatch):
+    pool = db_pool.get_pool()
+    writer_connection = pool.writer
+    failures = iter([sqlite3.OperationalError("database is locked")])
+
+    @contextlib.contextmanager
+    def flaky_writer():
+        error = next(failures, None)
+        if error is not None:
+            raise error
+        with writer_connection() as conn:
+            yield conn
+
+    monkeypatch.setattr(pool, "writer", flaky_writer)
+    before = feedback_count()
+    writer.submit(1, "locked at first", "NEUTRAL")
+    writer.flush()
+
+    assert feedback_count() == before + 1
+    assert writer.retried == 1
+    assert writer.rows_failed == 0
+
+
+def test_dead_writer_rejects_rows_instead_of_hanging(writer, monkeypatch):
+    def crash(batch):
+        raise MemoryError("simulated crash")
+
+    monkeypatch.setattr(writer, "_write", crash)
+    writer.submit(1, "lost?", "NEGATIVE")
+    flushed = threading.Thread(target=writer.flush, daemon=True)
+    flushed.start()
+    flushed.join(timeout=5)
+    writer._thread.join(timeout=5)
+
+    assert not flushed.is_alive()
+    assert not writer.stats()["alive"]
+    assert isinstance(writer.error, MemoryError)
+    assert [row["feedback_text"] for row in rejected_rows(writer.rejected_path)] == ["lost?"]
+    with pytest.raises(RuntimeError, match="dead"):
+        writer.submit(1, "after the crash", "NEGATIVE")
+
+
+def test_close_writes_queued_rows_and_refuses_more(writer):
+    before = feedback_count()
+    for i in range(10):
+        writer.submit(3, f"queued {i}", "POSITIVE")
+    writer.close()
+
+    assert feedback_count() == before + 10
+    with pytest.raises(RuntimeError, match="stopped"):
+        writer.submit(3, "too late", "POSITIVE")
+
+
+def test_producer_blocked_on_a_full_queue_does_not_block_close(db, tmp_path, monkeypatch):
+    writer = FeedbackWriter(batch_size=1, flush_interval_ms=1, max_queue=1, rejected_path=str(tmp_path / "r.jsonl"))
+    gate = threading.Event()
+    write = writer._write
+    monkeypatch.setattr(writer, "_write", lambda batch: gate.wait() and write(batch))
+    before = feedback_count()
+    writer.submit(4, "being written", "NEUTRAL")
+    writer.submit(4, "fills the queue", "NEUTRAL")
+    blocked = threading.Thread(target=writer.submit, args=(4, "waits for room", "NEUTRAL"))
+    blocked.start()
+    closing = threading.Thread(target=writer.close)
+    closing.start()
+
+    late = threading.Thread(target=lambda: pytest.raises(RuntimeError, writer.submit, 4, "after close", "NEUTRAL"))
+    late.start()
+    late.join(timeout=2)
+    assert not late.is_alive()  # Refused at once, not queued behind the blocked producer
+    gate.set()
+    closing.join(timeout=5)
+    blocked.join(timeout=5)
+
+    assert not closing.is_alive()
+    assert feedback_count() == before + 3
+
+
+def write_lines(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_import_rejects_bad_rows_and_keeps_going(db, tmp_path):
+    from feedback_writer import import_feedback
+
+    source = write_lines(tmp_path / "feedback.jsonl", [
+        json.dumps({"user_id": 1, "feedback_text": "terrible noise", "timestamp": "2025-01-01 10:00:00"}),
+        json.dumps({"user_id": "x", "feedback_text": "bad id"}),
+        json.dumps({"feedback_text": "no user"}),
+        json.dumps({"user_id": 2, "feedback_text": ""}),
+        json.dumps({"user_id": 2, "feedback_text": "ok", "sentiment": "ecstatic"}),
+        "{not json",
+        json.dumps({"user_id": 10 ** 9, "feedback_text": "unknown user"}),
+        json.dumps({"user_id": "3", "feedback_text": "fine", "sentiment": "positive"}),
+    ])
+    rejected_path = str(tmp_path / "rejected.jsonl")
+    before = feedback_count()
+
+    assert import_feedback(source, db, batch_size=3, rejected_path=rejected_path) == (2, 6)
+
+    assert feedback_count() == before + 2
+    rows = db_pool.fetch_all("SELECT user_id, sentiment FROM feedback ORDER BY id DESC LIMIT 2")
+    assert sorted(rows) == [(1, "NEGATIVE"), (3, "POSITIVE")]
+    errors = [row["error"] for row in rejected_rows(rejected_path)]
+    assert len(errors) == 6
+    assert any("FOREIGN KEY" in error for error in errors)
+    assert any("invalid JSON" in error for error in errors)
+
+
+def test_import_csv(db, tmp_path):
+    from feedback_writer import import_feedback
+
+    source = write_lines(tmp_path / "feedback.csv", ["user_id,feedback_text,sentiment", "5,happy customer,", "6,meh,NEUTRAL"])
+    before = feedback_count()
+
+    assert import_feedback(source, db, rejected_path=str(tmp_path / "rejected.jsonl")) == (2, 0)
+    assert feedback_count() == before + 2
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+import pytest
+
+from gemini_client import GeminiClient, GeminiError
+from stub_gemini import start_stub_server
+
+
+@pytest.fixture
+def stub():
+    server, base_url = start_stub_server()
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def client_for(base_url, **options):
+    options.setdefault("backoff_base", 0.01)
+    return GeminiClient(api_key="test", base_url=base_url, **options)
+
+
+def test_generate_reuses_the_connection(stub):
+    server, base_url = stub
+    client = client_for(base_url)
+
+    assert client.generate("hello") == "Stub answer for: hello"
+    assert client.generate("again") == "Stub answer for: again"
+    assert server.requests == 2
+    client.close()
+
+
+def test_overloaded_server_is_retried_then_reported(stub):
+    server, base_url = stub
+    server.error_rate = 1.0
+    client = client_for(base_url, max_retries=2)
+
+    with pytest.raises(GeminiError) as error:
+        client.generate("hello")
+    assert error.value.status_code == 503
+    assert server.requests == 3
+
+
+def test_stream_yields_pieces_and_records_the_outcome(stub):
+    _, base_url = stub
+    client = client_for(base_url)
+
+    assert "".join(client.stream_generate("four words in here")) == "Stub answer for: four words in here"
+    stats = client.stream_metrics.stats()
+    assert (stats["completed"], stats["failed"]) == (1, 0)
+
+
+def test_cancelled_stream_stops_and_is_counted(stub):
+    _, base_url = stub
+    client = client_for(base_url)
+    cancel = threading.Event()
+
+    pieces = []
+    for piece in client.stream_generate("a b c d e f", cancel=cancel):
+        pieces.append(piece)
+        cancel.set()
+
+    assert len(pieces) == 1
+    assert client.stream_metrics.stats()["cancelled"] == 1
+
+
+def test_stream_that_cannot_connect_is_counted_as_failed():
+    client = client_for("http://127.0.0.1:9/v1beta", max_retries=0)
+
+    with pytest.raises(Exception):
+        list(client.stream_generate("hello"))
+    assert client.stream_metrics.stats()["failed"] == 1
+
+
+def test_async_stream(stub):
+    _, base_url = stub
+    client = client_for(base_url)
+
+    async def collect():
+        return [piece async for piece in client.astream_generate("async words")]
+
+    assert "".join(asyncio.run(collect())) == "Stub answer for: async words"
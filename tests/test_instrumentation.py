@@ -0,0 +1,61 @@
+import pytest
+
+import feedback_writer
+import instrumentation
+from feedback_writer import FeedbackWriter, feedback_writer_stats
+from instrumentation import prometheus_text, register_collector, snapshot, timed
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_active", True)
+    monkeypatch.setattr(instrumentation, "METRICS_ENABLED", True)
+    monkeypatch.setattr(instrumentation, "_collectors", {})
+    instrumentation.reset()
+    yield
+    instrumentation.reset()
+
+
+def test_timed_records_latency_and_errors(metrics):
+    @timed("lookup")
+    def lookup(fail=False):
+        if fail:
+            raise KeyError("missing")
+
+    lookup()
+    with pytest.raises(KeyError):
+        lookup(fail=True)
+    with timed("block"):
+        pass
+
+    operations = snapshot()["operations"]
+    assert (operations["lookup"]["count"], operations["lookup"]["errors"]) == (2, 1)
+    assert operations["block"]["count"] == 1
+    text = prometheus_text()
+    assert 'app_operation_duration_seconds_bucket{operation="lookup",le="+Inf"} 2' in text
+    assert 'app_operation_errors_total{operation="lookup"} 1' in text
+
+
+def test_collectors_are_exported_as_gauges(metrics):
+    register_collector("cache", lambda: {"hits": 3, "ratio": 0.5, "enabled": True})
+    register_collector("broken", lambda: 1 / 0)
+
+    collectors = snapshot()["collectors"]
+    assert collectors["cache"]["hits"] == 3
+    assert "division" in collectors["broken"]["error"]
+    text = prometheus_text()
+    assert "cache_hits 3" in text and "cache_ratio 0.5" in text
+    assert "cache_enabled" not in text
+
+
+def test_scraping_does_not_start_the_feedback_writer(db, metrics, monkeypatch):
+    monkeypatch.setattr(feedback_writer, "_writer", None)
+    register_collector("feedback_writer", feedback_writer_stats)
+
+    assert snapshot()["collectors"]["feedback_writer"] == {}
+    assert feedback_writer._writer is None
+
+    writer = FeedbackWriter()
+    monkeypatch.setattr(feedback_writer, "_writer", writer)
+    assert snapshot()["collectors"]["feedback_writer"]["alive"] is True
+    writer.close()
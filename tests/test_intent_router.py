@@ -0,0 +1,49 @@
+from intent_router import IntentRouter
+
+
+def router():
+    router = IntentRouter()
+    router.add_intent("maintenance", ["maintenance", "maintenance plan"], priority=30)
+    router.add_intent("servicing", ["service", "service plan"], priority=20)
+    router.add_intent("refrigerator", ["fridge", "ice maker", "door seal"], priority=0)
+    router.add_intent("leak", ["seal leak"], priority=5)
+    return router.compile()
+
+
+def test_whole_words_and_plurals():
+    assert router().intents("My fridges are fine") == {"refrigerator"}
+    assert router().intents("refridgerator servicemen") == set()
+
+
+def test_longest_keyword_wins_within_an_intent():
+    matches = router().matches("Is the service plan worth it?")
+
+    assert [(m.intent, m.keyword) for m in matches] == [("servicing", "service plan")]
+
+
+def test_overlapping_hits_of_different_intents_are_all_reported():
+    text = "the door seal leaks"
+    matches = router().matches(text)
+
+    assert {(m.intent, m.keyword) for m in matches} == {("refrigerator", "door seal"), ("leak", "seal leak")}
+    assert [text[m.start:m.end] for m in matches] == ["door seal", "seal leaks"]
+
+
+def test_spans_point_into_the_original_text():
+    text = "Fridge,  fridge; ICE   maker... the fridge!"
+    matches = router().matches(text)
+
+    assert [text[m.start:m.end] for m in matches] == ["Fridge", "fridge", "ICE   maker", "fridge"]
+
+
+def test_route_prefers_priority():
+    assert router().route("my fridge needs a service") == "servicing"
+    assert router().route("fridge maintenance please") == "maintenance"
+    assert router().route("hello", default="none") == "none"
+
+
+def test_batch_matches_single_texts():
+    texts = ["ice", "maker fridge", "service", "ice maker", ""]
+
+    assert router().intents_many(texts) == [router().intents(text) for text in texts]
+    assert router().intents_many(texts)[0] == set()  # "ice" + "maker" across texts is not a keyword
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+import migrations
+from database import create_database
+from migrations import MIGRATIONS, Check, Migration, SchemaOutdated, current_version, migrate, require_current
+
+
+@pytest.fixture
+def fresh(tmp_path):
+    path = str(tmp_path / "fresh.db")
+    create_database(path, apply_migrations=False)
+    conn = sqlite3.connect(path, isolation_level=None)
+    yield conn
+    conn.close()
+
+
+def test_fresh_database_is_migrated_and_checks_are_recorded(fresh):
+    with pytest.raises(SchemaOutdated):
+        require_current(fresh)
+
+    assert migrate(fresh, verbose=False) == [m.version for m in MIGRATIONS]
+    assert require_current(fresh) == MIGRATIONS[-1].version
+    plans = dict(fresh.execute("SELECT check_name, query_plan FROM schema_migration_checks WHERE phase = 'after'"))
+    for check in (check for m in MIGRATIONS for check in m.checks if check.uses):
+        assert check.uses in plans[check.name]
+    assert migrate(fresh, verbose=False) == []
+
+
+def test_failed_step_rolls_back_the_whole_migration(fresh, monkeypatch):
+    migrate(fresh, verbose=False)
+    version = current_version(fresh)
+
+    def fail(conn):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS + [
+        Migration(version + 1, "broken", ["CREATE TABLE half_done (id INTEGER)", fail], [])])
+    with pytest.raises(ValueError):
+        migrate(fresh, verbose=False)
+
+    assert current_version(fresh) == version
+    assert fresh.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+
+
+def test_migration_whose_query_misses_its_index_is_rolled_back(fresh, monkeypatch):
+    migrate(fresh, verbose=False)
+    version = current_version(fresh)
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS + [
+        Migration(version + 1, "index on the wrong column", ["CREATE INDEX idx_wrong ON feedback(sentiment)"], [
+            Check("feedback by date", "SELECT id FROM feedback WHERE timestamp > ?", ("2024-01-01",), "idx_wrong"),
+        ])])
+    with pytest.raises(RuntimeError, match="idx_wrong"):
+        migrate(fresh, verbose=False)
+
+    assert current_version(fresh) == version
+    assert fresh.execute("SELECT name FROM sqlite_master WHERE name = 'idx_wrong'").fetchone() is None
+
+
+def test_importing_the_database_module_does_not_import_feature_modules():
+    code = "import sys, database; print(sorted({'scheduler', 'escalation', 'eligibility'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(migrations.__file__))).stdout
+
+    assert output.strip() == "[]"
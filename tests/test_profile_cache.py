@@ -0,0 +1,63 @@
+import profile_cache
+from profile_cache import ProfileCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_until_the_ttl_expires(db):
+    clock = Clock()
+    cache = ProfileCache(ttl=60, clock=clock)
+
+    assert cache.get("user1@example.com").user_id == 1
+    assert cache.get("user1@example.com").user_id == 1
+    clock.now = 61
+    cache.get("user1@example.com")
+
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_unknown_email_uses_the_short_ttl(db):
+    clock = Clock()
+    cache = ProfileCache(ttl=60, negative_ttl=5, clock=clock)
+
+    assert cache.get("nobody@example.com") is None
+    assert cache.get("nobody@example.com") is None
+    clock.now = 6
+    assert cache.get("nobody@example.com") is None
+
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_write_invalidates_the_cached_profile(db, monkeypatch):
+    cache = ProfileCache()
+    monkeypatch.setattr(profile_cache, "profile_cache", cache)
+    assert cache.get("user2@example.com").last_service_date != "2030-01-01"
+
+    profile_cache.update_last_service_date("user2@example.com", "2030-01-01")
+
+    assert cache.get("user2@example.com").last_service_date == "2030-01-01"
+    assert cache.invalidations == 1
+
+
+def test_row_read_before_a_concurrent_invalidate_is_not_cached(db, monkeypatch):
+    cache = ProfileCache()
+    fetch_one = profile_cache.fetch_one
+
+    def racing_fetch(sql, params):
+        row = fetch_one(sql, params)
+        cache.invalidate(params[0])  # An update commits after our read but before we store it
+        return row
+
+    monkeypatch.setattr(profile_cache, "fetch_one", racing_fetch)
+    cache.get("user3@example.com")
+    monkeypatch.setattr(profile_cache, "fetch_one", fetch_one)
+    cache.get("user3@example.com")
+
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert cache.stats()["size"] == 1
@@ -0,0 +1,89 @@
+import sqlite3
+
+import pytest
+
+from response_cache import ResponseCache
+
+TEMPLATE = "Answer this question specifically about refrigerators: {}"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), similarity=0.5)
+    yield cache
+    cache.close()
+
+
+def put_question(cache, question, answer):
+    cache.put(TEMPLATE.format(question), "model", answer, 1.0, fuzzy_text=question)
+
+
+def test_exact_hit_ignores_case_and_spacing(cache):
+    cache.put("Why is my  fridge loud?", "model", "answer", 2.0)
+
+    assert cache.get("why is my fridge loud?", "model") == "answer"
+    assert cache.get("why is my fridge loud?", "other-model") is None
+    assert cache.stats()["saved_seconds"] == 2.0
+
+
+def test_near_duplicate_questions_share_an_answer(cache):
+    put_question(cache, "refrigerator making loud noise at night", "noise answer")
+
+    question = "refrigerator making loud noise"
+    assert cache.get(TEMPLATE.format(question), "model", fuzzy_text=question) == "noise answer"
+    assert cache.fuzzy_hits == 1
+
+
+def test_template_words_do_not_make_questions_similar(cache):
+    put_question(cache, "refrigerator making noise", "noise answer")
+
+    question = "refrigerator door leaking"
+    assert cache.get(TEMPLATE.format(question), "model", fuzzy_text=question) is None
+
+
+class CountingDict(dict):
+    reads = 0
+
+    def __getitem__(self, key):
+        self.reads += 1
+        return super().__getitem__(key)
+
+
+def test_common_words_do_not_make_every_entry_a_candidate(cache):
+    for i in range(200):
+        put_question(cache, f"refrigerator question number{i}", f"answer {i}")
+    put_question(cache, "refrigerator compressor clicking", "compressor answer")
+    question = "refrigerator compressor clicking loudly"
+    cache.get("warm up", "model", fuzzy_text="warm up")  # Loads the index
+    cache._fuzzy_tokens = CountingDict(cache._fuzzy_tokens)
+
+    assert cache.get(TEMPLATE.format(question), "model", fuzzy_text=question) == "compressor answer"
+    assert cache._fuzzy_tokens.reads == 1  # Not the 200 entries that only share "refrigerator"
+
+
+def test_cache_from_before_fuzzy_text_is_upgraded(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE response_cache (key TEXT PRIMARY KEY, model TEXT NOT NULL, prompt TEXT NOT NULL,
+        fuzzy INTEGER NOT NULL DEFAULT 0, response TEXT NOT NULL, latency REAL NOT NULL, created_at REAL NOT NULL,
+        last_access REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)""")
+    conn.execute("INSERT INTO response_cache VALUES ('k', 'model', 'old prompt', 1, 'old', 1, 1e12, 1e12, 0)")
+    conn.commit()
+    conn.close()
+
+    cache = ResponseCache(path, similarity=0.5)
+    assert cache.get("new prompt", "model", fuzzy_text="old prompt") is None  # Old entries aren't fuzzy-indexed
+    put_question(cache, "old prompt", "new")
+    assert cache.get("x", "model", fuzzy_text="old prompt") == "new"
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "small.db"), max_entries=10)
+    for i in range(12):
+        cache.put(f"prompt {i}", "model", f"answer {i}", 1.0)
+
+    assert cache.stats()["entries"] <= 10
+    assert cache.get("prompt 11", "model") == "answer 11"
+    assert cache.get("prompt 0", "model") is None
+    cache.close()
@@ -0,0 +1,93 @@
+import datetime
+import sqlite3
+import threading
+
+import pytest
+
+import db_pool
+import scheduler
+
+
+@pytest.fixture
+def calendar(db, monkeypatch):
+    calendar = scheduler.ServiceCalendar()
+    monkeypatch.setattr(scheduler, "service_calendar", calendar)
+    return calendar
+
+
+def test_concurrent_bookings_never_exceed_capacity(calendar):
+    day = calendar.next_available()
+    capacity = db_pool.fetch_one("SELECT SUM(capacity) FROM service_slots WHERE day = ?", (day,))[0]
+    booked, full = [], []
+
+    def book(user_id):
+        try:
+            booked.append(scheduler.book(user_id, day))
+        except scheduler.SlotUnavailable:
+            full.append(user_id)
+
+    threads = [threading.Thread(target=book, args=(user_id,)) for user_id in range(1, capacity + 11)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(booked) == capacity
+    assert len(full) == 10
+    assert db_pool.fetch_one("SELECT COUNT(*) FROM service_slots WHERE day = ? AND booked > capacity", (day,))[0] == 0
+    assert calendar.free_slots(day) == {}
+    assert calendar.next_available(day) != day
+
+
+def test_full_day_suggests_the_next_free_day(calendar):
+    day = calendar.next_available()
+    db_pool.execute("UPDATE service_slots SET booked = capacity WHERE day = ?", (day,))
+    calendar.refresh()
+
+    with pytest.raises(scheduler.SlotUnavailable) as error:
+        scheduler.book(1, day)
+    assert error.value.next_available > day
+
+
+def test_rebooking_releases_the_previous_slot(calendar):
+    first = calendar.next_available()
+    second = calendar.next_available((datetime.date.fromisoformat(first) + datetime.timedelta(days=1)).isoformat())
+    before = sum(calendar.free_slots(first).values())
+
+    scheduler.book(7, first)
+    scheduler.book(7, second)
+
+    assert scheduler.active_booking(7).day == second
+    assert sum(calendar.free_slots(first).values()) == before
+    assert db_pool.fetch_one("SELECT SUM(booked) FROM service_slots WHERE day = ?", (first,))[0] == 0
+    assert db_pool.fetch_one("SELECT last_service_date FROM users WHERE id = 7")[0] == second
+
+
+def test_rebooking_after_a_past_visit_leaves_that_day_alone(calendar):
+    past = (datetime.date.today() - datetime.timedelta(days=3)).isoformat()
+    db_pool.execute("INSERT INTO service_slots (day, technician_id, capacity, booked) VALUES (?, 1, 4, 1)", (past,))
+    db_pool.execute("INSERT INTO service_bookings (user_id, day, technician_id, created_at) VALUES (8, ?, 1, 0)", (past,))
+
+    scheduler.book(8, calendar.next_available())
+
+    assert db_pool.fetch_one("SELECT booked FROM service_slots WHERE day = ?", (past,))[0] == 1
+    assert db_pool.fetch_one("SELECT status, cancelled_at FROM service_bookings WHERE day = ?", (past,)) == ("completed", None)
+    assert scheduler.cancel(8) is True
+    assert scheduler.cancel(8) is False
+
+
+def test_bookings_table_from_before_completed_is_rebuilt(db):
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("DROP TABLE service_bookings")
+        conn.execute(scheduler.BOOKINGS_TABLE.replace(", 'completed'", ""))
+        conn.execute("INSERT INTO service_bookings (user_id, day, technician_id, created_at) VALUES (9, '2024-01-02', 1, 0)")
+
+    with conn:
+        scheduler.allow_completed_status(conn)
+        conn.execute("UPDATE service_bookings SET status = 'completed'")
+
+    assert conn.execute("SELECT user_id, status FROM service_bookings").fetchone() == (9, "completed")
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'service_bookings'")}
+    assert {"idx_service_bookings_active", "idx_service_bookings_day"} <= indexes
+    conn.close()
@@ -0,0 +1,35 @@
+import sqlite3
+
+import sentiment_engine
+from sentiment_engine import APOLOGY_ACTIONS, THANKS_ACTIONS, score, score_batch, score_stream
+
+
+def test_negative_outweighs_positive():
+    assert score("Great fridge but a terrible noise issue") == ("NEGATIVE", APOLOGY_ACTIONS + THANKS_ACTIONS)
+    assert score("Thank you, excellent support") == ("POSITIVE", THANKS_ACTIONS)
+    assert score("It arrived on Tuesday") == ("NEUTRAL", [])
+
+
+def test_batch_and_stream_agree_with_single_scores():
+    texts = ["bad", "thank you", "", "happy", "thank", "you", "issue resolved, great"] * 50
+
+    expected = [score(text) for text in texts]
+    assert score_batch(texts) == expected
+    assert [result for batch in score_stream(iter(texts), batch_size=7) for result in batch] == expected
+    assert [result for batch in score_stream(texts, batch_size=40, workers=2) for result in batch] == expected
+
+
+def test_rescore_updates_only_changed_rows(db, capsys):
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("UPDATE feedback SET sentiment = 'POSITIVE', feedback_text = 'terrible issue' WHERE id <= 10")
+    before = dict(conn.execute("SELECT id, sentiment FROM feedback WHERE id > 10"))
+
+    sentiment_engine.rescore_feedback(db, chunk_size=300, workers=1)
+
+    assert {row[0] for row in conn.execute("SELECT sentiment FROM feedback WHERE id <= 10")} == {"NEGATIVE"}
+    after = dict(conn.execute("SELECT id, sentiment FROM feedback WHERE id > 10"))
+    assert after == {row_id: score(text)[0] for row_id, text in conn.execute(
+        "SELECT id, feedback_text FROM feedback WHERE id > 10")}
+    assert len(after) == len(before)
+    conn.close()
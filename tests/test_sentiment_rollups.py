@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+
+import sentiment_rollups
+from sentiment_rollups import _cutoff, daily_sentiment, refresh_user_sentiment, user_sentiment_counts, write_hook
+
+
+@pytest.fixture
+def conn(db):
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("UPDATE users SET sentiment = 'Unset'")
+    yield conn
+    conn.close()
+
+
+def unset_users(conn):
+    return {row[0] for row in conn.execute("SELECT id FROM users WHERE sentiment = 'Unset'")}
+
+
+def add_feedback(conn, user_id, sentiment):
+    conn.execute("INSERT INTO feedback (user_id, feedback_text, sentiment) VALUES (?, 'text', ?)", (user_id, sentiment))
+
+
+def test_write_hook_refreshes_only_the_batch_users(conn):
+    with conn:
+        conn.execute("DELETE FROM rollup_state WHERE name = 'user_sentiment_cutoff'")  # Window not rolled yet
+        add_feedback(conn, 5, "NEGATIVE")
+        add_feedback(conn, 6, "POSITIVE")
+        write_hook(conn)
+
+    assert unset_users(conn) == set(range(1, 301)) - {5, 6}
+    assert conn.execute("SELECT sentiment FROM users WHERE id = 6").fetchone()[0] != "Unset"
+    assert user_sentiment_counts(conn, 5, days=1)["NEGATIVE"] >= 1
+
+
+def test_feedback_of_deleted_users_is_counted_under_product_zero(conn):
+    with conn:
+        add_feedback(conn, 999999, "NEUTRAL")
+        write_hook(conn)
+
+    today = _cutoff(1)
+    assert conn.execute("SELECT count FROM sentiment_daily WHERE day = ? AND product_id = 0", (today,)).fetchone() == (1,)
+    assert daily_sentiment(conn, days=1)[today]["NEUTRAL"] >= 1
+
+
+def test_window_moves_in_batches_and_resumes(conn):
+    with conn:
+        conn.execute("DELETE FROM rollup_state WHERE name = 'user_sentiment_cutoff'")
+    statements = []
+    conn.set_trace_callback(statements.append)
+
+    assert refresh_user_sentiment(conn, batch_size=100) == 300
+    assert unset_users(conn) == set()
+    assert statements.count("COMMIT") >= 3  # Each batch commits on its own
+    assert refresh_user_sentiment(conn, batch_size=100) == 0  # Same day
+
+    cutoff = _cutoff(sentiment_rollups.SENTIMENT_WINDOW_DAYS)
+    with conn:
+        conn.execute("UPDATE users SET sentiment = 'Unset'")
+        conn.execute("DELETE FROM rollup_state WHERE name = 'user_sentiment_cutoff'")
+        conn.execute("INSERT INTO rollup_state VALUES ('user_sentiment_moving_to', ?), ('user_sentiment_user', 150)",
+                     (cutoff,))
+    assert refresh_user_sentiment(conn, batch_size=100) == 150  # An interrupted run picks up after user 150
+    assert unset_users(conn) == set(range(1, 151))
@@ -0,0 +1,99 @@
+import pytest
+
+import db_pool
+import user_directory
+from user_directory import UserDirectory
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def add_user(user_id, email):
+    db_pool.execute("INSERT INTO users (id, name, email, product_id, warranty_expiry) VALUES (?, ?, ?, 1, '2030-01-01')",
+                    (user_id, f"User {user_id}", email))
+
+
+@pytest.fixture
+def directory(db):
+    return UserDirectory(refresh_seconds=3600, miss_refresh_seconds=0, clock=Clock())
+
+
+def test_registered_and_unknown_emails(directory):
+    assert directory.lookup("user42@example.com").user_id == 42
+    assert directory.lookup("nobody@example.com") is None
+    assert directory.stats()["users"] == 300
+    assert directory.stats()["tracks_changes"]
+
+
+def test_new_user_is_found_on_a_miss(directory):
+    directory.lookup("user1@example.com")
+    add_user(301, "new@example.com")
+
+    assert directory.lookup("new@example.com").user_id == 301
+
+
+def test_new_users_wait_for_the_refresh_interval(db):
+    clock = Clock()
+    directory = UserDirectory(refresh_seconds=60, miss_refresh_seconds=30, clock=clock)
+    directory.lookup("user1@example.com")
+    add_user(301, "new@example.com")
+
+    assert directory.lookup("new@example.com") is None
+    clock.now = 60
+    assert directory.lookup("new@example.com").user_id == 301
+
+
+def test_hits_are_answered_without_sqlite(directory, monkeypatch):
+    directory.lookup("user1@example.com")
+    monkeypatch.setattr(user_directory, "fetch_one", None)  # Any read would raise
+
+    assert directory.lookup("user42@example.com") == (42, db_pool.fetch_one("SELECT product_id FROM users WHERE id = 42")[0])
+
+
+def test_changed_email_moves_to_the_new_address_on_refresh(directory):
+    directory.lookup("user5@example.com")
+    db_pool.execute("UPDATE users SET email = 'renamed@example.com' WHERE id = 5")
+    db_pool.execute("UPDATE users SET email = 'user5@example.com' WHERE id = 7")  # Old address, now someone else's
+
+    assert directory.lookup("renamed@example.com").user_id == 5  # The miss refreshes from the change log
+    assert directory.lookup("user5@example.com").user_id == 7
+    assert directory.lookup("user7@example.com") is None
+
+
+def test_deleted_user_and_changed_product_follow_the_log(db):
+    clock = Clock()
+    directory = UserDirectory(refresh_seconds=60, miss_refresh_seconds=60, clock=clock)
+    directory.lookup("user6@example.com")
+    db_pool.execute("DELETE FROM feedback WHERE user_id = 6")
+    db_pool.execute("DELETE FROM users WHERE id = 6")
+    db_pool.execute("UPDATE users SET product_id = 5 WHERE id = 10")
+    clock.now = 60
+
+    assert directory.lookup("user6@example.com") is None
+    assert directory.lookup("user10@example.com").product_id == 5
+
+
+def test_hash_collisions_resolve_to_the_right_user(directory, monkeypatch):
+    monkeypatch.setattr(user_directory, "_digest", lambda email: 12345)  # Every email collides
+
+    assert directory.lookup("user8@example.com").user_id == 8
+    assert directory.lookup("user9@example.com").user_id == 9
+    assert directory.lookup("nobody@example.com") is None
+    assert directory.stats()["collisions"] > 0
+
+
+def test_without_the_change_log_hits_are_confirmed(directory):
+    for (trigger,) in db_pool.fetch_all("SELECT name FROM sqlite_master WHERE type = 'trigger' AND sql LIKE '%user_changes%'"):
+        db_pool.execute(f"DROP TRIGGER {trigger}")
+    db_pool.execute("DROP TABLE user_changes")
+    directory.lookup("user1@example.com")
+    db_pool.execute("UPDATE users SET email = 'moved@example.com' WHERE id = 11")
+
+    assert directory.lookup("user11@example.com") is None
+    assert directory.lookup("moved@example.com").user_id == 11
+    assert directory.stats()["mismatches"] == 1
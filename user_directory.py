@@ -0,0 +1,307 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+from db_pool import fetch_all, fetch_one
+from instrumentation import timed
+
+# ✅ User Directory Settings (overridable from .env)
+USER_DIRECTORY_REFRESH_SECONDS = float(os.getenv("USER_DIRECTORY_REFRESH_SECONDS", "60"))  # Pick up new users
+USER_DIRECTORY_MISS_REFRESH_SECONDS = float(os.getenv("USER_DIRECTORY_MISS_REFRESH_SECONDS", "1"))  # Unknown email: re-check for sign-ups at most this often
+USER_DIRECTORY_BATCH = int(os.getenv("USER_DIRECTORY_BATCH", "50000"))  # Users read per query while loading
+
+NEW_USERS = "SELECT id, email, product_id FROM users WHERE id > ? ORDER BY id LIMIT ?"
+NEW_CHANGES = "SELECT seq, user_id FROM user_changes WHERE seq > ? ORDER BY seq LIMIT ?"
+USER_BY_ID = "SELECT email, product_id FROM users WHERE id = ?"
+USER_BY_EMAIL = "SELECT id, product_id FROM users WHERE email = ?"
+MAX_LOAD = 0.6  # Table slots in use before it doubles
+BLOOM_BITS_PER_KEY = 10
+HASH_BITS = (1 << 64) - 1
+AMBIGUOUS = -1  # User id of a slot whose hash two emails share; such hits are checked in SQLite
+
+# ✅ Change Log (migration 9, product trigger added by migration 12): users whose email or
+# product changed or who were deleted, so a refresh re-reads them instead of only picking
+# up ids above the watermark.
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS user_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS user_changes_email AFTER UPDATE OF email ON users
+    WHEN OLD.email IS NOT NEW.email BEGIN
+        INSERT INTO user_changes (user_id) VALUES (NEW.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_changes_delete AFTER DELETE ON users BEGIN
+        INSERT INTO user_changes (user_id) VALUES (OLD.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_changes_product AFTER UPDATE OF product_id ON users
+    WHEN OLD.product_id IS NOT NEW.product_id BEGIN
+        INSERT INTO user_changes (user_id) VALUES (NEW.id);
+    END""",
+]
+
+UserRecord = namedtuple("UserRecord", ["user_id", "product_id"])
+
+
+def _digest(email):
+    """64-bit hash of the email (never 0, which marks an empty slot)."""
+    return (hash(email) & HASH_BITS) or 1
+
+
+def _bloom_bits(digest):
+    """The 6 filter bits for a digest; all of them sit in the same 64-bit word."""
+    return (1 << (digest >> 28 & 63) | 1 << (digest >> 34 & 63) | 1 << (digest >> 40 & 63)
+            | 1 << (digest >> 46 & 63) | 1 << (digest >> 52 & 63) | 1 << (digest >> 58 & 63))
+
+
+class UserDirectory:
+    """Email -> (user id, product id) for every user, held in flat arrays in front of SQLite.
+
+    A blocked Bloom filter rejects most unknown emails with one word test. The rest are
+    looked up in an open-addressing table of 64-bit email hashes, user ids and product
+    ids (linear probing, at most MAX_LOAD full): 30-50 bytes per user, against several
+    hundred for a dict of email strings. A hit is answered from the arrays alone.
+
+    Users are loaded on first use. Every `refresh_seconds` (and on an unknown email, at
+    most every `miss_refresh_seconds`, so new sign-ups can log in straight away) users
+    above the id watermark are added and users in the user_changes log are re-read: the
+    entry of a changed email or deleted user stops resolving (its id is set to 0) and
+    the user's current email and product are entered. The table never stores emails, so
+    a slot whose hash two emails share is marked AMBIGUOUS and those lookups go to
+    SQLite by email. Without the change log (database not migrated) every hit is
+    confirmed with a primary-key read and unknown emails are checked in SQLite.
+    """
+
+    def __init__(self, refresh_seconds=USER_DIRECTORY_REFRESH_SECONDS,
+                 miss_refresh_seconds=USER_DIRECTORY_MISS_REFRESH_SECONDS, clock=time.monotonic):
+        self.refresh_seconds = refresh_seconds
+        self.miss_refresh_seconds = miss_refresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._table = None  # (hashes, user ids, product ids, bloom words, slot + 1 by user id); replaced when it grows
+        self._size = 0
+        self._watermark = 0
+        self._change_watermark = 0
+        self._tracks_changes = False
+        self._next_refresh = 0.0
+        self._last_refresh = 0.0
+        self.refreshes = 0
+        self.lookups = 0
+        self.rejected = 0  # Turned away by the Bloom filter
+        self.false_positives = 0  # Passed the filter but not in the table
+        self.collisions = 0  # Hits on an AMBIGUOUS slot, looked up in SQLite
+        self.mismatches = 0  # Hit that SQLite did not confirm (only checked without the change log)
+
+    @staticmethod
+    def _allocate(users):
+        slots = 1 << max(4, math.ceil(math.log2(users / MAX_LOAD + 1)))
+        words = 1 << max(1, math.ceil(math.log2(users * BLOOM_BITS_PER_KEY / 64 + 1)))
+        return (array("Q", bytes(8 * slots)), array("i", bytes(4 * slots)), array("i", bytes(4 * slots)),
+                array("Q", bytes(8 * words)), array("i", bytes(4 * (users + 1))))
+
+    @staticmethod
+    def _slot(hashes, digest):
+        mask = len(hashes) - 1
+        slot = digest & mask
+        while hashes[slot] and hashes[slot] != digest:
+            slot = (slot + 1) & mask
+        return slot
+
+    @staticmethod
+    def _track(user_slots, user_id, slot):
+        if user_id >= len(user_slots):
+            user_slots.extend(array("i", bytes(4 * (user_id + 1 - len(user_slots)))))
+        user_slots[user_id] = slot + 1
+
+    @staticmethod
+    def _remove(table, user_id):
+        """Stops the user's current entry from resolving (changed email or deleted user)."""
+        _, ids, _, _, user_slots = table
+        slot = user_slots[user_id] - 1 if user_id < len(user_slots) else -1
+        if slot >= 0 and ids[slot] == user_id:
+            ids[slot] = 0  # The hash stays, so probing still walks past it
+
+    @classmethod
+    def _insert(cls, table, digest, user_id, product_id):
+        """Adds or updates one entry; returns True if it was new."""
+        hashes, ids, products, bloom, user_slots = table
+        slot = cls._slot(hashes, digest)
+        new = not hashes[slot]
+        if user_id < len(user_slots) and user_slots[user_id] - 1 != slot:
+            cls._remove(table, user_id)  # The user's email changed
+        user_id_here = user_id if new or ids[slot] in (0, user_id) else AMBIGUOUS  # Another email, same hash
+        # Filter bit, product and id before the hash, so a concurrent reader never finds a half-written entry.
+        bloom[digest & (len(bloom) - 1)] |= _bloom_bits(digest)
+        products[slot] = product_id
+        ids[slot] = user_id_here
+        hashes[slot] = digest
+        if user_id_here != AMBIGUOUS:
+            cls._track(user_slots, user_id, slot)
+        return new
+
+    def _grow(self, users):
+        table = self._allocate(users)
+        new_hashes, new_ids, new_products, bloom, user_slots = table
+        hashes, ids, products, _, _ = self._table
+        for old, digest in enumerate(hashes):
+            if digest:
+                slot = self._slot(new_hashes, digest)
+                bloom[digest & (len(bloom) - 1)] |= _bloom_bits(digest)
+                new_products[slot], new_ids[slot], new_hashes[slot] = products[old], ids[old], digest
+                if ids[old] > 0:
+                    self._track(user_slots, ids[old], slot)
+        self._table = table
+
+    def _add(self, rows):
+        """Inserts (user id, email, product id) rows (caller holds the lock)."""
+        if (self._size + len(rows)) > len(self._table[0]) * MAX_LOAD:
+            self._grow(2 * (self._size + len(rows)))
+        table, insert = self._table, self._insert
+        for user_id, email, product_id in rows:
+            self._size += insert(table, _digest(email), user_id, product_id)
+
+    def _load_changes(self):
+        """Re-reads users from the change log; returns False if the log doesn't exist."""
+        try:
+            while True:
+                changes = fetch_all(NEW_CHANGES, (self._change_watermark, USER_DIRECTORY_BATCH))
+                for _, user_id in changes:
+                    row = fetch_one(USER_BY_ID, (user_id,))
+                    if row is None:
+                        self._remove(self._table, user_id)
+                    else:
+                        self._add([(user_id, row[0], row[1])])
+                if changes:
+                    self._change_watermark = changes[-1][0]
+                if len(changes) < USER_DIRECTORY_BATCH:
+                    return True
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            return False
+
+    def _load_new_users(self):
+        """Appends users above the watermark and re-reads changed ones (caller holds the lock)."""
+        if self._table is None:
+            try:
+                # Start from the current end of the log: the full load below already sees those changes.
+                self._change_watermark = fetch_one("SELECT COALESCE(MAX(seq), 0) FROM user_changes")[0]
+            except sqlite3.OperationalError:
+                self._change_watermark = 0
+            self._table = self._allocate(fetch_one("SELECT MAX(id) FROM users")[0] or 1)  # Ids are dense
+        while True:
+            rows = fetch_all(NEW_USERS, (self._watermark, USER_DIRECTORY_BATCH))
+            if not rows:
+                break
+            self._add(rows)
+            self._watermark = rows[-1][0]
+            if len(rows) < USER_DIRECTORY_BATCH:
+                break
+        self._tracks_changes = self._load_changes()
+        self._last_refresh = self._clock()
+        self._next_refresh = self._last_refresh + self.refresh_seconds
+        self.refreshes += 1
+
+    def _refresh(self, force=False):
+        now = self._clock()
+        if not force and self._table is not None and now < self._next_refresh:
+            return
+        with self._lock:
+            if force or self._table is None or now >= self._next_refresh:
+                self._load_new_users()
+
+    def _find(self, digest):
+        """(user id, product id) of the entry for `digest`, or None."""
+        table = self._table  # One consistent table even if it grows or is invalidated meanwhile
+        if table is None:
+            self._refresh()
+            table = self._table
+        hashes, ids, products, bloom, _ = table
+        bits = _bloom_bits(digest)
+        if bloom[digest & (len(bloom) - 1)] & bits != bits:
+            self.rejected += 1
+            return None
+        mask = len(hashes) - 1
+        slot = digest & mask
+        while hashes[slot]:
+            if hashes[slot] == digest:
+                user_id = ids[slot]
+                return (user_id, products[slot]) if user_id else None  # 0: changed email or deleted user
+            slot = (slot + 1) & mask
+        self.false_positives += 1
+        return None
+
+    def _exact(self, email):
+        """The SQLite lookup by email; a user it finds is (re-)entered in the table."""
+        row = fetch_one(USER_BY_EMAIL, (email,))
+        if row is None:
+            return None
+        with self._lock:
+            if self._table is not None:
+                self._add([(row[0], email, row[1])])
+        return UserRecord(row[0], row[1])
+
+    def lookup(self, email):
+        """Returns the UserRecord for a registered email, or None."""
+        if self._table is None or self._clock() >= self._next_refresh:
+            self._refresh()
+        self.lookups += 1
+        digest = _digest(email)
+        found = self._find(digest)
+        if found is None and self._clock() - self._last_refresh >= self.miss_refresh_seconds:
+            self._refresh(force=True)  # Maybe they signed up or changed their email since the last refresh
+            found = self._find(digest)
+        if found is None:
+            return None if self._tracks_changes else self._exact(email)
+        user_id, product_id = found
+        if user_id == AMBIGUOUS:
+            self.collisions += 1
+            return self._exact(email)
+        if self._tracks_changes:
+            return UserRecord(user_id, product_id)
+        row = fetch_one(USER_BY_ID, (user_id,))  # No change log: the entry may be out of date
+        if row is not None and row[0] == email:
+            return UserRecord(user_id, row[1])
+        self.mismatches += 1
+        return self._exact(email)
+
+    def __contains__(self, email):
+        return self.lookup(email) is not None
+
+    def invalidate(self):
+        """Drops everything; the next lookup reloads all users."""
+        with self._lock:
+            self._table = None
+            self._size = 0
+            self._watermark = 0
+            self._change_watermark = 0
+            self._next_refresh = 0.0
+            self._last_refresh = 0.0
+
+    def stats(self):
+        table = self._table
+        return {
+            "users": self._size,
+            "load": round(self._size / len(table[0]), 3) if table else 0.0,
+            "memory_bytes": sum(part.itemsize * len(part) for part in table) if table else 0,
+            "tracks_changes": self._tracks_changes,
+            "refreshes": self.refreshes,
+            "lookups": self.lookups,
+            "rejected": self.rejected,
+            "false_positives": self.false_positives,
+            "collisions": self.collisions,
+            "mismatches": self.mismatches,
+        }
+
+
+# ✅ Shared Directory Used by main.py, chatbot.py and sentiment_analysis.py
+user_directory = UserDirectory()
+
+
+@timed("user_lookup")
+def lookup_user(email):
+    return user_directory.lookup(email)